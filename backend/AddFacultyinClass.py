@@ -1,26 +1,21 @@
 import json
-import boto3
 import os
+from membershipIndex import add_membership, refresh_class_routes, invalidate_active_members
+from classRoster import add_roster_member
+from classVersion import bump_classes_version
+from shared.clients import lazy_table
+from shared.responses import json_response
 
-dynamodb = boto3.resource('dynamodb')
 CLS_TABLE_NAME = os.environ.get('CLS_TABLE')
-table = dynamodb.Table(CLS_TABLE_NAME)
+table = lazy_table(CLS_TABLE_NAME)
 
-def lambda_handler(event, context):
-    # Common CORS headers
-    headers = {
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Methods": "OPTIONS, POST",
-        "Access-Control-Allow-Headers": "Content-Type"
-    }
+CORS_METHODS = "OPTIONS, POST"
+CORS_ALLOW_HEADERS = "Content-Type"
 
+def lambda_handler(event, context):
     # Handle preflight (OPTIONS) request
     if event.get("httpMethod") == "OPTIONS":
-        return {
-            "statusCode": 200,
-            "headers": headers,
-            "body": json.dumps({"message": "CORS preflight passed"})
-        }
+        return json_response(200, {"message": "CORS preflight passed"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
     try:
         # Parse request body
@@ -29,45 +24,23 @@ def lambda_handler(event, context):
         class_id = body.get("classId")
         
         if not class_id or not faculty:
-            return {
-                "statusCode": 400,
-                "headers": headers,
-                "body": json.dumps({"message": "Missing classId or faculty"})
-            }
+            return json_response(400, {"message": "Missing classId or faculty"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
         
-        # Fetch existing class details
-        response = table.get_item(Key={"classId": class_id})
-        class_data = response.get("Item")
+        # Append the faculty in place (no-op if already in the list)
+        class_data, added = add_roster_member(table, class_id, 'faculty', faculty)
 
         if not class_data:
-            return {
-                "statusCode": 404,
-                "headers": headers,
-                "body": json.dumps({"message": "Class not found"})
-            }
-
-        # Update the facultyList (append if not already in list)
-        faculty_list = class_data.get("facultyList", [])
-        if faculty not in faculty_list:
-            faculty_list.append(faculty)
+            return json_response(404, {"message": "Class not found"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
-            # Update DynamoDB
-            table.update_item(
-                Key={"classId": class_id},
-                UpdateExpression="SET facultyList = :facultyList",
-                ExpressionAttributeValues={":facultyList": faculty_list}
-            )
+        # Keep the membership index in sync with the roster
+        add_membership(faculty, class_id, 'faculty')
+        refresh_class_routes(class_id, class_data.get("name"), class_data.get("facultyList", []), class_data.get("studentsList", []))
+        invalidate_active_members()
+        if added:
+            bump_classes_version()
 
-        return {
-            "statusCode": 200,
-            "headers": headers,
-            "body": json.dumps({"message": "Faculty added successfully!"})
-        }
+        return json_response(200, {"message": "Faculty added successfully!"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
     except Exception as e:
         print(f"Error: {str(e)}")
-        return {
-            "statusCode": 500,
-            "headers": headers,
-            "body": json.dumps({"message": "Internal server error"})
-        }
+        return json_response(500, {"message": "Internal server error"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
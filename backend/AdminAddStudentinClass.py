@@ -1,11 +1,16 @@
 import json
-import boto3
 import os
-
-dynamodb = boto3.resource('dynamodb')
+from membershipIndex import add_student_membership, invalidate_active_members
+from classRoster import add_roster_member
+from classVersion import bump_classes_version
+from shared.clients import lazy_table
+from shared.responses import json_response
 
 CLS_TABLE_NAME = os.environ.get('CLS_TABLE')
-table = dynamodb.Table(CLS_TABLE_NAME)
+table = lazy_table(CLS_TABLE_NAME)
+
+CORS_METHODS = "OPTIONS, POST"
+CORS_ALLOW_HEADERS = "Content-Type"
 
 def lambda_handler(event, context):
     try:
@@ -15,55 +20,22 @@ def lambda_handler(event, context):
         class_id = body.get("classId")
         
         if not class_id or not student:
-            return {
-                "statusCode": 400,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",  # Enable CORS
-                    "Access-Control-Allow-Methods": "OPTIONS, POST",
-                    "Access-Control-Allow-Headers": "Content-Type"
-                },
-                "body": json.dumps({"message": "Missing classId or student"})
-            }
+            return json_response(400, {"message": "Missing classId or student"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
         
-        # Fetch existing class details
-        response = table.get_item(Key={"classId": class_id})
-        class_data = response.get("Item")
+        # Append the student in place (no-op if already in the list)
+        class_data, added = add_roster_member(table, class_id, 'student', student)
 
         if not class_data:
-            return {
-                "statusCode": 404,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*"
-                },
-                "body": json.dumps({"message": "Class not found"})
-            }
-
-        # Update the studentsList (append if not already in list)
-        students_list = class_data.get("studentsList", [])
-        if student not in students_list:
-            students_list.append(student)
+            return json_response(404, {"message": "Class not found"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
-        # Update DynamoDB
-        table.update_item(
-            Key={"classId": class_id},
-            UpdateExpression="SET studentsList = :studentsList",
-            ExpressionAttributeValues={":studentsList": students_list}
-        )
+        # Keep the membership index in sync with the roster
+        add_student_membership(student, class_id, class_data.get("name"), class_data.get("facultyList", []))
+        invalidate_active_members()
+        if added:
+            bump_classes_version()
 
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Access-Control-Allow-Origin": "*"
-            },
-            "body": json.dumps({"message": "Student added successfully!"})
-        }
+        return json_response(200, {"message": "Student added successfully!"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
     except Exception as e:
         print(f"Error: {str(e)}")
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Access-Control-Allow-Origin": "*"
-            },
-            "body": json.dumps({"message": "Internal server error"})
-        }
+        return json_response(500, {"message": "Internal server error"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
@@ -1,22 +1,33 @@
 import json
-import boto3
-from boto3.dynamodb.conditions import Attr
+import os
 import logging
+import time
+from tableScan import scan_all
+from jobStore import COMPLETE, PENDING, get_job, get_job_rows, job_summary, time_budget_ms
+from userOffboarding import (CASCADE_INLINE_CLASSES, CLASS_OUTCOMES, DONE_OUTCOMES, JOB_OUTCOMES, MAX_OFFBOARD_USERS,
+                             detach_classes, find_member_classes, get_profiles, get_roster_profiles,
+                             run_offboarding_job, start_cascade_job, start_offboarding_job)
+from shared.clients import get_table, lazy_client
+from shared.pagination import decode_token, encode_token
+from shared.responses import json_response
+from shared.authorizer import AuthError, authorize
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # Initialize AWS clients
-dynamodb = boto3.resource('dynamodb')
-cognito = boto3.client('cognito-idp')
+cognito = lazy_client('cognito-idp')
 
 # Get environment variables
 USERS_TABLE = os.environ['USERS_TABLE']
 CLASSES_TABLE = os.environ['CLASSES_TABLE']
 USER_POOL_ID = os.environ['USER_POOL_ID']
+CASCADE_TIME_BUDGET_MS = int(os.environ.get('CASCADE_TIME_BUDGET_MS', '20000'))  # per request, inside API Gateway's 29 s
+JOB_REPORT_PAGE_SIZE = 500
 
 def lambda_handler(event, context):
+    started = time.monotonic()
     try:
         # Verify the request is authenticated and from an admin
         user = verify_admin(event)
@@ -34,8 +45,18 @@ def lambda_handler(event, context):
             if event.get('body'):
                 body = json.loads(event.get('body'))
                 user_id = body.get('userId')
-                return delete_user(user_id)
+                return delete_user(user_id, context, started)
             return build_response(400, {'message': 'Missing request body or userId'})
+        elif action == 'bulk_delete':
+            body = json.loads(event.get('body') or '{}')
+            return bulk_delete(body.get('userIds'), body.get('classId'), context, started)
+        elif action in ('delete_status', 'resume_delete'):
+            job_id = query_params.get('jobId')
+            if not job_id:
+                return build_response(400, {'message': 'Missing jobId'})
+            if action == 'delete_status':
+                return job_status(job_id, query_params.get('nextToken'))
+            return job_response(*run_offboarding_job(job_id, time_budget_ms(CASCADE_TIME_BUDGET_MS, context, started)))
         else:
             return build_response(400, {'message': 'Invalid action specified'})
     
@@ -44,52 +65,31 @@ def lambda_handler(event, context):
         return build_response(500, {'message': 'Internal server error', 'error': str(e)})
 
 def verify_admin(event):
+    """Claims of the caller's Cognito token if it is valid and the caller is an admin, else None"""
     try:
-        # Get the Authorization header
-        headers = event.get('headers', {}) or {}
-        auth_header = headers.get('Authorization') or headers.get('authorization')
-        
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return None
-        
-        # Extract the token
-        token = auth_header.split(' ')[1]
-        
-        # Verify with Cognito
-        # In a real implementation, you would validate the JWT token
-        # For simplicity, we're using a DB lookup here
-        users_table = dynamodb.Table(USERS_TABLE)
-        response = users_table.scan(
-            FilterExpression=Attr('role').eq('admin')
-        )
-        
-        # This is a simplified check. In production, you'd validate the token properly
-        admin_user = response.get('Items', [])[0] if response.get('Items') else None
-        
-        return admin_user
-    
-    except Exception as e:
-        logger.error(f"Error verifying admin: {str(e)}")
+        return authorize(event, group='admin')
+    except AuthError as e:
+        logger.warning(f"Admin verification failed: {str(e)}")
         return None
 
 def fetch_users():
     try:
-        users_table = dynamodb.Table(USERS_TABLE)
-        response = users_table.scan()
+        users_table = get_table(USERS_TABLE)
+        users = scan_all(users_table)
         
-        return build_response(200, response.get('Items', []))
+        return build_response(200, users)
     
     except Exception as e:
         logger.error(f"Error fetching users: {str(e)}")
         raise
 
-def delete_user(user_id):
+def delete_user(user_id, context=None, started=None):
     try:
         if not user_id:
             return build_response(400, {'message': 'userId is required'})
         
         # 1. Get the user from DynamoDB to find their username
-        users_table = dynamodb.Table(USERS_TABLE)
+        users_table = get_table(USERS_TABLE)
         user_response = users_table.get_item(
             Key={'userId': user_id}
         )
@@ -100,7 +100,14 @@ def delete_user(user_id):
         
         username = user.get('username')
         
-        # 2. Delete user from Cognito
+        # 2. Find the user's classes by exact name; a large cascade is stored as a
+        # job before the account goes, so it can always be finished
+        classes = find_member_classes([user.get('name')])
+        job = start_cascade_job(classes) if len(classes) > CASCADE_INLINE_CLASSES else None
+        if not job:
+            detach_classes(classes)
+        
+        # 3. Delete user from Cognito
         try:
             cognito.admin_delete_user(
                 UserPoolId=USER_POOL_ID,
@@ -110,92 +117,82 @@ def delete_user(user_id):
             logger.error(f"Error deleting user from Cognito: {str(cognito_error)}")
             # Continue with DynamoDB deletion even if Cognito deletion fails
         
-        # 3. Delete user from UserProfiles table
+        # 4. Delete user from UserProfiles table
         users_table.delete_item(
             Key={'userId': user_id}
         )
         
-        # 4. Remove user from all classes
-        # First, get all classes
-        classes_table = dynamodb.Table(CLASSES_TABLE)
-        classes_response = classes_table.scan()
-        
-        classes = classes_response.get('Items', [])
-        user_name = user.get('name', '')
-        
-        # Check each class for the user and update if needed
-        for class_item in classes:
-            update_needed = False
-            update_expression = "SET "
-            expression_attribute_values = {}
-            expression_attribute_names = {}
-            
-            # Check if user is in facultyList
-            faculty_list = class_item.get('facultyList', [])
-            if faculty_list and isinstance(faculty_list, list):
-                # Find faculty matching the user name
-                for i, faculty in enumerate(faculty_list):
-                    faculty_name = faculty.get('S', '')
-                    if faculty_name == user_name or user_name in faculty_name:
-                        # Remove this faculty from the list
-                        faculty_list.pop(i)
-                        update_needed = True
-                        update_expression += "#fl = :fl, "
-                        expression_attribute_values[":fl"] = faculty_list
-                        expression_attribute_names["#fl"] = "facultyList"
-                        break
-            
-            # Check if user is in studentsList
-            students_list = class_item.get('studentsList', [])
-            if students_list and isinstance(students_list, list):
-                # Find student matching the user name
-                for i, student in enumerate(students_list):
-                    student_name = student.get('S', '')
-                    if student_name == user_name or user_name in student_name:
-                        # Remove this student from the list
-                        students_list.pop(i)
-                        update_needed = True
-                        update_expression += "#sl = :sl, "
-                        expression_attribute_values[":sl"] = students_list
-                        expression_attribute_names["#sl"] = "studentsList"
-                        break
-            
-            # If the user is the main faculty, we'll clear that field
-            faculty = class_item.get('faculty', '')
-            if faculty and (faculty == user_name or user_name in faculty):
-                update_needed = True
-                update_expression += "#f = :f, "
-                expression_attribute_values[":f"] = ""  # Empty the faculty field
-                expression_attribute_names["#f"] = "faculty"
-            
-            # If updates are needed, perform them
-            if update_needed:
-                # Remove trailing comma and space
-                update_expression = update_expression[:-2]
-                
-                classes_table.update_item(
-                    Key={'classId': class_item['classId']},
-                    UpdateExpression=update_expression,
-                    ExpressionAttributeValues=expression_attribute_values,
-                    ExpressionAttributeNames=expression_attribute_names
-                )
+        if job:
+            header, ran = run_offboarding_job(job['jobId'], time_budget_ms(CASCADE_TIME_BUDGET_MS, context, started))
+            return job_response(header, ran, {'message': 'User deleted, removing them from classes', 'userId': user_id})
         
         return build_response(200, {
             'message': 'User deleted successfully',
-            'userId': user_id
+            'userId': user_id,
+            'classesUpdated': len(classes)
         })
     
     except Exception as e:
         logger.error(f"Error deleting user: {str(e)}")
         raise
 
+def bulk_delete(user_ids, class_id, context=None, started=None):
+    """
+    Offboard a list of userIds, or every student of class_id (a trip that
+    ended), as a job; answers like resume_delete.
+    """
+    unresolved = {}
+    if class_id:
+        class_item = get_table(CLASSES_TABLE).get_item(Key={'classId': class_id}, ConsistentRead=True).get('Item')
+        if not class_item:
+            return build_response(404, {'message': 'Class not found'})
+        profiles, unresolved = get_roster_profiles(class_item)
+        missing = []
+    elif isinstance(user_ids, list) and user_ids and all(isinstance(user_id, str) and user_id for user_id in user_ids):
+        if len(user_ids) > MAX_OFFBOARD_USERS:
+            return build_response(400, {'message': f'At most {MAX_OFFBOARD_USERS} users per job'})
+        profiles, missing = get_profiles(user_ids)
+    else:
+        return build_response(400, {'message': 'Either userIds or classId is required'})
+
+    job = start_offboarding_job(profiles, missing, unresolved)
+    return job_response(*run_offboarding_job(job['jobId'], time_budget_ms(CASCADE_TIME_BUDGET_MS, context, started)))
+
+def job_response(header, ran, extra=None):
+    if header is None:
+        return build_response(404, {'message': 'Job not found'})
+    summary = dict(job_summary(header, JOB_OUTCOMES.get(header.get('kind'), CLASS_OUTCOMES)), **(extra or {}))
+    if not ran:
+        return build_response(409, dict(summary, message='Job is already being processed'))
+    # 202 until every row is done; the client calls resume_delete again
+    return build_response(200 if summary['status'] == COMPLETE else 202, summary)
+
+def job_status(job_id, next_token=None):
+    """Job summary plus the rows that did not go through, a page at a time"""
+    header = get_job(job_id)
+    if not header:
+        return build_response(404, {'message': 'Job not found'})
+    try:
+        start_key = decode_token(next_token) if next_token else None
+    except ValueError:
+        return build_response(400, {'message': 'Invalid nextToken'})
+
+    rows, last_evaluated_key = get_job_rows(
+        job_id, None, JOB_REPORT_PAGE_SIZE,
+        start_key=start_key,
+        skip_statuses=DONE_OUTCOMES + (PENDING,),
+        attributes=['classId', 'userId', 'name', 'status', 'error']
+    )
+    report = job_summary(header, JOB_OUTCOMES.get(header.get('kind'), CLASS_OUTCOMES))
+    report['rows'] = rows
+    report['nextToken'] = encode_token(last_evaluated_key) if last_evaluated_key else None
+    # 202 while rows are left, as for resume_delete
+    return build_response(200 if report['status'] == COMPLETE else 202, report)
+
 def build_response(status_code, body):
-    return {
-        'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Credentials': True
-        },
-        'body': json.dumps(body)
-    }
+    return json_response(
+        status_code, body,
+        methods="OPTIONS,GET,POST",
+        allow_headers="Content-Type,Authorization",
+        headers={'Access-Control-Allow-Credentials': True}
+    )
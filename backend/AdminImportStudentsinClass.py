@@ -0,0 +1,226 @@
+import base64
+import csv
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from tableScan import batch_get_items
+from membershipIndex import add_student_membership, invalidate_active_members
+from classRoster import RosterConflictError, add_roster_members
+from classVersion import bump_classes_version
+from userIndex import find_by_names
+from shared.clients import lazy_table
+from shared.responses import get_header, json_response
+
+# Bulk roster import: adds a list of students (CSV or JSON, identified by
+# userId) to one class. Every row is validated against UserProfiles with
+# BatchGetItem, the roster gets all valid new names in a single conditional
+# update, and the response reports the outcome of each row. Every valid row is
+# (re)written to the membership index, so importing a file again repairs rows
+# whose index write failed.
+
+CLS_TABLE_NAME = os.environ.get('CLS_TABLE')
+USERS_TABLE_NAME = os.environ.get('USERS_TABLE')
+table = lazy_table(CLS_TABLE_NAME)
+users_table = lazy_table(USERS_TABLE_NAME)
+
+MAX_IMPORT_ROWS = int(os.environ.get('MAX_IMPORT_ROWS', '1000'))
+MEMBERSHIP_WRITE_WORKERS = int(os.environ.get('MEMBERSHIP_WRITE_WORKERS', '8'))
+
+# Row outcomes
+ADDED = 'added'
+ALREADY_MEMBER = 'already_member'
+DUPLICATE = 'duplicate'
+INVALID = 'invalid'
+NOT_FOUND = 'not_found'
+NOT_STUDENT = 'not_student'
+MISSING_NAME = 'missing_name'
+NAME_CONFLICT = 'name_conflict'  # another student (of the import, or on the roster) has the same name; the roster can't tell them apart
+INDEX_FAILED = 'index_failed'    # on the roster, but not in the membership index the login gate reads
+
+CORS_METHODS = "OPTIONS, POST"
+CORS_ALLOW_HEADERS = "Content-Type"
+
+
+def parse_csv(text):
+    """userIds from CSV text: the `userId` column if there is a header row, else the first column"""
+    rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+    if not rows:
+        return []
+
+    header = [cell.strip().lower().replace('_', '') for cell in rows[0]]
+    if 'userid' in header:
+        column = header.index('userid')
+        rows = rows[1:]
+    else:
+        column = 0
+    return [row[column].strip() if len(row) > column else '' for row in rows]
+
+
+def parse_request(event):
+    """
+    (class_id, user_ids) from either a JSON body {"classId", "students": [userId or
+    {"userId"}, ...]} / {"classId", "csv": "..."}, or a text/csv body with classId
+    in the query string.
+    """
+    body = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        body = base64.b64decode(body).decode('utf-8')
+
+    if 'csv' in (get_header(event, 'Content-Type') or '').lower():
+        query_params = event.get('queryStringParameters') or {}
+        return query_params.get('classId'), parse_csv(body)
+
+    payload = json.loads(body or '{}')
+    if 'csv' in payload:
+        return payload.get('classId'), parse_csv(payload['csv'] or '')
+
+    user_ids = []
+    for entry in payload.get('students') or []:
+        if isinstance(entry, dict):
+            entry = entry.get('userId')
+        user_ids.append(entry.strip() if isinstance(entry, str) else '')
+    return payload.get('classId'), user_ids
+
+
+def validate_rows(user_ids):
+    """Per-row results for user_ids; rows naming a valid student carry status None and the student's name"""
+    results = [{'row': idx + 1, 'userId': user_id, 'status': None} for idx, user_id in enumerate(user_ids)]
+
+    seen = set()
+    for result in results:
+        if not result['userId']:
+            result['status'] = INVALID
+        elif result['userId'] in seen:
+            result['status'] = DUPLICATE
+        seen.add(result['userId'])
+
+    keys = [{'userId': result['userId']} for result in results if result['status'] is None]
+    users = {user['userId']: user for user in batch_get_items(USERS_TABLE_NAME, keys, ['userId', 'name', 'role'])}
+
+    for result in results:
+        if result['status'] is not None:
+            continue
+        user = users.get(result['userId'])
+        if not user:
+            result['status'] = NOT_FOUND
+        elif user.get('role') != 'student':
+            result['status'] = NOT_STUDENT
+        elif not user.get('name'):
+            # The roster holds names; profiles get theirs on first login
+            result['status'] = MISSING_NAME
+        else:
+            result['name'] = user['name']
+
+    # Rosters hold names, so two different students with the same name can't both be imported
+    user_ids_by_name = {}
+    for result in results:
+        if result['status'] is None:
+            user_ids_by_name.setdefault(result['name'], []).append(result['userId'])
+    for result in results:
+        if result['status'] is None and len(user_ids_by_name[result['name']]) > 1:
+            result['status'] = NAME_CONFLICT
+            result['conflictsWith'] = [user_id for user_id in user_ids_by_name[result['name']] if user_id != result['userId']]
+    return results
+
+
+def roster_name_conflicts(results, added_names):
+    """
+    Mark NAME_CONFLICT on the rows whose name was already on the roster but may
+    belong to someone else: the roster holds names only, so the entry is this
+    student's only if no other student profile carries the name.
+    """
+    present = [result for result in results if result['status'] is None and result['name'] not in added_names]
+    if not present:
+        return
+
+    profiles = find_by_names(users_table, 'student', [result['name'] for result in present], ['userId', 'name'])
+    for result in present:
+        others = [profile['userId'] for profile in profiles.get(result['name'], []) if profile['userId'] != result['userId']]
+        if others:
+            result['status'] = NAME_CONFLICT
+            result['conflictsWith'] = others
+
+
+def index_students(class_item, names):
+    """Write the membership rows of the imported students; returns {name: error} of the writes that failed"""
+    def index_student(name):
+        try:
+            add_student_membership(name, class_item['classId'], class_item.get('name'), class_item.get('facultyList', []))
+            return name, None
+        except Exception as e:
+            print(f"Error indexing {name} in class {class_item['classId']}: {str(e)}")
+            return name, str(e)
+
+    if not names:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(MEMBERSHIP_WRITE_WORKERS, len(names)))) as executor:
+        return {name: error for name, error in executor.map(index_student, names) if error}
+
+
+def lambda_handler(event, context):
+    if event.get("httpMethod") == "OPTIONS":
+        return json_response(200, {"message": "CORS preflight passed"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
+    try:
+        try:
+            class_id, user_ids = parse_request(event)
+        except (ValueError, TypeError, AttributeError, csv.Error) as e:
+            print(f"Unreadable import body: {str(e)}")
+            return json_response(400, {"message": "Body must be JSON or CSV"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
+        if not class_id or not user_ids:
+            return json_response(400, {"message": "Missing classId or students"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+        if len(user_ids) > MAX_IMPORT_ROWS:
+            return json_response(400, {"message": f"At most {MAX_IMPORT_ROWS} students per import"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
+        results = validate_rows(user_ids)
+        names = [result['name'] for result in results if result['status'] is None]
+
+        # All new students go onto the roster in one update
+        try:
+            class_data, added = add_roster_members(table, class_id, 'student', names)
+        except RosterConflictError as e:
+            print(str(e))
+            return json_response(409, {"message": "The class roster changed concurrently, please retry"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
+        if not class_data:
+            return json_response(404, {"message": "Class not found"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
+        added_names = set(added)
+        roster_name_conflicts(results, added_names)
+        for result in results:
+            if result['status'] is None:
+                result['status'] = ADDED if result['name'] in added_names else ALREADY_MEMBER
+
+        # Keep the membership index in sync with the roster; the login gate and
+        # emergency routing only see students that have their row
+        indexed = [result['name'] for result in results if result['status'] in (ADDED, ALREADY_MEMBER)]
+        index_failures = index_students(class_data, indexed)
+        for result in results:
+            if result['status'] in (ADDED, ALREADY_MEMBER) and result['name'] in index_failures:
+                result['status'] = INDEX_FAILED
+                result['error'] = index_failures[result['name']]
+
+        if indexed:
+            invalidate_active_members()
+        if added:
+            bump_classes_version()
+
+        summary = {}
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+
+        message = f"Imported {len(added)} of {len(results)} students"
+        if index_failures:
+            message += f"; {len(index_failures)} could not be indexed, import them again"
+        return json_response(200, {
+            "message": message,
+            "classId": class_id,
+            "summary": summary,
+            "results": results
+        }, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return json_response(500, {"message": "Internal server error"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
@@ -1,16 +1,24 @@
-import boto3
 import os
+import csv
+import io
 import json
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import hmac
-import hashlib
-import base64
+from subscriptionRegistry import record_subscription, set_filter_policy
+from jobStore import (PENDING, COMPLETE, create_job, get_job, get_job_rows, job_summary, run_job,
+                      time_budget_ms)
+from shared.clients import get_table, lazy_client
+from shared.auth import calculate_secret_hash
+from shared.pagination import encode_token, decode_token
+from shared.responses import json_response
+from shared.authorizer import AuthError, authorize
+from shared.throttling import RateLimiter, error_code, throttled_call
 
 # Initialize AWS services
-cognito = boto3.client('cognito-idp')
-dynamodb = boto3.resource('dynamodb')
-sns = boto3.client('sns')
+cognito = lazy_client('cognito-idp')
+sns = lazy_client('sns')
 
 # Environment variables
 USER_POOL_ID = os.environ['USER_POOL_ID']
@@ -20,21 +28,20 @@ COGNITO_CLIENT_SECRET = os.environ['COGNITO_CLIENT_SECRET']
 SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN')
 STUDENT_SNS_TOPIC_ARN = os.environ.get('STUDENT_SNS_TOPIC_ARN')
 
-def normalize_name(name):
-    """Standardize faculty name formatting for consistent SNS filtering"""
-    if not name:
-        return ""
-    # Remove any special characters, keep only alphanumeric and spaces
-    clean_name = ''.join(c for c in name if c.isalnum() or c == ' ')
-    # Replace spaces with hyphens
-    return clean_name.replace(' ', '-')
-
-def calculate_secret_hash(username):
-    """Calculate the SECRET_HASH required for Cognito API calls."""
-    message = username + COGNITO_CLIENT_ID
-    secret = bytes(COGNITO_CLIENT_SECRET, 'utf-8')
-    dig = hmac.new(secret, msg=message.encode('utf-8'), digestmod=hashlib.sha256).digest()
-    return base64.b64encode(dig).decode()
+# Bulk provisioning tuning
+BULK_WORKERS = int(os.environ.get('BULK_WORKERS', '8'))
+BULK_COGNITO_RPS = float(os.environ.get('BULK_COGNITO_RPS', '20'))  # stay under the user pool's API quotas
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', '25'))
+BULK_TIME_BUDGET_MS = int(os.environ.get('BULK_TIME_BUDGET_MS', '20000'))  # per request, inside API Gateway's 29 s
+COGNITO_MAX_ATTEMPTS = 5
+JOB_REPORT_PAGE_SIZE = 500
+USER_ROLES = ('student', 'faculty', 'admin')  # one Cognito group each
+
+CORS_METHODS = "OPTIONS,POST,GET"
+CORS_ALLOW_HEADERS = "Content-Type,Authorization"
+
+# Actions that provision users in bulk; callers must be in the admin Cognito group
+BULK_ACTIONS = ('bulk_create_users', 'resume_bulk_job', 'bulk_job_status')
 
 def check_email_exists(email):
     """Check if a user with the given email already exists in Cognito."""
@@ -66,20 +73,11 @@ def subscribe_faculty_to_sns(email, full_name=""):
         
         subscription_arn = response['SubscriptionArn']
         print(f"Subscription ARN: {subscription_arn}")
+        record_subscription(email, SNS_TOPIC_ARN, subscription_arn, 'faculty')
         
         # If we have a name and the subscription is confirmed, set filter policy
         if full_name and subscription_arn != 'pending confirmation':
-            normalized_name = normalize_name(full_name)
-            filter_policy = {
-                f"faculty-{normalized_name}": ["true"],
-                "all-faculty": ["true"]
-            }
-            
-            sns.set_subscription_attributes(
-                SubscriptionArn=subscription_arn,
-                AttributeName='FilterPolicy',
-                AttributeValue=json.dumps(filter_policy)
-            )
+            set_filter_policy(subscription_arn, 'faculty', full_name)
             print(f"Filter policy set for {email}")
         
         return True
@@ -99,8 +97,10 @@ def subscribe_student_to_sns(email):
         response = sns.subscribe(
             TopicArn=STUDENT_SNS_TOPIC_ARN,
             Protocol='email',
-            Endpoint=email
+            Endpoint=email,
+            ReturnSubscriptionArn=True
         )
+        record_subscription(email, STUDENT_SNS_TOPIC_ARN, response['SubscriptionArn'], 'student')
         
         print(f"Subscription initiated for {email}")
         return True
@@ -108,7 +108,179 @@ def subscribe_student_to_sns(email):
         print(f"Error subscribing {email} to SNS: {str(e)}")
         return False
 
+# ---------------------------------------------------------------------------
+# Bulk provisioning
+#
+# A CSV (columns email, userRole) is streamed into a ProvisioningJobs job (see
+# jobStore) with one row per CSV line ("row#000001", ...) that carries the
+# row's planned username/userId and its outcome. Rows are provisioned in chunks
+# on a worker pool whose Cognito calls share one rate limiter, and each chunk's
+# UserProfiles items go through batch_writer. A request only works for
+# BULK_TIME_BUDGET_MS, so a run that stopped or crashed is continued with
+# resume_bulk_job from the last committed chunk. Re-running a chunk is safe:
+# the planned username makes Cognito creation idempotent and UserProfiles puts
+# reuse the planned userId.
+# ---------------------------------------------------------------------------
+
+JOB_KIND = 'provision'
+ROW_PREFIX = 'row#'
+
+# Row outcomes
+CREATED = 'created'
+EXISTS = 'exists'
+FAILED = 'failed'
+INVALID = 'invalid'
+DUPLICATE = 'duplicate'
+ROW_OUTCOMES = (CREATED, EXISTS, FAILED, INVALID, DUPLICATE)
+
+cognito_limiter = RateLimiter(BULK_COGNITO_RPS)
+
+def cognito_call(operation, **kwargs):
+    """Rate-limited Cognito user pool call, backing off when throttled"""
+    return throttled_call(cognito_limiter, getattr(cognito, operation), COGNITO_MAX_ATTEMPTS,
+                          UserPoolId=USER_POOL_ID, **kwargs)
+
+def row_key(row_number):
+    return f"{ROW_PREFIX}{row_number:06d}"
+
+def new_username(email):
+    return f"{email.split('@')[0]}-{uuid.uuid4().hex[:8]}"
+
+def csv_rows(csv_text):
+    """Job rows of the CSV, validated and with their username/userId planned"""
+    seen_emails = set()
+    for number, row in enumerate(csv.DictReader(io.StringIO(csv_text)), start=1):
+        fields = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+        email = fields.get('email', '')
+        user_role = fields.get('userrole') or fields.get('role', '')
+
+        item = {
+            'rowKey': row_key(number),
+            'row': number,
+            'email': email,
+            'userRole': user_role
+        }
+        if user_role not in USER_ROLES or '@' not in email or '"' in email:
+            item['status'] = INVALID
+            item['error'] = f"A valid email and a userRole of {', '.join(USER_ROLES)} are required"
+        elif email.lower() in seen_emails:
+            item['status'] = DUPLICATE
+        else:
+            # Planned up front so a re-run chunk recreates the same user
+            item['status'] = PENDING
+            item['username'] = new_username(email)
+            item['userId'] = str(uuid.uuid4())
+        seen_emails.add(email.lower())
+        yield item
+
+def start_bulk_job(csv_text):
+    """Stream the CSV rows into a new job and return its header"""
+    return create_job(JOB_KIND, csv_rows(csv_text))
+
+def provision_row(row):
+    """Cognito and SNS side of one pending row; returns the row with its outcome"""
+    email = row['email']
+    username = row['username']
+    user_role = row['userRole']
+
+    try:
+        existing = cognito_call('list_users', Filter=f'email = "{email}"', Limit=1)['Users']
+        if existing and existing[0]['Username'] != username:
+            return dict(row, status=EXISTS)
+
+        if not existing:
+            try:
+                cognito_call(
+                    'admin_create_user',
+                    Username=username,
+                    UserAttributes=[
+                        {'Name': 'email', 'Value': email},
+                        {'Name': 'email_verified', 'Value': 'true'},
+                        {'Name': 'custom:userRole', 'Value': user_role}
+                    ],
+                    MessageAction='SUPPRESS'
+                )
+            except Exception as e:
+                # Created by an earlier run of this chunk
+                if error_code(e) != 'UsernameExistsException':
+                    raise
+        cognito_call('admin_add_user_to_group', Username=username, GroupName=user_role)
+    except Exception as e:
+        print(f"Error provisioning row {row['row']} ({email}): {str(e)}")
+        return dict(row, status=FAILED, error=str(e))
+
+    if user_role == 'faculty' and SNS_TOPIC_ARN:
+        subscribe_faculty_to_sns(email)
+    elif user_role == 'student' and STUDENT_SNS_TOPIC_ARN:
+        subscribe_student_to_sns(email)
+    return dict(row, status=CREATED)
+
+def user_item(row, now):
+    """UserProfiles item of a provisioned row, completed from Google on first login"""
+    return {
+        'userId': row['userId'],
+        'username': row['username'],
+        'email': row['email'],
+        'firstName': "",
+        'lastName': "",
+        # No name until first login: an empty string can't key the role-name index
+        'phone': "",
+        'role': row['userRole'],
+        'createdAt': now,
+        'updatedAt': now
+    }
+
+def provision_chunk(rows):
+    """Provision a chunk's pending rows and store the created users' profiles"""
+    pending = [row for row in rows if row['status'] == PENDING]
+    with ThreadPoolExecutor(max_workers=max(1, min(BULK_WORKERS, len(pending)))) as executor:
+        provisioned = {row['rowKey']: row for row in executor.map(provision_row, pending)}
+
+    now = datetime.utcnow().isoformat()
+    with get_table(TABLE_NAME).batch_writer() as batch:
+        for row in provisioned.values():
+            if row['status'] == CREATED:
+                batch.put_item(Item=user_item(row, now))
+    return [provisioned.get(row['rowKey'], row) for row in rows]
+
+def run_bulk_job(job_id, context=None, started=None):
+    """
+    Provision the job's rows until it completes or the request's time budget
+    (counted from started) is spent. Returns (header, ran) as jobStore.run_job.
+    """
+    budget_ms = time_budget_ms(BULK_TIME_BUDGET_MS, context, started)
+    return run_job(job_id, provision_chunk, BULK_CHUNK_SIZE, budget_ms)
+
+def get_job_report(job_id, next_token=None):
+    """Job summary plus the rows that were not created, a page at a time"""
+    header = get_job(job_id)
+    if not header:
+        return None
+
+    rows, last_evaluated_key = get_job_rows(
+        job_id, ROW_PREFIX, JOB_REPORT_PAGE_SIZE,
+        start_key=decode_token(next_token) if next_token else None,
+        skip_statuses=(CREATED,),
+        attributes=['row', 'email', 'userRole', 'status', 'error']
+    )
+
+    report = job_summary(header, ROW_OUTCOMES)
+    report['rows'] = rows
+    report['nextToken'] = encode_token(last_evaluated_key) if last_evaluated_key else None
+    return report
+
+def bulk_job_response(event, header, ran):
+    if header is None:
+        return json_response(404, {"success": False, "message": "Job not found"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+    summary = job_summary(header, ROW_OUTCOMES)
+    if not ran:
+        return json_response(409, dict(summary, success=False, message="Job is already being processed"), event, CORS_METHODS, CORS_ALLOW_HEADERS)
+    # 202 until every row is done; the client calls resume_bulk_job again
+    status_code = 200 if summary['status'] == COMPLETE else 202
+    return json_response(status_code, dict(summary, success=True), event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
 def lambda_handler(event, context):
+    started = time.monotonic()
     print(f"Received event: {json.dumps(event)}")
 
     try:
@@ -116,6 +288,13 @@ def lambda_handler(event, context):
         body = json.loads(event['body'])
         action = body.get('action', 'create_user')
 
+        if action in BULK_ACTIONS:
+            try:
+                authorize(event, group='admin')
+            except AuthError as e:
+                print(f"Admin verification failed: {str(e)}")
+                return json_response(403, {"success": False, "message": "Forbidden: Admin access required"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
         if action == 'create_user':
             # Extract minimal required user details
             email = body['email']
@@ -123,15 +302,7 @@ def lambda_handler(event, context):
             
             # Check if email already exists
             if check_email_exists(email):
-                return {
-                    "statusCode": 400,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                    },
-                    "body": json.dumps({"success": False, "message": "Email already exists!"})
-                }
+                return json_response(400, {"success": False, "message": "Email already exists!"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
             
             # Generate username from email
             email_prefix = email.split('@')[0]
@@ -157,7 +328,7 @@ def lambda_handler(event, context):
             )
             
             # Create a minimal DynamoDB entry that will be updated on first login
-            table = dynamodb.Table(TABLE_NAME)
+            table = get_table(TABLE_NAME)
             user_id = str(uuid.uuid4())
             now = datetime.utcnow().isoformat()
             
@@ -168,7 +339,7 @@ def lambda_handler(event, context):
                     'email': email,
                     'firstName': "",  # Will be filled in from Google profile
                     'lastName': "",   # Will be filled in from Google profile
-                    'name': "",       # Will be filled in from Google profile
+                    # 'name' is filled in from Google profile; an empty string can't key the role-name index
                     'phone': "",      # Will be filled in from Google profile if available
                     'role': user_role,
                     'createdAt': now,
@@ -182,40 +353,39 @@ def lambda_handler(event, context):
             elif user_role == 'student' and STUDENT_SNS_TOPIC_ARN:
                 subscribe_student_to_sns(email)
             
-            return {
-                "statusCode": 201,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                },
-                "body": json.dumps({
-                    "success": True,
-                    "message": f"User created successfully. An invitation has been sent to {email} to sign in with Google.",
-                    "username": username,
-                    "userId": user_id
-                })
-            }
+            return json_response(201, {
+                "success": True,
+                "message": f"User created successfully. An invitation has been sent to {email} to sign in with Google.",
+                "username": username,
+                "userId": user_id
+            }, event, CORS_METHODS, CORS_ALLOW_HEADERS)
             
+        elif action == 'bulk_create_users':
+            csv_text = body.get('csv')
+            if not csv_text:
+                return json_response(400, {"success": False, "message": "Missing csv"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+            header = start_bulk_job(csv_text)
+            return bulk_job_response(event, *run_bulk_job(header['jobId'], context, started))
+
+        elif action == 'resume_bulk_job':
+            if not body.get('jobId'):
+                return json_response(400, {"success": False, "message": "Missing jobId"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+            return bulk_job_response(event, *run_bulk_job(body['jobId'], context, started))
+
+        elif action == 'bulk_job_status':
+            if not body.get('jobId'):
+                return json_response(400, {"success": False, "message": "Missing jobId"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+            try:
+                report = get_job_report(body['jobId'], body.get('nextToken'))
+            except ValueError:
+                return json_response(400, {"success": False, "message": "Invalid nextToken"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+            if report is None:
+                return json_response(404, {"success": False, "message": "Job not found"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+            return json_response(200, dict(report, success=True), event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
         else:
-            return {
-                "statusCode": 400,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                },
-                "body": json.dumps({"success": False, "message": f"Invalid action: {action}"})
-            }
+            return json_response(400, {"success": False, "message": f"Invalid action: {action}"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
             
     except Exception as e:
         print(f"Error: {str(e)}")
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-            },
-            "body": json.dumps({"success": False, "message": f"An error occurred: {str(e)}"})
-        }
+        return json_response(500, {"success": False, "message": f"An error occurred: {str(e)}"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
@@ -1,27 +1,21 @@
 import json
-import boto3
 import uuid
 import os  # <-- Add this line to import the 'os' module
+from classVersion import VERSION_ATTRIBUTE, bump_classes_version
+from shared.clients import lazy_table
+from shared.responses import json_response
 
 # Initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['CLASSES_TABLE'])  # Replace 'Classes' with your table name
+table = lazy_table(os.environ['CLASSES_TABLE'])  # Replace 'Classes' with your table name
 
-def lambda_handler(event, context):
-    cors_headers = {
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Headers": "Content-Type",
-        "Access-Control-Allow-Methods": "OPTIONS,POST"
-    }
+CORS_METHODS = "OPTIONS,POST"
+CORS_ALLOW_HEADERS = "Content-Type"
 
+def lambda_handler(event, context):
     try:
         # Check if 'body' exists in event
         if 'body' not in event or not event['body']:
-            return {
-                "statusCode": 400,
-                "headers": cors_headers,
-                "body": json.dumps({"success": False, "message": "Request body is missing"})
-            }
+            return json_response(400, {"success": False, "message": "Request body is missing"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
         body = json.loads(event['body'])
 
@@ -31,11 +25,7 @@ def lambda_handler(event, context):
 
         # Validate input data
         if not class_name or not faculty_name:
-            return {
-                "statusCode": 400,
-                "headers": cors_headers,
-                "body": json.dumps({"success": False, "message": "Class name and faculty name are required"})
-            }
+            return json_response(400, {"success": False, "message": "Class name and faculty name are required"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
         # Generate a unique ID for the class
         class_id = str(uuid.uuid4())
@@ -46,22 +36,16 @@ def lambda_handler(event, context):
             'name': class_name,
             'faculty': faculty_name,
             'members': 0,
-            'lastActive': 'Just created'
+            'lastActive': 'Just created',
+            VERSION_ATTRIBUTE: 1
         }
 
         # Insert the item into DynamoDB
         table.put_item(Item=class_item)
+        bump_classes_version()
 
-        return {
-            "statusCode": 200,
-            "headers": cors_headers,
-            "body": json.dumps({"success": True, "message": "Class added successfully", "class": class_item})
-        }
+        return json_response(200, {"success": True, "message": "Class added successfully", "class": class_item}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
     except Exception as e:
         print(f"Error processing request: {str(e)}")
-        return {
-            "statusCode": 500,
-            "headers": cors_headers,
-            "body": json.dumps({"success": False, "message": f"Internal server error: {str(e)}"})
-        }
\ No newline at end of file
+        return json_response(500, {"success": False, "message": f"Internal server error: {str(e)}"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
\ No newline at end of file
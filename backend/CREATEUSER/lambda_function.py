@@ -1,15 +1,13 @@
-import boto3
 import os
 import json
-import hmac
-import hashlib
-import base64
 import uuid
 from datetime import datetime
+from shared.clients import get_table, lazy_client
+from shared.auth import calculate_secret_hash
+from shared.responses import json_response
 
 # Initialize AWS services
-cognito = boto3.client('cognito-idp')
-dynamodb = boto3.resource('dynamodb')
+cognito = lazy_client('cognito-idp')
 
 # Environment variables
 USER_POOL_ID = os.environ['USER_POOL_ID']
@@ -17,12 +15,7 @@ TABLE_NAME = os.environ['USER_TABLE']
 COGNITO_CLIENT_ID = os.environ['COGNITO_CLIENT_ID']
 COGNITO_CLIENT_SECRET = os.environ['COGNITO_CLIENT_SECRET']
 
-def calculate_secret_hash(username):
-    """Calculate the SECRET_HASH required for Cognito API calls."""
-    message = username + COGNITO_CLIENT_ID
-    secret = bytes(COGNITO_CLIENT_SECRET, 'utf-8')
-    dig = hmac.new(secret, msg=message.encode('utf-8'), digestmod=hashlib.sha256).digest()
-    return base64.b64encode(dig).decode()
+CORS_METHODS = "OPTIONS,POST,GET"
 
 def check_email_exists(email):
     """Check if a user with the given email already exists in Cognito."""
@@ -66,15 +59,7 @@ def lambda_handler(event, context):
 
             # Check if email already exists
             if check_email_exists(email):
-                return {
-                    "statusCode": 400,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                    },
-                    "body": json.dumps({"success": False, "message": "Email already exists!"})
-                }
+                return json_response(400, {"success": False, "message": "Email already exists!"}, event, CORS_METHODS)
 
             # Generate unique username
             username = f"{first_name.lower()}.{last_name.lower()}{uuid.uuid4().hex[:6]}"
@@ -95,15 +80,7 @@ def lambda_handler(event, context):
                 ]
             )
 
-            return {
-                "statusCode": 201,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                },
-                "body": json.dumps({"success": True, "message": "Sign-up successful! Check your email for verification.", "username": username})
-            }
+            return json_response(201, {"success": True, "message": "Sign-up successful! Check your email for verification.", "username": username}, event, CORS_METHODS)
 
         elif action == 'confirm':
             # Confirm user account using the verification code
@@ -121,15 +98,7 @@ def lambda_handler(event, context):
             # Fetch user details from Cognito
             user_attributes = get_user_attributes(username)
             if not user_attributes:
-                return {
-                    "statusCode": 500,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                    },
-                    "body": json.dumps({"success": False, "message": "Failed to fetch user details."})
-                }
+                return json_response(500, {"success": False, "message": "Failed to fetch user details."}, event, CORS_METHODS)
 
             # Extract details
             email = user_attributes.get('email')
@@ -145,7 +114,7 @@ def lambda_handler(event, context):
             )
 #
             # Store user details in DynamoDB
-            table = dynamodb.Table(TABLE_NAME)
+            table = get_table(TABLE_NAME)
             user_id = str(uuid.uuid4())  # Generate new UUID
             now = datetime.utcnow().isoformat()
 
@@ -163,15 +132,7 @@ def lambda_handler(event, context):
                 }
             )
 
-            return {
-                "statusCode": 200,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                },
-                "body": json.dumps({"success": True, "message": "Account verified successfully!", "redirect": "/login"})
-            }
+            return json_response(200, {"success": True, "message": "Account verified successfully!", "redirect": "/login"}, event, CORS_METHODS)
 
         elif action == 'resend_verification':
             # Resend the verification code
@@ -183,67 +144,19 @@ def lambda_handler(event, context):
                 SecretHash=calculate_secret_hash(username)
             )
 
-            return {
-                "statusCode": 200,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                },
-                "body": json.dumps({"success": True, "message": "Verification code resent successfully."})
-            }
+            return json_response(200, {"success": True, "message": "Verification code resent successfully."}, event, CORS_METHODS)
 
         else:
-            return {
-                "statusCode": 400,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                },
-                "body": json.dumps({"success": False, "message": f"Invalid action: {action}"})
-            }
+            return json_response(400, {"success": False, "message": f"Invalid action: {action}"}, event, CORS_METHODS)
 
     except cognito.exceptions.CodeMismatchException:
-        return {
-            "statusCode": 400,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-            },
-            "body": json.dumps({"success": False, "message": "Invalid verification code."})
-        }
+        return json_response(400, {"success": False, "message": "Invalid verification code."}, event, CORS_METHODS)
 
     except cognito.exceptions.ExpiredCodeException:
-        return {
-            "statusCode": 400,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-            },
-            "body": json.dumps({"success": False, "message": "Verification code expired."})
-        }
+        return json_response(400, {"success": False, "message": "Verification code expired."}, event, CORS_METHODS)
 
     except cognito.exceptions.UserNotFoundException:
-        return {
-            "statusCode": 404,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-            },
-            "body": json.dumps({"success": False, "message": "User not found. Please sign up first."})
-        }
+        return json_response(404, {"success": False, "message": "User not found. Please sign up first."}, event, CORS_METHODS)
 
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-            },
-            "body": json.dumps({"success": False, "message": f"An error occurred: {str(e)}"})
-        }
+        return json_response(500, {"success": False, "message": f"An error occurred: {str(e)}"}, event, CORS_METHODS)
@@ -1,30 +1,23 @@
 import json
-import boto3
 import os
-
-dynamodb = boto3.resource('dynamodb')
+from membershipIndex import remove_membership, refresh_class_routes, invalidate_active_members
+from classRoster import RosterConflictError, remove_roster_member
+from classVersion import bump_classes_version
+from shared.clients import lazy_table
+from shared.responses import json_response
 
 # Get table name from environment variables
 CLS_TABLE_NAME = os.environ.get('CLS_TABLE')
-table = dynamodb.Table(CLS_TABLE_NAME)
+table = lazy_table(CLS_TABLE_NAME)
 
-def lambda_handler(event, context):
-    # CORS headers
-    headers = {
-        "Content-Type": "application/json",
-        "Access-Control-Allow-Origin": "*",  # Allow all origins
-        "Access-Control-Allow-Methods": "POST, OPTIONS",  # Allow POST and OPTIONS
-        "Access-Control-Allow-Headers": "Content-Type"  # Allow Content-Type header
-    }
+CORS_METHODS = "POST, OPTIONS"
+CORS_ALLOW_HEADERS = "Content-Type"
 
+def lambda_handler(event, context):
     try:
         # Handle preflight request (CORS)
         if event.get("httpMethod") == "OPTIONS":
-            return {
-                "statusCode": 200,
-                "headers": headers,
-                "body": json.dumps({"message": "CORS preflight request successful"})
-            }
+            return json_response(200, {"message": "CORS preflight request successful"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
         # Parse request body
         body = json.loads(event.get("body", "{}"))
@@ -32,59 +25,34 @@ def lambda_handler(event, context):
         faculty = body.get("faculty")
 
         if not class_id or not faculty:
-            return {
-                "statusCode": 400,
-                "headers": headers,
-                "body": json.dumps({"message": "Missing classId or faculty in request body"})
-            }
+            return json_response(400, {"message": "Missing classId or faculty in request body"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
-        # Fetch current class data
-        response = table.get_item(Key={"classId": class_id})
-        class_data = response.get("Item")
+        # Remove the faculty in place, without rewriting the rest of the list
+        try:
+            class_data, removed = remove_roster_member(table, class_id, 'faculty', faculty)
+        except RosterConflictError as e:
+            print(str(e))
+            return json_response(409, {"message": "The class roster changed concurrently, please retry"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
         if not class_data:
-            return {
-                "statusCode": 404,
-                "headers": headers,
-                "body": json.dumps({"message": "Class not found"})
-            }
+            return json_response(404, {"message": "Class not found"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
+        if not removed:
+            return json_response(404, {"message": "Faculty not found in class"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
-        # Get current faculty list and remove the specified faculty
         faculty_list = class_data.get("facultyList", [])
-        
-        if faculty not in faculty_list:
-            return {
-                "statusCode": 404,
-                "headers": headers,
-                "body": json.dumps({"message": "Faculty not found in class"})
-            }
-        
-        # Remove the faculty from the list
-        faculty_list.remove(faculty)
-        
-        # Update the class item in DynamoDB
-        table.update_item(
-            Key={"classId": class_id},
-            UpdateExpression="SET facultyList = :facultyList",
-            ExpressionAttributeValues={
-                ":facultyList": faculty_list
-            },
-            ReturnValues="UPDATED_NEW"
-        )
 
-        return {
-            "statusCode": 200,
-            "headers": headers,
-            "body": json.dumps({
-                "message": "Faculty removed successfully",
-                "facultyList": faculty_list
-            })
-        }
+        # Keep the membership index in sync with the roster
+        remove_membership(faculty, class_id, 'faculty')
+        refresh_class_routes(class_id, class_data.get("name"), faculty_list, class_data.get("studentsList", []))
+        invalidate_active_members()
+        bump_classes_version()
+
+        return json_response(200, {
+            "message": "Faculty removed successfully",
+            "facultyList": faculty_list
+        }, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
     except Exception as e:
         print(f"Lambda Error: {str(e)}")
-        return {
-            "statusCode": 500,
-            "headers": headers,
-            "body": json.dumps({"message": f"Internal server error: {str(e)}"})
-        }
+        return json_response(500, {"message": f"Internal server error: {str(e)}"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
@@ -1,101 +1,152 @@
 import json
-import boto3
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from membershipIndex import get_student_routes, get_roster_version
+from emergencyDedup import (ALERT, UPDATE, ping_id, claim_alert, release_alert, due_updates,
+                            episode_class_id, claim_pending_update)
+from shared.clients import lazy_client
+from shared.names import normalize_name
 
 # Initialize AWS services
 '''dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
 sns = boto3.client('sns', region_name='us-east-1')'''
 
 
-dynamodb = boto3.resource('dynamodb')
-sns = boto3.client('sns')
+sns = lazy_client('sns')
 
-def normalize_name(name):
-    """Standardize faculty name formatting for consistent SNS filtering"""
-    if not name:
-        return ""
-    # Remove any special characters, keep only alphanumeric and spaces
-    clean_name = ''.join(c for c in name if c.isalnum() or c == ' ')
-    # Replace spaces with hyphens
-    return clean_name.replace(' ', '-')
+ROUTE_CACHE_TTL = int(os.environ.get('ROUTE_CACHE_TTL', '300'))  # seconds a warm container trusts a student's routes
+ROUTE_LOOKUP_WORKERS = int(os.environ.get('ROUTE_LOOKUP_WORKERS', '8'))
 
-def lambda_handler(event, context):
-    print("Event received:", json.dumps(event))
+# student name -> (routes, loaded_at), kept across warm invocations and dropped
+# whenever a roster writer bumps the roster version
+route_cache = {
+    'version': None,
+    'routes': {}
+}
 
-    try:
-        # Process DynamoDB Stream records
-        for record in event['Records']:
-            if record['eventName'] == 'INSERT' or record['eventName'] == 'MODIFY':
-                new_image = record['dynamodb']['NewImage']
-
-                # Check if the emergency column is set to true
-                if new_image.get('emergency', {}).get('BOOL', False):
-                    # Extract user name and other details
-                    user_name = new_image.get('name', {}).get('S')
-                    latitude = new_image.get('latitude', {}).get('N')
-                    longitude = new_image.get('longitude', {}).get('N')
-                    address = new_image.get('address', {}).get('S')
-                    emergency_details = new_image.get('emergencyDetails', {}).get('S', 'No details provided')
-
-                    print(f"Processing emergency for user: {user_name}, at location: {latitude}, {longitude}")
-
-                    # Retrieve Classes Trips table name from environment variable
-                    classes_trips_table_name = os.environ.get('CLASSES_TRIPS_TABLE', 'ClassesTrips')
-                    classes_trips_table = dynamodb.Table(classes_trips_table_name)
-
-                    # Scan for class/trip containing the user in studentsList
-                    scan_kwargs = {
-                        'FilterExpression': 'contains(studentsList, :user)',
-                        'ExpressionAttributeValues': {':user': user_name}
-                    }
-
-                    print(f"Scanning {classes_trips_table_name} for student: {user_name}")
-                    classes_response = classes_trips_table.scan(**scan_kwargs)
-
-                    if 'Items' not in classes_response or len(classes_response['Items']) == 0:
-                        print(f"No class/trip found for student: {user_name}")
-                        continue  # Skip to next record
-
-                    print(f"Found {len(classes_response['Items'])} class(es)/trip(s) for student: {user_name}")
-
-                    # Iterate through each class/trip found for this student
-                    for class_trip in classes_response['Items']:
-                        faculty_list = class_trip.get('facultyList', [])
-                        class_id = class_trip.get('classId')
-                        # Revert back to className to see if it sends
-                        class_name = class_trip.get('name', 'Unknown Class')
-
-                        print(f"Processing class: {class_name} (ID: {class_id})")
-
-                        # Handle both array and string formats for faculty list
-                        if isinstance(faculty_list, str):
-                            faculty_list = [f.strip() for f in faculty_list.split(',')]
-                        
-                        print(f"Faculty list: {faculty_list}")
-
-                        if not faculty_list:
-                            print(f"No faculty members found for classId: {class_id}")
-                            continue
-
-                        # Construct the message for the emergency alert
-                        message_body = {
-                            "alert": {
-                                "student": user_name,
-                                "className": class_name,
-                                "classId": class_id,
-                                "location": {
-                                    "address": address,
-                                    "latitude": latitude,
-                                    "longitude": longitude
-                                },
-                                "emergencyDetails": emergency_details
-                            },
-                            "targetFaculty": faculty_list  # This will be used for message filtering
-                        }
-                        
-                        # Format the message for human reading
-                        human_readable_message = f"""
-                        🚨 Emergency Alert 🚨
+def sync_route_cache():
+    """Drop every cached route if the rosters changed since the cache was filled"""
+    version = get_roster_version()
+    if route_cache['version'] != version:
+        route_cache['routes'] = {}
+        route_cache['version'] = version
+
+def get_routes(user_name):
+    """Classes and faculty to alert for a student, from the warm cache when possible"""
+    cached = route_cache['routes'].get(user_name)
+    if cached and time.time() - cached[1] <= ROUTE_CACHE_TTL:
+        return cached[0]
+
+    routes = get_student_routes(user_name)
+    route_cache['routes'][user_name] = (routes, time.time())
+    return routes
+
+def get_routes_for(user_names):
+    """Resolve the routes of every student in a batch at once, looking up cache misses concurrently"""
+    user_names = list(user_names)
+    if len(user_names) <= 1:
+        return {user_name: get_routes(user_name) for user_name in user_names}
+
+    with ThreadPoolExecutor(max_workers=min(ROUTE_LOOKUP_WORKERS, len(user_names))) as executor:
+        return dict(zip(user_names, executor.map(get_routes, user_names)))
+
+def ping_timestamp(new_image):
+    return int(new_image.get('timestamp', {}).get('N', 0))
+
+def collect_emergencies(records):
+    """
+    Group the emergency pings of a stream batch by student.
+    Repeated INSERT/MODIFY records of the same ping (id, timestamp) collapse into
+    the newest image. Returns {student: {'ping': newest image, 'sequence_numbers': [...]}}.
+    """
+    pings = {}
+
+    for record in records:
+        sequence_number = record.get('dynamodb', {}).get('SequenceNumber')
+        try:
+            if record['eventName'] not in ('INSERT', 'MODIFY'):
+                print(f"Record event was not INSERT or MODIFY: {record['eventName']}")
+                continue
+
+            new_image = record['dynamodb']['NewImage']
+            # Check if the emergency column is set to true
+            if not new_image.get('emergency', {}).get('BOOL', False):
+                continue
+
+            ping_key = (new_image.get('id', {}).get('S'), new_image.get('timestamp', {}).get('N'))
+            if ping_key in pings:
+                # Later records of the same ping carry the newer image
+                pings[ping_key]['image'] = new_image
+                pings[ping_key]['sequence_numbers'].append(sequence_number)
+            else:
+                pings[ping_key] = {'image': new_image, 'sequence_numbers': [sequence_number]}
+        except Exception as e:
+            # A malformed record would fail again on every retry and block the shard
+            print(f"Skipping malformed stream record {sequence_number}: {str(e)}")
+
+    emergencies = {}
+    for ping in pings.values():
+        user_name = ping['image'].get('name', {}).get('S')
+        if not user_name:
+            print(f"Emergency record without a student name: {ping['sequence_numbers']}")
+            continue
+        emergency = emergencies.setdefault(user_name, {'ping': None, 'sequence_numbers': []})
+        emergency['sequence_numbers'].extend(ping['sequence_numbers'])
+        # Alert with the student's most recent ping of the batch
+        if emergency['ping'] is None or ping_timestamp(ping['image']) >= ping_timestamp(emergency['ping']):
+            emergency['ping'] = ping['image']
+
+    return emergencies
+
+def publish_alert(user_name, new_image, class_trip, faculty_topic_arn, suppressed_updates=None):
+    """
+    Publish one emergency alert for a student's class/trip to the faculty topic.
+    With suppressed_updates set, it is sent as an "update" to an alert already
+    delivered, folding in that many suppressed repeats.
+    """
+    latitude = new_image.get('latitude', {}).get('N')
+    longitude = new_image.get('longitude', {}).get('N')
+    address = new_image.get('address', {}).get('S')
+    emergency_details = new_image.get('emergencyDetails', {}).get('S', 'No details provided')
+
+    faculty_list = class_trip.get('facultyList', [])
+    class_id = class_trip.get('classId')
+    # Revert back to className to see if it sends
+    class_name = class_trip.get('name', 'Unknown Class')
+
+    print(f"Processing class: {class_name} (ID: {class_id})")
+
+    # Handle both array and string formats for faculty list
+    if isinstance(faculty_list, str):
+        faculty_list = [f.strip() for f in faculty_list.split(',')]
+
+    if not faculty_list:
+        print(f"No faculty members found for classId: {class_id}")
+        return
+
+    # Construct the message for the emergency alert
+    message_body = {
+        "alert": {
+            "student": user_name,
+            "className": class_name,
+            "classId": class_id,
+            "location": {
+                "address": address,
+                "latitude": latitude,
+                "longitude": longitude
+            },
+            "emergencyDetails": emergency_details
+        },
+        "type": "update" if suppressed_updates is not None else "alert",
+        "suppressedUpdates": suppressed_updates or 0,
+        "targetFaculty": faculty_list  # This will be used for message filtering
+    }
+
+    # Format the message for human reading
+    title = "Emergency Update" if suppressed_updates is not None else "Emergency Alert"
+    human_readable_message = f"""
+                        🚨 {title} 🚨
 
                         Student: {user_name}
                         Class: {class_name}
@@ -105,77 +156,158 @@ def lambda_handler(event, context):
 
                         Please take immediate action!
                         """
+    if suppressed_updates:
+        human_readable_message += f"\n{suppressed_updates} further update(s) were received since the last alert.\n"
 
-                        # Publish the message to the SNS topic with message attributes for filtering
-                        faculty_topic_arn = os.environ.get('FACULTY_TOPIC_ARN')
-                        if not faculty_topic_arn:
-                            print("ERROR: Missing FACULTY_TOPIC_ARN environment variable")
-                            continue
-                            
-                        print(f"Using SNS Topic ARN: {faculty_topic_arn}")
-                        
-                        # Create message attributes for filtering
-                        message_attributes = {}
-                        
-                        # Create a single attribute that applies to all recipients
-                        # This ensures message gets published even if specific faculty filters fail
-                        message_attributes["all-faculty"] = {
-                            'DataType': 'String',
-                            'StringValue': 'true'
-                        }
-                        
-                        # Add individual faculty filters
-                        for faculty in faculty_list:
-                            try:
-                                normalized_faculty = normalize_name(faculty)
-                                if normalized_faculty:
-                                    attr_key = f"faculty-{normalized_faculty}"
-                                    print(f"Adding message attribute: {attr_key}")
-                                    message_attributes[attr_key] = {
-                                        'DataType': 'String',
-                                        'StringValue': 'true'
-                                    }
-                            except Exception as e:
-                                print(f"Error processing faculty name '{faculty}': {str(e)}")
-                        
-                        try:
-                            # ADDED LOGGING HERE
-                            print(f"About to publish to SNS. class_name: {class_name}, user_name: {user_name}")
-                            response = sns.publish(
-                                TopicArn=faculty_topic_arn,
-                                Message=json.dumps({
-                                    "default": json.dumps(message_body),
-                                    "email": human_readable_message
-                                }),
-                                Subject=f"Emergency Alert - {user_name} in {class_name}",
-                                MessageStructure='json',
-                                MessageAttributes=message_attributes
-                            )
-                            print(f"SNS publish successful. MessageId: {response.get('MessageId')}")
-                        except Exception as sns_error:
-                            print(f"Error sending SNS message: {str(sns_error)}")
-                            # Continue processing other classes even if this one fails...
-            else:
-                print(f"Record event was not INSERT or MODIFY: {record['eventName']}")
-
-        return {
-            'statusCode': 200,
-            'body': json.dumps({'message': 'Successfully processed emergency alerts'}),
-            'headers': {
-                'Content-Type': 'application/json'
-            }
+    # Create a single attribute that applies to all recipients
+    # This ensures message gets published even if specific faculty filters fail
+    message_attributes = {
+        "all-faculty": {
+            'DataType': 'String',
+            'StringValue': 'true'
         }
+    }
 
-    except Exception as e:
-        print(f"An error occurred: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
-        return {
-            'statusCode': 500,
-            'body': json.dumps({'message': f'Error processing emergency alerts: {str(e)}'}),
-            'headers': {
-                'Content-Type': 'application/json'
+    # Add individual faculty filters
+    for faculty in faculty_list:
+        normalized_faculty = normalize_name(faculty)
+        if normalized_faculty:
+            message_attributes[f"faculty-{normalized_faculty}"] = {
+                'DataType': 'String',
+                'StringValue': 'true'
             }
-        }
 
+    response = sns.publish(
+        TopicArn=faculty_topic_arn,
+        Message=json.dumps({
+            "default": json.dumps(message_body),
+            "email": human_readable_message
+        }),
+        Subject=f"{title} - {user_name} in {class_name}",
+        MessageStructure='json',
+        MessageAttributes=message_attributes
+    )
+    print(f"SNS publish successful. MessageId: {response.get('MessageId')}")
+
+def alert_class(user_name, new_image, class_trip, faculty_topic_arn):
+    """
+    Claim and publish the alert of one emergency ping for one class. Repeat pings
+    inside the alert window are recorded, not re-sent, and a stream retry only
+    reaches the classes whose publish failed: their claim is released, the
+    others recognise the ping as handled.
+    """
+    class_id = class_trip.get('classId')
+    decision, claim = claim_alert(user_name, class_id, ping_id(new_image), new_image)
+    if decision not in (ALERT, UPDATE):
+        print(f"Emergency alert for {user_name} in class {class_id}: {decision}")
+        return
+
+    print(f"Processing emergency {decision} for user: {user_name} in class {class_id}")
+    try:
+        publish_alert(user_name, new_image, class_trip, faculty_topic_arn,
+                      None if decision == ALERT else claim['suppressedCount'])
+    except Exception:
+        release_alert(user_name, class_id, claim)
+        raise
+
+def flush_pending_updates(faculty_topic_arn):
+    """
+    Scheduled run: send the update of every episode whose suppressed pings are
+    due and that no later ping has sent, with the latest suppressed ping. A failed
+    publish is released and picked up again by the next run.
+    """
+    due = due_updates()
+    sent = failed = 0
+    if due:
+        sync_route_cache()
+
+    for key in due:
+        user_name = key['studentName']
+        class_id = episode_class_id(key['episodeId'])
+        try:
+            pending_ping, claim = claim_pending_update(user_name, class_id)
+            if claim is None:
+                continue
+
+            class_trip = next((route for route in get_routes(user_name) if route.get('classId') == class_id), None)
+            if class_trip is None:
+                print(f"Dropping pending emergency update for {user_name}: no longer in class {class_id}")
+                continue
+
+            try:
+                publish_alert(user_name, pending_ping, class_trip, faculty_topic_arn, claim['suppressedCount'])
+                sent += 1
+            except Exception:
+                release_alert(user_name, class_id, claim)
+                raise
+        except Exception as e:
+            print(f"Error sending pending emergency update for {user_name} in class {class_id}: {str(e)}")
+            failed += 1
+
+    print(f"Flushed pending emergency updates: {sent} sent, {failed} failed of {len(due)} due")
+    return {'due': len(due), 'sent': sent, 'failed': failed}
+
+def lambda_handler(event, context):
+    """
+    Stream handler with partial batch responses: only the records of students whose
+    alert could not be published are reported in batchItemFailures and retried.
+    The EventBridge schedule invokes it to flush pending updates instead.
+    """
+    if event.get('source') == 'aws.events':
+        faculty_topic_arn = os.environ.get('FACULTY_TOPIC_ARN')
+        if not faculty_topic_arn:
+            raise ValueError("Missing FACULTY_TOPIC_ARN environment variable")
+        return flush_pending_updates(faculty_topic_arn)
+
+    records = event.get('Records', [])
+    print(f"Received {len(records)} stream records")
+
+    emergencies = collect_emergencies(records)
+    failed_sequence_numbers = []
+
+    if emergencies:
+        faculty_topic_arn = os.environ.get('FACULTY_TOPIC_ARN')
+        try:
+            if not faculty_topic_arn:
+                raise ValueError("Missing FACULTY_TOPIC_ARN environment variable")
+
+            # One roster version check per batch keeps the cached routes current
+            sync_route_cache()
+            routes_by_student = get_routes_for(emergencies.keys())
+        except Exception as e:
+            print(f"Error resolving emergency routes: {str(e)}")
+            routes_by_student = None
+
+        for user_name, emergency in emergencies.items():
+            try:
+                if routes_by_student is None:
+                    raise RuntimeError("Emergency routes unavailable")
+
+                student_classes = routes_by_student.get(user_name) or []
+                if not student_classes:
+                    print(f"No class/trip found for student: {user_name}")
+                    continue
+
+                publish_errors = []
+                for class_trip in student_classes:
+                    # Keep alerting the other classes even if this one fails
+                    try:
+                        alert_class(user_name, emergency['ping'], class_trip, faculty_topic_arn)
+                    except Exception as sns_error:
+                        print(f"Error sending SNS message: {str(sns_error)}")
+                        publish_errors.append(sns_error)
+                if publish_errors:
+                    raise publish_errors[0]
+            except Exception as e:
+                print(f"Error sending emergency alert for {user_name}: {str(e)}")
+                failed_sequence_numbers.extend(emergency['sequence_numbers'])
+
+    failed_sequence_numbers = [number for number in failed_sequence_numbers if number]
+    if failed_sequence_numbers:
+        # Streams checkpoint before the lowest reported sequence number and retry from there
+        failed_sequence_numbers = [min(failed_sequence_numbers, key=int)]
+        print(f"Reporting batch item failure at sequence number {failed_sequence_numbers[0]}")
 
+    return {
+        'batchItemFailures': [{'itemIdentifier': number} for number in failed_sequence_numbers]
+    }
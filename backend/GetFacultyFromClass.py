@@ -1,66 +1,53 @@
 import json
-import boto3
 import os
-
-dynamodb = boto3.resource('dynamodb')
+from classVersion import VERSION_ATTRIBUTE, class_etag, matching_class_etag
+from shared.clients import lazy_table
+from shared.responses import json_response, not_modified_response
 
 # Get table name from environment variables
 CLS_TABLE_NAME = os.environ.get('CLS_TABLE')
-table = dynamodb.Table(CLS_TABLE_NAME)
+table = lazy_table(CLS_TABLE_NAME)
 
-def lambda_handler(event, context):
-    # CORS headers
-    headers = {
-        "Content-Type": "application/json",
-        "Access-Control-Allow-Origin": "*",  # Allow all origins
-        "Access-Control-Allow-Methods": "POST, OPTIONS",  # Allow POST and OPTIONS
-        "Access-Control-Allow-Headers": "Content-Type"  # Allow Content-Type header
-    }
+# CORS: allow POST and OPTIONS with Content-Type and conditional (If-None-Match) requests
+CORS_METHODS = "POST, OPTIONS"
+CORS_ALLOW_HEADERS = "Content-Type, If-None-Match"
 
+def lambda_handler(event, context):
     try:
         # Handle preflight request (CORS)
         if event.get("httpMethod") == "OPTIONS":
-            return {
-                "statusCode": 200,
-                "headers": headers,
-                "body": json.dumps({"message": "CORS preflight request successful"})
-            }
+            return json_response(200, {"message": "CORS preflight request successful"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
         # Parse request body
         body = json.loads(event.get("body", "{}"))
         class_id = body.get("classId")
 
         if not class_id:
-            return {
-                "statusCode": 400,
-                "headers": headers,
-                "body": json.dumps({"message": "Missing classId in request body"})
-            }
+            return json_response(400, {"message": "Missing classId in request body"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
+        # A dashboard poll that already holds the current version gets a 304
+        # after a key-only read, without fetching or serializing the roster
+        etag = matching_class_etag(event, table, "faculty", class_id)
+        if etag:
+            return not_modified_response(etag, CORS_METHODS, CORS_ALLOW_HEADERS)
 
         # Fetch class details from DynamoDB
-        response = table.get_item(Key={"classId": class_id})
+        response = table.get_item(
+            Key={"classId": class_id},
+            ProjectionExpression="facultyList, #version",
+            ExpressionAttributeNames={"#version": VERSION_ATTRIBUTE}
+        )
         class_data = response.get("Item")
 
         if not class_data:
-            return {
-                "statusCode": 404,
-                "headers": headers,
-                "body": json.dumps({"message": "Class not found"})
-            }
+            return json_response(404, {"message": "Class not found"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
         # Extract faculty list
         faculty_list = class_data.get("facultyList", [])
 
-        return {
-            "statusCode": 200,
-            "headers": headers,
-            "body": json.dumps({"facultyList": faculty_list})
-        }
+        etag = class_etag("faculty", class_id, class_data.get(VERSION_ATTRIBUTE, 0))
+        return json_response(200, {"facultyList": faculty_list}, event, CORS_METHODS, CORS_ALLOW_HEADERS, etag=etag)
 
     except Exception as e:
         print(f"Lambda Error: {str(e)}")
-        return {
-            "statusCode": 500,
-            "headers": headers,
-            "body": json.dumps({"message": "Internal server error"})
-        }
+        return json_response(500, {"message": "Internal server error"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
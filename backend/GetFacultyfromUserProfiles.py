@@ -56,13 +56,12 @@ def lambda_handler(event, context):
         }'''
 
 
-import json
-import boto3
 import os
-from boto3.dynamodb.conditions import Attr
-
-# Initialize DynamoDB resource
-dynamodb = boto3.resource('dynamodb')
+from tableScan import scan_pages
+from userIndex import check_index_key, list_role_members
+from shared.clients import lazy_table
+from shared.pagination import encode_token, page_params
+from shared.responses import json_response
 
 # Ensure the environment variables are set
 USER_TABLE_NAME = os.environ.get('USERS_TABLE')
@@ -71,72 +70,56 @@ TRIP_TABLE_NAME = os.environ.get('TRIP_TABLE')
 if not USER_TABLE_NAME or not TRIP_TABLE_NAME:
     raise ValueError("Environment variables USERS_TABLE or TRIP_TABLE are not set")
 
-user_table = dynamodb.Table(USER_TABLE_NAME)
-trip_table = dynamodb.Table(TRIP_TABLE_NAME)
+user_table = lazy_table(USER_TABLE_NAME)
+trip_table = lazy_table(TRIP_TABLE_NAME)
+
+MAX_PAGE_SIZE = 500
+
+CORS_METHODS = "OPTIONS,GET,POST"
+CORS_ALLOW_HEADERS = "Content-Type,Authorization"
+
+def get_assigned_faculty():
+    """Names of every faculty member already part of a trip (every page, facultyList only)"""
+    existing_faculty_in_trips = set()
+    for trips in scan_pages(trip_table, attributes=['facultyList']):
+        for trip in trips:
+            # Collect all faculty in each trip's facultyList
+            for faculty_member in trip.get('facultyList', []):
+                # Check if the faculty member is a dictionary and extract the name correctly
+                if isinstance(faculty_member, dict):
+                    # Assuming the faculty member is stored as a dictionary with a key 'S'
+                    faculty_name = faculty_member.get('S')
+                else:
+                    # If it's a simple string, assume it's the faculty's name
+                    faculty_name = faculty_member
+
+                if faculty_name:
+                    existing_faculty_in_trips.add(faculty_name)
+    return existing_faculty_in_trips
 
 def lambda_handler(event, context):
     try:
-        faculty = []
-        last_evaluated_key = None
-        existing_faculty_in_trips = set()
-
-        # Fetch all faculty already part of a trip (using pagination)
-        while True:
-            trip_response = trip_table.scan()
-            for trip in trip_response.get('Items', []):
-                # Collect all faculty in each trip's facultyList
-                for faculty_member in trip.get('facultyList', []):
-                    # Check if the faculty member is a dictionary and extract the name correctly
-                    if isinstance(faculty_member, dict):
-                        # Assuming the faculty member is stored as a dictionary with a key 'S'
-                        faculty_name = faculty_member.get('S')
-                    else:
-                        # If it's a simple string, assume it's the faculty's name
-                        faculty_name = faculty_member
-                    
-                    if faculty_name:
-                        existing_faculty_in_trips.add(faculty_name)
-        
-            last_evaluated_key = trip_response.get('LastEvaluatedKey')
-            if not last_evaluated_key:
-                break  # No more pages of trips
-
-        # Paginate through all users and filter out faculty already part of a trip
-        while True:
-            scan_kwargs = {
-                "FilterExpression": Attr('role').eq('faculty')
+        try:
+            paginated, limit, start_key = page_params(event, MAX_PAGE_SIZE)
+            if start_key:
+                check_index_key(start_key)
+        except ValueError:
+            return json_response(400, {'error': 'Invalid limit or nextToken'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
+        # Fetch all faculty already part of a trip, then walk the faculty (role index) past them
+        existing_faculty_in_trips = get_assigned_faculty()
+        faculty, next_key = list_role_members(user_table, 'faculty', existing_faculty_in_trips, start_key, limit)
+
+        if paginated:
+            body = {
+                'faculty': faculty,
+                'nextToken': encode_token(next_key) if next_key else None
             }
-            if last_evaluated_key:
-                scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
+        else:
+            body = faculty
 
-            response = user_table.scan(**scan_kwargs)
-            for faculty_member in response.get('Items', []):
-                faculty_name = faculty_member.get('name')  # Assuming 'name' is the faculty name field
-                if faculty_name not in existing_faculty_in_trips:
-                    faculty.append(faculty_member)
-
-            last_evaluated_key = response.get('LastEvaluatedKey')
-            if not last_evaluated_key:
-                break  # No more pages of users
-
-        return {
-            'statusCode': 200,
-            'headers': {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type,Authorization",
-                "Access-Control-Allow-Methods": "OPTIONS,GET,POST"
-            },
-            'body': json.dumps(faculty, default=str)
-        }
+        return json_response(200, body, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
     except Exception as e:
         print(f"Error fetching faculty: {str(e)}")  # Logs for debugging
-        return {
-            'statusCode': 500,
-            'headers': {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type,Authorization",
-                "Access-Control-Allow-Methods": "OPTIONS,GET,POST"
-            },
-            'body': json.dumps({'error': 'Failed to fetch faculty members not in any trip'})
-        }
+        return json_response(500, {'error': 'Failed to fetch faculty members not in any trip'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
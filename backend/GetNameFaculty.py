@@ -1,30 +1,18 @@
 import json
-import boto3
 import os
-from decimal import Decimal
+from classVersion import VERSION_ATTRIBUTE, class_etag, matching_class_etag
+from shared.clients import lazy_table
+from shared.responses import json_response, not_modified_response, options_response
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['CLASSES_TABLE'])
+table = lazy_table(os.environ['CLASSES_TABLE'])
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return int(obj)
-        return super().default(obj)
+CORS_METHODS = "GET, POST, OPTIONS"
+CORS_ALLOW_HEADERS = "Content-Type, Authorization, If-None-Match"
 
 def lambda_handler(event, context):
     # Handle OPTIONS preflight request
     if event.get('httpMethod') == 'OPTIONS':
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization",
-                "Content-Type": "application/json"
-            },
-            "body": ""
-        }
+        return options_response(CORS_METHODS, CORS_ALLOW_HEADERS)
 
     try:
         # Parse body for POST requests
@@ -34,47 +22,29 @@ def lambda_handler(event, context):
             
             # Handle missing classId
             if not class_id:
-                return {
-                    "statusCode": 400,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",
-                        "Content-Type": "application/json"
-                    },
-                    "body": json.dumps({"error": "classId is required"})
-                }
+                return json_response(400, {"error": "classId is required"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
+            # Dashboard polls holding the current version get a 304 after a key-only read
+            etag = matching_class_etag(event, table, 'name-faculty', class_id)
+            if etag:
+                return not_modified_response(etag, CORS_METHODS, CORS_ALLOW_HEADERS)
 
             # Get item from DynamoDB
-            response = table.get_item(Key={'classId': class_id})
+            response = table.get_item(
+                Key={'classId': class_id},
+                ProjectionExpression='#name, faculty, #version',
+                ExpressionAttributeNames={'#name': 'name', '#version': VERSION_ATTRIBUTE}
+            )
             class_item = response.get('Item', {})
             
-            return {
-                "statusCode": 200,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Content-Type": "application/json"
-                },
-                "body": json.dumps({
-                    "name": class_item.get('name', 'N/A'),
-                    "faculty": class_item.get('faculty', 'N/A')
-                }, cls=DecimalEncoder)
-            }
+            etag = class_etag('name-faculty', class_id, class_item.get(VERSION_ATTRIBUTE, 0))
+            return json_response(200, {
+                "name": class_item.get('name', 'N/A'),
+                "faculty": class_item.get('faculty', 'N/A')
+            }, event, CORS_METHODS, CORS_ALLOW_HEADERS, etag=etag)
 
         # Handle invalid HTTP methods
-        return {
-            "statusCode": 405,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Content-Type": "application/json"
-            },
-            "body": json.dumps({"error": "Method not allowed"})
-        }
+        return json_response(405, {"error": "Method not allowed"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Content-Type": "application/json"
-            },
-            "body": json.dumps({"error": str(e)})
-        }
+        return json_response(500, {"error": str(e)}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
@@ -1,29 +1,17 @@
 import json
-import boto3
 import os
-from boto3.dynamodb.conditions import Key, Attr
+from membershipIndex import get_member_classes
+from shared.responses import json_response
 
-# Initialize the DynamoDB client
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+CORS_METHODS = "OPTIONS,POST,GET"
+CORS_ALLOW_HEADERS = "Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token"
 
 def lambda_handler(event, context):
     print('Event received:', json.dumps(event))
     
-    # Add CORS headers to all responses
-    headers = {
-        "Access-Control-Allow-Origin": "*",  # Allow requests from any origin
-        "Access-Control-Allow-Headers": "Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token",
-        "Access-Control-Allow-Methods": "OPTIONS,POST,GET",
-        "Content-Type": "application/json"
-    }
-    
     # Handle preflight OPTIONS request
     if event.get('httpMethod') == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps({'message': 'CORS preflight request successful'})
-        }
+        return json_response(200, {'message': 'CORS preflight request successful'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
     
     try:
         # Extract user from Authorization header or request body
@@ -45,32 +33,21 @@ def lambda_handler(event, context):
             user_name = event.get('userName')
         
         if not user_name:
-            return {
-                'statusCode': 400,
-                'headers': headers,
-                'body': json.dumps({'message': 'Missing userName parameter'})
-            }
+            return json_response(400, {'message': 'Missing userName parameter'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
         
         # Get the Classes table name from environment variable or use default
         classes_table_name = os.environ.get('CLASSES_TABLE', 'Classes')
-        classes_table = dynamodb.Table(classes_table_name)
         
-        # Scan the table for classes where the user is a member
-        response = classes_table.scan(
-            FilterExpression=Attr('studentsList').contains(user_name) | Attr('facultyList').contains(user_name)
-        )
+        # Look up the classes where the user is a member (student or faculty)
+        member_classes = get_member_classes(user_name, classes_table_name, attributes=['classId', 'studentsList'])
         
-        if not response.get('Items'):
-            return {
-                'statusCode': 404,
-                'headers': headers,
-                'body': json.dumps({'message': 'No classes found for this user'})
-            }
+        if not member_classes:
+            return json_response(404, {'message': 'No classes found for this user'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
         
         # Collect all students from all classes user belongs to
         all_students = set()
         
-        for class_item in response['Items']:
+        for class_item in member_classes:
             if class_item.get('studentsList'):
                 # Handle both string and list types for studentsList
                 students_list = class_item['studentsList']
@@ -93,20 +70,12 @@ def lambda_handler(event, context):
         # Convert set to list of objects for the response
         students = [{'name': student} for student in all_students]
         
-        return {
-            'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps(students)
-        }
+        return json_response(200, students, event, CORS_METHODS, CORS_ALLOW_HEADERS)
         
     except Exception as e:
         print(f"Error: {str(e)}")
         # Add more detailed error logging
         import traceback
         print(traceback.format_exc())
-        return {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({'message': 'Server error', 'error': str(e)})
-        }
+        return json_response(500, {'message': 'Server error', 'error': str(e)}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
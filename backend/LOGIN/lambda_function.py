@@ -1,11 +1,10 @@
-import boto3
 import os
 import json
-import hmac
-import hashlib
-import base64
+from shared.clients import lazy_client
+from shared.auth import calculate_secret_hash
+from shared.responses import json_response
 
-cognito = boto3.client('cognito-idp')
+cognito = lazy_client('cognito-idp')
 
 USER_POOL_ID = os.environ.get('USER_POOL_ID')
 CLIENT_ID = os.environ.get('COGNITO_CLIENT_ID')
@@ -14,12 +13,6 @@ CLIENT_SECRET = os.environ.get('COGNITO_CLIENT_SECRET')
 if not all([USER_POOL_ID, CLIENT_ID, CLIENT_SECRET]):
     raise ValueError("Missing required environment variables")
 
-def calculate_secret_hash(username):
-    message = username + CLIENT_ID
-    secret = bytes(CLIENT_SECRET, 'utf-8')
-    dig = hmac.new(secret, msg=message.encode('utf-8'), digestmod=hashlib.sha256).digest()
-    return base64.b64encode(dig).decode()
-
 def check_user_exists(email):
     try:
         cognito.admin_get_user(UserPoolId=USER_POOL_ID, Username=email)
@@ -46,27 +39,17 @@ def lambda_handler(event, context):
         print(f"Processing {action} request for email: {email}")
         user_exists = check_user_exists(email)
         
-        cors_headers = {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Content-Type",
-            "Access-Control-Allow-Methods": "OPTIONS,POST"
-        }
-        
         if action == 'check':
-            return {
-                "statusCode": 200 if user_exists else 404,
-                "headers": cors_headers,
-                "body": json.dumps({
-                    "success": user_exists,
-                    "message": "User exists" if user_exists else "User not found"
-                })
-            }
+            return json_response(200 if user_exists else 404, {
+                "success": user_exists,
+                "message": "User exists" if user_exists else "User not found"
+            }, event)
             
         elif action == 'login':
             if not user_exists:
-                return {"statusCode": 404, "headers": cors_headers, "body": json.dumps({"success": False, "message": "Login failed: User not found"})}
+                return json_response(404, {"success": False, "message": "Login failed: User not found"}, event)
             if 'password' not in body:
-                return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"success": False, "message": "Login failed: Password is required"})}
+                return json_response(400, {"success": False, "message": "Login failed: Password is required"}, event)
             
             secret_hash = calculate_secret_hash(email)
             auth_response = cognito.initiate_auth(
@@ -79,24 +62,20 @@ def lambda_handler(event, context):
             
             print(f"Login successful for email: {email}, role: {role}")
             
-            return {
-                "statusCode": 200,
-                "headers": cors_headers,
-                "body": json.dumps({
-                    "success": True,
-                    "message": f"Login successful for {email}",
-                    "idToken": tokens.get('IdToken'),
-                    "accessToken": tokens.get('AccessToken'),
-                    "refreshToken": tokens.get('RefreshToken') if body.get('remember', False) else None,
-                    "role": role,
-                    "expiresIn": tokens.get('ExpiresIn')  # Include expiry time
-                })
-            }
+            return json_response(200, {
+                "success": True,
+                "message": f"Login successful for {email}",
+                "idToken": tokens.get('IdToken'),
+                "accessToken": tokens.get('AccessToken'),
+                "refreshToken": tokens.get('RefreshToken') if body.get('remember', False) else None,
+                "role": role,
+                "expiresIn": tokens.get('ExpiresIn')  # Include expiry time
+            }, event)
     except cognito.exceptions.NotAuthorizedException as e:
-        return {"statusCode": 401, "headers": cors_headers, "body": json.dumps({"success": False, "message": f"Login failed: Incorrect password for {email}"})}
+        return json_response(401, {"success": False, "message": f"Login failed: Incorrect password for {email}"}, event)
     except cognito.exceptions.UserNotConfirmedException:
-        return {"statusCode": 403, "headers": cors_headers, "body": json.dumps({"success": False, "message": f"Login failed: User not confirmed: {email}"})}
+        return json_response(403, {"success": False, "message": f"Login failed: User not confirmed: {email}"}, event)
     except Exception as e:
         print(f"Error processing request: {str(e)}")
-        return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"success": False, "message": "Internal server error"})}
+        return json_response(500, {"success": False, "message": "Internal server error"}, event)
     
\ No newline at end of file
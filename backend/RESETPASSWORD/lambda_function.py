@@ -1,29 +1,17 @@
-import boto3
 import os
 import json
-import hmac
-import hashlib
-import base64
+from shared.clients import lazy_client
+from shared.auth import calculate_secret_hash
+from shared.responses import json_response
 
 # Initialize AWS Cognito client
-cognito = boto3.client('cognito-idp')
+cognito = lazy_client('cognito-idp')
 
 # Environment variables
 COGNITO_CLIENT_ID = os.environ['COGNITO_CLIENT_ID']
 COGNITO_CLIENT_SECRET = os.environ.get('COGNITO_CLIENT_SECRET')  # Optional, if using client secret
 USER_POOL_ID = os.environ['USER_POOL_ID']  # Required for admin_get_user
 
-def calculate_secret_hash(username):
-    """
-    Calculate the SECRET_HASH required for Cognito API calls when client secret is enabled.
-    """
-    if not COGNITO_CLIENT_SECRET:
-        return None  # If no client secret, skip SECRET_HASH
-    message = username + COGNITO_CLIENT_ID
-    secret = bytes(COGNITO_CLIENT_SECRET, 'utf-8')
-    dig = hmac.new(secret, msg=message.encode('utf-8'), digestmod=hashlib.sha256).digest()
-    return base64.b64encode(dig).decode()
-
 def check_user_exists(email):
     """
     Check if a user exists in Cognito using admin_get_user.
@@ -49,15 +37,7 @@ def lambda_handler(event, context):
         # Check if user exists in Cognito
         if not check_user_exists(email):
             print(f"User not found: {email}")
-            return {
-                "statusCode": 404,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST"
-                },
-                "body": json.dumps({"success": False, "message": f"User not found: {email}"})
-            }
+            return json_response(404, {"success": False, "message": f"User not found: {email}"}, event)
 
         # Calculate SECRET_HASH if client secret is enabled
         secret_hash = calculate_secret_hash(email)
@@ -69,15 +49,7 @@ def lambda_handler(event, context):
                 Username=email,
                 SecretHash=secret_hash  # Include SECRET_HASH here if applicable
             )
-            return {
-                "statusCode": 200,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST"
-                },
-                "body": json.dumps({"success": True, "message": "Password reset initiated. Please check your email."})
-            }
+            return json_response(200, {"success": True, "message": "Password reset initiated. Please check your email."}, event)
 
         elif action == 'confirm':
             # Step 2: Confirm password reset (set new password)
@@ -91,65 +63,25 @@ def lambda_handler(event, context):
                 Password=new_password,
                 SecretHash=secret_hash  # Include SECRET_HASH here if applicable
             )
-            return {
-                "statusCode": 200,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST"
-                },
-                "body": json.dumps({"success": True, "message": "Password reset successful."})
-            }
+            return json_response(200, {"success": True, "message": "Password reset successful."}, event)
 
         else:
-            return {
-                "statusCode": 400,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST"
-                },
-                "body": json.dumps({"success": False, "message": f"Invalid action: {action}"})
-            }
+            return json_response(400, {"success": False, "message": f"Invalid action: {action}"}, event)
 
     except cognito.exceptions.CodeMismatchException as e:
         print(f"Invalid verification code for email: {email}. Error: {str(e)}")
-        return {
-            "statusCode": 400,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST"
-            },
-            "body": json.dumps({"success": False, "message": f"Invalid verification code: {str(e)}"})
-        }
+        return json_response(400, {"success": False, "message": f"Invalid verification code: {str(e)}"}, event)
 
     except cognito.exceptions.InvalidParameterException as e:
         print(f"Invalid parameter for email: {email}. Error: {str(e)}")
-        return {
-            "statusCode": 400,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST"
-            },
-            "body": json.dumps({
-                "success": False,
-                "message": "Invalid parameters provided."
-            })
-        }
+        return json_response(400, {
+            "success": False,
+            "message": "Invalid parameters provided."
+        }, event)
 
     except Exception as e:
         print(f"An unexpected error occurred: {str(e)}")
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST"
-            },
-            "body": json.dumps({
-                "success": False,
-                "message": "An internal error occurred. Please try again later."
-            })
-        }
+        return json_response(500, {
+            "success": False,
+            "message": "An internal error occurred. Please try again later."
+        }, event)
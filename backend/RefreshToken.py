@@ -1,12 +1,11 @@
 import json
-import boto3
 import os
-import hmac
-import hashlib
-import base64
+from shared.clients import lazy_client
+from shared.auth import calculate_secret_hash
+from shared.responses import json_response
 
 # Initialize Cognito client
-cognito = boto3.client('cognito-idp')
+cognito = lazy_client('cognito-idp')
 
 # Environment variables for Cognito configuration
 USER_POOL_ID = os.environ.get('USER_POOL_ID')
@@ -17,13 +16,6 @@ CLIENT_SECRET = os.environ.get('COGNITO_CLIENT_SECRET')
 if not all([USER_POOL_ID, CLIENT_ID, CLIENT_SECRET]):
     raise ValueError("Missing required environment variables")
 
-# Helper function to calculate secret hash for Cognito authentication
-def calculate_secret_hash(username):
-    message = username + CLIENT_ID
-    secret = bytes(CLIENT_SECRET, 'utf-8')
-    dig = hmac.new(secret, msg=message.encode('utf-8'), digestmod=hashlib.sha256).digest()
-    return base64.b64encode(dig).decode()
-
 # Helper function to get user info from Cognito
 def get_cognito_username(email):
     try:
@@ -38,20 +30,11 @@ def get_cognito_username(email):
 
 # Helper function to respond with HTTP response
 def create_response(status_code, message, data=None):
-    cors_headers = {
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Headers": "Content-Type",
-        "Access-Control-Allow-Methods": "OPTIONS,POST"
-    }
     body = {"success": status_code == 200, "message": message}
     if data:
         body.update(data)
 
-    return {
-        "statusCode": status_code,
-        "headers": cors_headers,
-        "body": json.dumps(body)
-    }
+    return json_response(status_code, body)
 
 # Handle token refresh
 def handle_token_refresh(email, refresh_token):
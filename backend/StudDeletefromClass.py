@@ -1,30 +1,23 @@
 import json
-import boto3
 import os
-
-dynamodb = boto3.resource('dynamodb')
+from membershipIndex import remove_membership, invalidate_active_members
+from classRoster import RosterConflictError, remove_roster_member
+from classVersion import bump_classes_version
+from shared.clients import lazy_table
+from shared.responses import json_response
 
 # Get table name from environment variables
 CLS_TABLE_NAME = os.environ.get('CLS_TABLE')
-table = dynamodb.Table(CLS_TABLE_NAME)
+table = lazy_table(CLS_TABLE_NAME)
 
-def lambda_handler(event, context):
-    # CORS headers
-    headers = {
-        "Content-Type": "application/json",
-        "Access-Control-Allow-Origin": "*",  # Allow all origins
-        "Access-Control-Allow-Methods": "POST, OPTIONS",  # Allow POST and OPTIONS
-        "Access-Control-Allow-Headers": "Content-Type"  # Allow Content-Type header
-    }
+CORS_METHODS = "POST, OPTIONS"
+CORS_ALLOW_HEADERS = "Content-Type"
 
+def lambda_handler(event, context):
     try:
         # Handle preflight request (CORS)
         if event.get("httpMethod") == "OPTIONS":
-            return {
-                "statusCode": 200,
-                "headers": headers,
-                "body": json.dumps({"message": "CORS preflight request successful"})
-            }
+            return json_response(200, {"message": "CORS preflight request successful"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
         # Parse request body
         body = json.loads(event.get("body", "{}"))
@@ -32,59 +25,33 @@ def lambda_handler(event, context):
         student = body.get("student")
 
         if not class_id or not student:
-            return {
-                "statusCode": 400,
-                "headers": headers,
-                "body": json.dumps({"message": "Missing classId or student in request body"})
-            }
+            return json_response(400, {"message": "Missing classId or student in request body"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
-        # Fetch current class data
-        response = table.get_item(Key={"classId": class_id})
-        class_data = response.get("Item")
+        # Remove the student in place, without rewriting the rest of the list
+        try:
+            class_data, removed = remove_roster_member(table, class_id, 'student', student)
+        except RosterConflictError as e:
+            print(str(e))
+            return json_response(409, {"message": "The class roster changed concurrently, please retry"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
         if not class_data:
-            return {
-                "statusCode": 404,
-                "headers": headers,
-                "body": json.dumps({"message": "Class not found"})
-            }
+            return json_response(404, {"message": "Class not found"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
+        if not removed:
+            return json_response(404, {"message": "Student not found in class"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
-        # Get current students list and remove the specified student
         students_list = class_data.get("studentsList", [])
-        
-        if student not in students_list:
-            return {
-                "statusCode": 404,
-                "headers": headers,
-                "body": json.dumps({"message": "Student not found in class"})
-            }
-        
-        # Remove the student from the list
-        students_list.remove(student)
-        
-        # Update the class item in DynamoDB
-        update_response = table.update_item(
-            Key={"classId": class_id},
-            UpdateExpression="SET studentsList = :students",
-            ExpressionAttributeValues={
-                ":students": students_list
-            },
-            ReturnValues="UPDATED_NEW"
-        )
 
-        return {
-            "statusCode": 200,
-            "headers": headers,
-            "body": json.dumps({
-                "message": "Student removed successfully",
-                "studentsList": students_list
-            })
-        }
+        # Keep the membership index in sync with the roster
+        remove_membership(student, class_id, 'student')
+        invalidate_active_members()
+        bump_classes_version()
+
+        return json_response(200, {
+            "message": "Student removed successfully",
+            "studentsList": students_list
+        }, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
     except Exception as e:
         print(f"Lambda Error: {str(e)}")
-        return {
-            "statusCode": 500,
-            "headers": headers,
-            "body": json.dumps({"message": f"Internal server error: {str(e)}"})
-        }
+        return json_response(500, {"message": f"Internal server error: {str(e)}"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
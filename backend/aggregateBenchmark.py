@@ -0,0 +1,102 @@
+import os
+import random
+import statistics
+import sys
+import time
+
+# Roster aggregation benchmark for notifyStudents: the per-student list scans the
+# handler used to run over every class roster against aggregate_students, on
+# synthetic rosters (by default 50 classes, 2,000 students, each on about four
+# rosters). Reports the median wall time over several runs.
+# Usage: python aggregateBenchmark.py [runs] [classes] [students]
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from notifyStudents import aggregate_students  # noqa: E402
+
+CLASSES_PER_STUDENT = 4
+STATUS_OPTIONS = ['Safe', 'Need help', 'Running late', 'At the hotel', 'On the bus', 'Lost', 'Medical']
+SEED = 1
+
+
+def make_classes(class_count, student_count):
+    """ClassesTrips items whose rosters hold every student CLASSES_PER_STUDENT times"""
+    rng = random.Random(SEED)
+    classes = [{
+        'classId': f"class-{idx}",
+        'name': f"Class {idx}",
+        'studentsList': [],
+        'customstatus': rng.sample(STATUS_OPTIONS, 3)
+    } for idx in range(class_count)]
+
+    for idx in range(student_count):
+        for class_item in rng.sample(classes, min(CLASSES_PER_STUDENT, class_count)):
+            class_item['studentsList'].append(f"Student {idx}")
+    for class_item in classes:
+        rng.shuffle(class_item['studentsList'])
+    return classes
+
+
+def list_scan_students(classes_items):
+    """Steps 4 and 5 of notifyStudents before aggregate_students, minus the publishing"""
+    students_list = []
+    class_details = {}
+    for class_item in classes_items:
+        class_id = class_item.get('classId')
+        class_details[class_id] = {
+            'name': class_item.get('name', 'Unnamed Class'),
+            'students': [],
+            'customStatus': class_item.get('customstatus', [])
+        }
+        for student_entry in class_item.get('studentsList', []):
+            if isinstance(student_entry, dict) and 'S' in student_entry:
+                student_name = student_entry['S']
+            else:
+                student_name = student_entry
+            if student_name and student_name not in students_list:
+                students_list.append(student_name)
+                class_details[class_id]['students'].append(student_name)
+
+    student_map = {}
+    for student_name in students_list:
+        student_classes = []
+        custom_status_options = []
+        for class_id, details in class_details.items():
+            if student_name in details['students']:
+                student_classes.append({'classId': class_id, 'className': details['name']})
+                for status in details['customStatus']:
+                    if status not in custom_status_options:
+                        custom_status_options.append(status)
+        student_map[student_name] = {'classes': student_classes, 'statusOptions': custom_status_options}
+    return class_details, student_map
+
+
+def measure(function, classes_items, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function(classes_items)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    class_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    student_count = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+
+    classes_items = make_classes(class_count, student_count)
+    entries = sum(len(class_item['studentsList']) for class_item in classes_items)
+    print(f"{class_count} classes, {student_count} students, {entries} roster entries")
+
+    # Same recipients either way; the list scans only listed a student's first class
+    assert set(list_scan_students(classes_items)[1]) == set(aggregate_students(classes_items)[1])
+
+    for name, function in (('list scans', list_scan_students), ('aggregate_students', aggregate_students)):
+        print(f"{name:20} {measure(function, classes_items, runs) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+import random
+import time
+from botocore.exceptions import ClientError
+from membershipIndex import ROLE_LISTS, member_name
+from classVersion import VERSION_ATTRIBUTE, VERSION_UPDATE, VERSION_NAMES, VERSION_VALUES
+
+# Atomic studentsList/facultyList mutations on ClassesTrips items.
+#
+# The rosters stay DynamoDB lists (the location handlers read them as `L`), but
+# no writer rewrites a whole list any more:
+#   - an add is one conditional list_append that refuses names already present,
+#   - a remove deletes the member's list index, guarded by a condition that the
+#     index still holds that member, and re-reads the roster if it moved,
+#   - a bulk add appends every new name at once, and a bulk remove deletes every
+#     index of the leaving members at once, both guarded by the class version
+#     they read the roster at.
+# Concurrent edits of the same roster therefore never overwrite each other.
+
+MAX_ATTEMPTS = 8
+RETRY_BASE_DELAY = 0.02  # seconds, doubled (with jitter) on every lost race
+
+LEAD_ROLE = 'lead'
+LEAD_ATTRIBUTE = 'faculty'  # the faculty name the class was created with
+
+
+class RosterConflictError(Exception):
+    """The roster kept changing under a removal or bulk add"""
+
+
+def is_condition_failure(error):
+    return error.response['Error']['Code'] == 'ConditionalCheckFailedException'
+
+
+def wait_before_retry(attempt):
+    if attempt:
+        time.sleep(random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def roster_names(class_item, attribute):
+    """Names on a class roster (legacy {'S': name} entries included)"""
+    roster = class_item.get(attribute) or []
+    if not isinstance(roster, list):
+        return []
+    return [member_name(entry) for entry in roster]
+
+
+def add_roster_member(table, class_id, role, name):
+    """
+    Append name to the class's roster for role unless it is already on it.
+    Returns (class_item, added); class_item is None when the class doesn't exist.
+    """
+    try:
+        response = table.update_item(
+            Key={'classId': class_id},
+            UpdateExpression=f"SET #roster = list_append(if_not_exists(#roster, :empty), :members) {VERSION_UPDATE}",
+            ConditionExpression="attribute_exists(classId) AND NOT contains(#roster, :name)",
+            ExpressionAttributeNames={'#roster': ROLE_LISTS[role], **VERSION_NAMES},
+            ExpressionAttributeValues={':empty': [], ':members': [name], ':name': name, **VERSION_VALUES},
+            ReturnValues="ALL_NEW"
+        )
+        return response['Attributes'], True
+    except ClientError as e:
+        if not is_condition_failure(e):
+            raise
+
+    # Either there is no such class or name is already a member
+    return table.get_item(Key={'classId': class_id}, ConsistentRead=True).get('Item'), False
+
+
+def remove_roster_member(table, class_id, role, name):
+    """
+    Remove name from the class's roster for role.
+    Returns (class_item, removed); class_item is None when the class doesn't exist
+    and removed is False when name wasn't on the roster.
+    """
+    attribute = ROLE_LISTS[role]
+
+    for attempt in range(MAX_ATTEMPTS):
+        wait_before_retry(attempt)
+        class_item = table.get_item(Key={'classId': class_id}, ConsistentRead=True).get('Item')
+        if not class_item:
+            return None, False
+
+        roster = roster_names(class_item, attribute)
+        if name not in roster:
+            return class_item, False
+        index = roster.index(name)
+
+        names = {'#roster': attribute, **VERSION_NAMES}
+        if isinstance(class_item[attribute][index], dict):
+            # Legacy {'S': name} entry
+            condition = f"#roster[{index}].#entryName = :name"
+            names['#entryName'] = 'S'
+        else:
+            condition = f"#roster[{index}] = :name"
+
+        try:
+            response = table.update_item(
+                Key={'classId': class_id},
+                UpdateExpression=f"REMOVE #roster[{index}] {VERSION_UPDATE}",
+                ConditionExpression=condition,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={':name': name, **VERSION_VALUES},
+                ReturnValues="ALL_NEW"
+            )
+            return response['Attributes'], True
+        except ClientError as e:
+            if not is_condition_failure(e):
+                raise
+            # Another edit shifted the roster since it was read, locate name again
+
+    raise RosterConflictError(f"Roster {attribute} of class {class_id} kept changing while removing {name}")
+
+
+def version_condition(class_item, values):
+    """Condition that the class is still at the version class_item was read at"""
+    version = class_item.get(VERSION_ATTRIBUTE)
+    if version is None:
+        return "attribute_not_exists(#version)"
+    values[':version'] = version
+    return "#version = :version"
+
+
+def add_roster_members(table, class_id, role, names):
+    """
+    Append every name not yet on the class's roster for role in one conditional
+    update. Returns (class_item, added); class_item is None when the class
+    doesn't exist and added lists the names that were actually appended.
+    """
+    attribute = ROLE_LISTS[role]
+    names = list(dict.fromkeys(names))
+
+    for attempt in range(MAX_ATTEMPTS):
+        wait_before_retry(attempt)
+        class_item = table.get_item(Key={'classId': class_id}, ConsistentRead=True).get('Item')
+        if not class_item:
+            return None, []
+
+        present = set(roster_names(class_item, attribute))
+        added = [name for name in names if name not in present]
+        if not added:
+            return class_item, []
+
+        # Every roster writer bumps the version, so an unchanged version means an unchanged roster
+        values = {':empty': [], ':members': added, **VERSION_VALUES}
+        condition = version_condition(class_item, values)
+
+        try:
+            response = table.update_item(
+                Key={'classId': class_id},
+                UpdateExpression=f"SET #roster = list_append(if_not_exists(#roster, :empty), :members) {VERSION_UPDATE}",
+                ConditionExpression=condition,
+                ExpressionAttributeNames={'#roster': attribute, **VERSION_NAMES},
+                ExpressionAttributeValues=values,
+                ReturnValues="ALL_NEW"
+            )
+            return response['Attributes'], added
+        except ClientError as e:
+            if not is_condition_failure(e):
+                raise
+            # The class changed since it was read, diff against the new roster
+
+    raise RosterConflictError(f"Roster {attribute} of class {class_id} kept changing during a bulk add")
+
+
+def remove_class_members(table, class_id, members):
+    """
+    Drop several members from one class in a single update. members maps a name
+    to the roles it leaves ('student', 'faculty', or LEAD_ROLE to clear the
+    class's lead faculty). Returns (class_item, removed); class_item is None when
+    the class doesn't exist and removed maps names to the roles actually dropped.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        wait_before_retry(attempt)
+        class_item = table.get_item(Key={'classId': class_id}, ConsistentRead=True).get('Item')
+        if not class_item:
+            return None, {}
+
+        removed = {}
+        names = dict(VERSION_NAMES)
+        removals = []
+        for role, attribute in ROLE_LISTS.items():
+            for index, name in enumerate(roster_names(class_item, attribute)):
+                if role in members.get(name, ()):
+                    names[f'#{role}'] = attribute
+                    removals.append(f"#{role}[{index}]")
+                    removed.setdefault(name, []).append(role)
+
+        lead = class_item.get(LEAD_ATTRIBUTE)
+        if lead and LEAD_ROLE in members.get(lead, ()):
+            # Removed rather than blanked: `faculty` keys the faculty-index GSI,
+            # which rejects empty strings, so the class just leaves the index
+            names['#lead'] = LEAD_ATTRIBUTE
+            removals.append('#lead')
+            removed.setdefault(lead, []).append(LEAD_ROLE)
+        if not removed:
+            return class_item, {}
+
+        # Indexes refer to the lists as read, all of them are removed at once
+        update = f"REMOVE {', '.join(removals)} "
+        values = dict(VERSION_VALUES)
+
+        try:
+            response = table.update_item(
+                Key={'classId': class_id},
+                UpdateExpression=update + VERSION_UPDATE,
+                ConditionExpression=version_condition(class_item, values),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+                ReturnValues="ALL_NEW"
+            )
+            return response['Attributes'], removed
+        except ClientError as e:
+            if not is_condition_failure(e):
+                raise
+            # The class changed since it was read, locate the members again
+
+    raise RosterConflictError(f"Rosters of class {class_id} kept changing during a bulk remove")
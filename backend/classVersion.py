@@ -0,0 +1,60 @@
+from versionMarkers import CLASSES_VERSION, bump_version_marker, get_version_marker
+from shared.responses import compute_etag, etag_matches, get_header
+
+# Versions behind the ETags of the class/roster read endpoints.
+#
+# Every ClassesTrips item carries a `version` counter that writers bump in the
+# same UpdateExpression as their change (VERSION_UPDATE), and every write also
+# bumps the CLASSES_VERSION marker (bump_classes_version) that versions the
+# class list as a whole. A poll carrying If-None-Match only has to read the
+# version (a key lookup projecting one attribute) to answer 304.
+
+VERSION_ATTRIBUTE = 'version'
+VERSION_UPDATE = "ADD #version :one"
+VERSION_NAMES = {'#version': VERSION_ATTRIBUTE}
+VERSION_VALUES = {':one': 1}
+
+
+def bump_classes_version():
+    """Invalidation hook for every ClassesTrips writer"""
+    bump_version_marker(CLASSES_VERSION)
+
+
+def get_classes_version():
+    return get_version_marker(CLASSES_VERSION)
+
+
+def get_class_version(table, class_id):
+    """Version of one class (0 before its first versioned write), None if it doesn't exist"""
+    response = table.get_item(
+        Key={'classId': class_id},
+        ProjectionExpression='#version',
+        ExpressionAttributeNames=VERSION_NAMES
+    )
+    if 'Item' not in response:
+        return None
+    return int(response['Item'].get(VERSION_ATTRIBUTE, 0))
+
+
+def class_etag(view, class_id, version):
+    """ETag of one class as returned by a read endpoint (view names the payload)"""
+    return compute_etag(f"{view}:{class_id}:{version}")
+
+
+def classes_etag(view, version):
+    """ETag of the class list (view names the payload, e.g. one page of it)"""
+    return compute_etag(f"classes:{view}:{version}")
+
+
+def matching_class_etag(event, table, view, class_id):
+    """
+    The class's current ETag when the request's If-None-Match already holds it
+    (answer 304), else None. Only conditional requests pay for the version read.
+    """
+    if not get_header(event, 'If-None-Match'):
+        return None
+    version = get_class_version(table, class_id)
+    if version is None:
+        return None
+    etag = class_etag(view, class_id, version)
+    return etag if etag_matches(event, etag) else None
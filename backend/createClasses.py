@@ -1,40 +1,35 @@
 import json
-import boto3
 import uuid
 import os
 from datetime import datetime
+from tableScan import scan_all, projection_kwargs
+from classVersion import VERSION_ATTRIBUTE, bump_classes_version, get_classes_version, classes_etag
+from shared.clients import lazy_table
+from shared.pagination import encode_token, page_params
+from shared.responses import json_response, not_modified_response, etag_matches
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['CLASSES_TABLE'])
+table = lazy_table(os.environ['CLASSES_TABLE'])
+
+CORS_METHODS = "OPTIONS,POST,GET"
+CORS_ALLOW_HEADERS = "Content-Type,If-None-Match"
+
+CLASS_KEY = 'classId'
+MAX_PAGE_SIZE = 100
+# The list only shows each class's summary; the rosters are read to be counted
+SUMMARY_ATTRIBUTES = ['classId', 'name', 'faculty', 'createdOn', 'studentsList', 'facultyList']
 
 def lambda_handler(event, context):
     print(f"Received event: {json.dumps(event)}")  # Log the incoming request
     
     if event['httpMethod'] == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET',
-                'Access-Control-Allow-Headers': 'Content-Type'
-            },
-            'body': json.dumps('CORS preflight successful')
-        }
+        return json_response(200, 'CORS preflight successful', event, CORS_METHODS, CORS_ALLOW_HEADERS)
     elif event['httpMethod'] == 'POST':
         return create_class(event)
     elif event['httpMethod'] == 'GET':
-        return get_all_classes()
+        return get_all_classes(event)
     else:
         print("Unsupported HTTP method")  # Log unsupported HTTP method
-        return {
-            'statusCode': 400,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET',
-                'Access-Control-Allow-Headers': 'Content-Type'
-            },
-            'body': json.dumps('Unsupported HTTP method')
-        }
+        return json_response(400, 'Unsupported HTTP method', event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
 def create_class(event):
     try:
@@ -44,15 +39,7 @@ def create_class(event):
 
         if not class_name or not faculty_name:
             print("Missing className or facultyName")  # Log missing fields
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Methods': 'OPTIONS,POST,GET',
-                    'Access-Control-Allow-Headers': 'Content-Type'
-                },
-                'body': json.dumps({'error': 'Class name and faculty name are required'})
-            }
+            return json_response(400, {'error': 'Class name and faculty name are required'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
         creation_time = datetime.now().isoformat()
         class_item = {
@@ -60,61 +47,75 @@ def create_class(event):
             'name': class_name,
             'faculty': faculty_name,
             'members': 0,
-            'createdOn': creation_time
+            'createdOn': creation_time,
+            VERSION_ATTRIBUTE: 1
         }
 
         #save it to DB
         print(f"Saving class: {class_item}")  # Log the item being saved
         table.put_item(Item=class_item)
+        bump_classes_version()
 
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET',
-                'Access-Control-Allow-Headers': 'Content-Type'
-            },
-            'body': json.dumps(class_item)
-        }
+        return json_response(200, class_item, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
     except Exception as e:
         print(f"Error in create_class: {e}")  # Log any errors
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET',
-                'Access-Control-Allow-Headers': 'Content-Type'
-            },
-            'body': json.dumps({'error': str(e)})
-        }
+        return json_response(500, {'error': str(e)}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
+def member_count(members):
+    """Number of names in a roster attribute (list/set, or a legacy comma-separated string)"""
+    if isinstance(members, str):
+        return len([name for name in members.split(',') if name.strip()])
+    return len(members) if members else 0
+
+def class_summary(class_item):
+    """List entry of a class: its details plus member counts instead of the rosters"""
+    return {
+        'classId': class_item.get('classId'),
+        'name': class_item.get('name'),
+        'faculty': class_item.get('faculty'),
+        'createdOn': class_item.get('createdOn', 'N/A'),
+        'studentCount': member_count(class_item.get('studentsList')),
+        'facultyCount': member_count(class_item.get('facultyList'))
+    }
 
-def get_all_classes():
+def get_class_page(limit, start_key=None):
+    """One scan call of up to limit classes; returns (classes, next_key)"""
+    scan_kwargs = {'Limit': limit, **projection_kwargs(SUMMARY_ATTRIBUTES)}
+    if start_key:
+        scan_kwargs['ExclusiveStartKey'] = start_key
+    response = table.scan(**scan_kwargs)
+    return response.get('Items', []), response.get('LastEvaluatedKey')
+
+def get_all_classes(event):
     try:
-        response = table.scan()
-        classes = response['Items']
-
-        for class_item in classes:
-            class_item['createdOn'] = class_item.get('createdOn', 'N/A')
-
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET',
-                'Access-Control-Allow-Headers': 'Content-Type'
-            },
-            'body': json.dumps(classes, default=str)
-        }
+        try:
+            paginated, limit, start_key = page_params(event, MAX_PAGE_SIZE)
+            if start_key and set(start_key) != {CLASS_KEY}:
+                raise ValueError("Invalid continuation token")
+        except ValueError:
+            return json_response(400, {'error': 'Invalid limit or nextToken'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
+        query_params = event.get('queryStringParameters') or {}
+        view = f"page:{limit}:{query_params.get('nextToken') or ''}" if paginated else 'summary'
+
+        # Read the list version before scanning: a write racing the scan leaves the
+        # client with an older ETag, so its next poll fetches the list again
+        etag = classes_etag(view, get_classes_version())
+        if etag_matches(event, etag):
+            return not_modified_response(etag, CORS_METHODS, CORS_ALLOW_HEADERS)
+
+        if paginated:
+            classes, next_key = get_class_page(limit, start_key)
+            body = {
+                'classes': [class_summary(class_item) for class_item in classes],
+                'nextToken': encode_token(next_key) if next_key else None
+            }
+        else:
+            body = [class_summary(class_item) for class_item in scan_all(table, attributes=SUMMARY_ATTRIBUTES)]
+
+        return json_response(200, body, event, CORS_METHODS, CORS_ALLOW_HEADERS, etag=etag)
 
     except Exception as e:
         print(f"Error in get_all_classes: {e}")
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET',
-                'Access-Control-Allow-Headers': 'Content-Type'
-            },
-            'body': json.dumps({'error': str(e)})
-        }
+        return json_response(500, {'error': str(e)}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
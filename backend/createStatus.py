@@ -1,22 +1,20 @@
 import json
-import boto3
 import os
 from botocore.exceptions import ClientError
+from tableScan import scan_all
+from classVersion import VERSION_ATTRIBUTE, VERSION_UPDATE, VERSION_VALUES, bump_classes_version
+from shared.clients import lazy_table
+from shared.responses import json_response
 
-dynamodb = boto3.resource('dynamodb')
 table_name = os.environ['DYNAMODB_TABLE_NAME']
-table = dynamodb.Table(table_name)
+table = lazy_table(table_name)
 
-def lambda_handler(event, context):
-    headers = {
-        "Content-Type": "application/json",
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Methods": "OPTIONS, POST",
-        "Access-Control-Allow-Headers": "Content-Type"
-    }
+CORS_METHODS = "OPTIONS, POST"
+CORS_ALLOW_HEADERS = "Content-Type"
 
+def lambda_handler(event, context):
     if event['httpMethod'] == 'OPTIONS':
-        return {'statusCode': 200, 'headers': headers, 'body': json.dumps({})}
+        return json_response(200, {}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
     try:
         # Parse request body
@@ -25,17 +23,12 @@ def lambda_handler(event, context):
         status = body.get('status', '').strip()
 
         if not faculty_name or not status:
-            return {
-                'statusCode': 400,
-                'headers': headers,
-                'body': json.dumps({"message": "Both facultyName and status are required"})
-            }
+            return json_response(400, {"message": "Both facultyName and status are required"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
-        # Scan entire table and filter manually
-        response = table.scan()
+        # Scan entire table (all pages, only the attributes we need) and filter manually
         matching_classes = []
 
-        for item in response.get('Items', []):
+        for item in scan_all(table, attributes=['classId', 'facultyList', 'customstatus']):
             faculty_list = item.get('facultyList', [])
             
             # SAFE ITERATION WITH TYPE CHECKING
@@ -52,11 +45,7 @@ def lambda_handler(event, context):
         print(f"Found {len(matching_classes)} matching classes for faculty: {faculty_name}")
 
         if not matching_classes:
-            return {
-                'statusCode': 404,
-                'headers': headers,
-                'body': json.dumps({"message": f"No classes found for faculty: {faculty_name}"})
-            }
+            return json_response(404, {"message": f"No classes found for faculty: {faculty_name}"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
         # Process first matching class
         class_record = matching_classes[0]
@@ -74,36 +63,28 @@ def lambda_handler(event, context):
         # Update custom status
         update_response = table.update_item(
             Key={'classId': class_id},
-            UpdateExpression="SET #status = list_append(if_not_exists(#status, :empty), :newStatus)",
-            ExpressionAttributeNames={'#status': 'customstatus'},
+            UpdateExpression=f"SET #status = list_append(if_not_exists(#status, :empty), :newStatus) {VERSION_UPDATE}",
+            ExpressionAttributeNames={'#status': 'customstatus', '#version': VERSION_ATTRIBUTE},
             ExpressionAttributeValues={
                 ':empty': [],
-                ':newStatus': [status]
+                ':newStatus': [status],
+                **VERSION_VALUES
             },
             ReturnValues="UPDATED_NEW"
         )
+        bump_classes_version()
 
-        return {
-            'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps({
-                "message": "Status updated successfully",
-                "classId": class_id,
-                "updatedAttributes": update_response.get('Attributes', {})
-            })
-        }
+        updated_attributes = update_response.get('Attributes', {})
+        updated_attributes.pop(VERSION_ATTRIBUTE, None)
+        return json_response(200, {
+            "message": "Status updated successfully",
+            "classId": class_id,
+            "updatedAttributes": updated_attributes
+        }, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
     except ClientError as e:
         print(f"DynamoDB Error: {e.response['Error']['Message']}")
-        return {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({"message": "Database error", "details": str(e)})
-        }
+        return json_response(500, {"message": "Database error", "details": str(e)}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
     except Exception as e:
         print(f"Unexpected Error: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({"message": "Processing error", "details": str(e)})
-        }
+        return json_response(500, {"message": "Processing error", "details": str(e)}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
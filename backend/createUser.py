@@ -486,19 +486,19 @@ def lambda_handler(event, context):
 
 
 
-import boto3
 import os
 import json
-import hmac
-import hashlib
-import base64
 import uuid
 from datetime import datetime
+from subscriptionRegistry import record_subscription, set_filter_policy, update_filter_policy
+from shared.clients import get_table, lazy_client
+from shared.names import normalize_name
+from shared.auth import calculate_secret_hash
+from shared.responses import json_response
 
 # Initialize AWS services
-cognito = boto3.client('cognito-idp')
-dynamodb = boto3.resource('dynamodb')
-sns = boto3.client('sns')
+cognito = lazy_client('cognito-idp')
+sns = lazy_client('sns')
 
 # Environment variables
 USER_POOL_ID = os.environ['USER_POOL_ID']
@@ -508,21 +508,7 @@ COGNITO_CLIENT_SECRET = os.environ['COGNITO_CLIENT_SECRET']
 SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN')
 STUDENT_SNS_TOPIC_ARN = os.environ.get('STUDENT_SNS_TOPIC_ARN')  # Ensure this is set
 
-def normalize_name(name):
-    """Standardize name formatting for consistent SNS filtering"""
-    if not name:
-        return ""
-    # Remove any special characters, keep only alphanumeric and spaces
-    clean_name = ''.join(c for c in name if c.isalnum() or c == ' ')
-    # Replace spaces with hyphens
-    return clean_name.replace(' ', '-')
-
-def calculate_secret_hash(username):
-    """Calculate the SECRET_HASH required for Cognito API calls."""
-    message = username + COGNITO_CLIENT_ID
-    secret = bytes(COGNITO_CLIENT_SECRET, 'utf-8')
-    dig = hmac.new(secret, msg=message.encode('utf-8'), digestmod=hashlib.sha256).digest()
-    return base64.b64encode(dig).decode()
+CORS_METHODS = "OPTIONS,POST,GET"
 
 def check_email_exists(email):
     """Check if a user with the given email already exists in Cognito."""
@@ -575,24 +561,16 @@ def subscribe_faculty_to_email_sns(email, full_name):
         subscription_arn = response['SubscriptionArn']
         print(f"Subscription ARN: {subscription_arn}")
 
+        # Register it so the filter policy can be updated by a keyed lookup later
+        record_subscription(email, SNS_TOPIC_ARN, subscription_arn, 'faculty')
+
         # If the subscription is pending confirmation, we can't set filter policy yet
         if subscription_arn == 'pending confirmation':
             print(f"Subscription for {email} is pending confirmation. Filter policy will need to be set after confirmation.")
             return True
 
-        # Create filter policies that match both individual faculty name and all-faculty attributes
-        filter_policy = {
-            f"faculty-{normalized_name}": ["true"],
-            "all-faculty": ["true"]
-        }
-
-        print(f"Setting filter policy for subscription: {json.dumps(filter_policy)}")
-
-        sns.set_subscription_attributes(
-            SubscriptionArn=subscription_arn,
-            AttributeName='FilterPolicy',
-            AttributeValue=json.dumps(filter_policy)
-        )
+        # Filter on both the individual faculty name and the all-faculty attribute
+        set_filter_policy(subscription_arn, 'faculty', full_name)
 
         print(f"Subscription and filter policy set for {email} with filter on faculty-{normalized_name}")
         return True
@@ -628,24 +606,16 @@ def subscribe_student_to_email_sns(email, full_name):
         subscription_arn = response['SubscriptionArn']
         print(f"Subscription ARN: {subscription_arn}")
 
+        # Register it so the filter policy can be updated by a keyed lookup later
+        record_subscription(email, STUDENT_SNS_TOPIC_ARN, subscription_arn, 'student')
+
         # If the subscription is pending confirmation, we can't set filter policy yet
         if subscription_arn == 'pending confirmation':
             print(f"Subscription for {email} is pending confirmation. Filter policy will need to be set after confirmation.")
             return True
 
-        # Create filter policies that match both individual student name and all-students attributes
-        filter_policy = {
-            f"student-{normalized_name}": ["true"],
-            "all-students": ["true"]
-        }
-
-        print(f"Setting filter policy for subscription: {json.dumps(filter_policy)}")
-
-        sns.set_subscription_attributes(
-            SubscriptionArn=subscription_arn,
-            AttributeName='FilterPolicy',
-            AttributeValue=json.dumps(filter_policy)
-        )
+        # Filter on both the individual student name and the all-students attribute
+        set_filter_policy(subscription_arn, 'student', full_name)
 
         print(f"Subscription and filter policy set for {email} with filter on student-{normalized_name}")
         return True
@@ -664,38 +634,10 @@ def update_sns_filter_policy(email, full_name, is_student=False):
         if not topic_arn:
             return False
 
-        normalized_name = normalize_name(full_name)
         print(f"Looking for subscription for {email} to update filter policy")
-
-        # Get a list of subscriptions for this topic
-        response = sns.list_subscriptions_by_topic(TopicArn=topic_arn)
-
-        # Find the subscription matching this email
-        for subscription in response.get('Subscriptions', []):
-            if subscription.get('Endpoint') == email:
-                print(f"Found subscription: {subscription['SubscriptionArn']}")
-
-                # Create filter policies based on role
-                if is_student:
-                    filter_policy = {
-                        f"student-{normalized_name}": ["true"],
-                        "all-students": ["true"]
-                    }
-                else:
-                    filter_policy = {
-                        f"faculty-{normalized_name}": ["true"],
-                        "all-faculty": ["true"]
-                    }
-
-                print(f"Setting filter policy: {json.dumps(filter_policy)}")
-
-                sns.set_subscription_attributes(
-                    SubscriptionArn=subscription['SubscriptionArn'],
-                    AttributeName='FilterPolicy',
-                    AttributeValue=json.dumps(filter_policy)
-                )
-                print(f"Filter policy updated for {email}")
-                return True
+        if update_filter_policy(email, topic_arn, 'student' if is_student else 'faculty', full_name):
+            print(f"Filter policy updated for {email}")
+            return True
 
         print(f"No subscription found for {email}")
         return False
@@ -744,15 +686,7 @@ def lambda_handler(event, context):
 
             # Check if email already exists
             if check_email_exists(email):
-                return {
-                    "statusCode": 400,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                    },
-                    "body": json.dumps({"success": False, "message": "Email already exists!"})
-                }
+                return json_response(400, {"success": False, "message": "Email already exists!"}, event, CORS_METHODS)
 
             # Generate unique username - ensure no spaces
             username_base = clean_first.lower().replace(' ', '')
@@ -803,20 +737,12 @@ def lambda_handler(event, context):
                     else:
                         print(f"Failed to subscribe student {email} to student SNS topic.")
 
-            return {
-                "statusCode": 201,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                },
-                "body": json.dumps({
-                    "success": True,
-                    "message": "Sign-up successful! Check your email for verification.",
-                    "username": username,
-                    "displayName": full_name  # Return the display name with spaces
-                })
-            }
+            return json_response(201, {
+                "success": True,
+                "message": "Sign-up successful! Check your email for verification.",
+                "username": username,
+                "displayName": full_name  # Return the display name with spaces
+            }, event, CORS_METHODS)
         elif action == 'confirm':
             # Confirm user account using the verification code
             username = body['username']
@@ -836,15 +762,7 @@ def lambda_handler(event, context):
             # Fetch user details from Cognito
             user_attributes = get_user_attributes(username)
             if not user_attributes:
-                return {
-                    "statusCode": 500,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                    },
-                    "body": json.dumps({"success": False, "message": "Failed to fetch user details."})
-                }
+                return json_response(500, {"success": False, "message": "Failed to fetch user details."}, event, CORS_METHODS)
 
             # Extract details
             email = user_attributes.get('email')
@@ -864,24 +782,25 @@ def lambda_handler(event, context):
             print(f"Added user to {user_role} group")
 
             # Store user details in DynamoDB
-            table = dynamodb.Table(TABLE_NAME)
+            table = get_table(TABLE_NAME)
             user_id = str(uuid.uuid4())  # Generate new UUID
             now = datetime.utcnow().isoformat()
 
-            table.put_item(
-                Item={
-                    'userId': user_id,
-                    'username': username,
-                    'email': email,
-                    'firstName': first_name,
-                    'lastName': last_name,
-                    'name': name,  # Store full name with spaces in DynamoDB
-                    'phone': phone,
-                    'role': user_role,
-                    'createdAt': now,
-                    'updatedAt': now
-                }
-            )
+            user_item = {
+                'userId': user_id,
+                'username': username,
+                'email': email,
+                'firstName': first_name,
+                'lastName': last_name,
+                'phone': phone,
+                'role': user_role,
+                'createdAt': now,
+                'updatedAt': now
+            }
+            if name:
+                # Store full name with spaces; left out when missing, it keys the role-name index
+                user_item['name'] = name
+            table.put_item(Item=user_item)
             print(f"User details stored in DynamoDB")
 
             # Try to set the filter policy again in case the email was confirmed
@@ -896,15 +815,7 @@ def lambda_handler(event, context):
                     else:
                         print(f"Failed to update SNS filter policy")
 
-            return {
-                "statusCode": 200,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                },
-                "body": json.dumps({"success": True, "message": "Account verified successfully!", "redirect": "/login"})
-            }
+            return json_response(200, {"success": True, "message": "Account verified successfully!", "redirect": "/login"}, event, CORS_METHODS)
 
         elif action == 'resend_verification':
             # Resend the verification code
@@ -918,67 +829,19 @@ def lambda_handler(event, context):
             )
             print(f"Verification code resent")
 
-            return {
-                "statusCode": 200,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                },
-                "body": json.dumps({"success": True, "message": "Verification code resent successfully."})
-            }
+            return json_response(200, {"success": True, "message": "Verification code resent successfully."}, event, CORS_METHODS)
 
         else:
-            return {
-                "statusCode": 400,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                },
-                "body": json.dumps({"success": False, "message": f"Invalid action: {action}"})
-            }
+            return json_response(400, {"success": False, "message": f"Invalid action: {action}"}, event, CORS_METHODS)
 
     except cognito.exceptions.CodeMismatchException:
-        return {
-            "statusCode": 400,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-            },
-            "body": json.dumps({"success": False, "message": "Invalid verification code."})
-        }
+        return json_response(400, {"success": False, "message": "Invalid verification code."}, event, CORS_METHODS)
 
     except cognito.exceptions.ExpiredCodeException:
-        return {
-            "statusCode": 400,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-            },
-            "body": json.dumps({"success": False, "message": "Verification code expired."})
-        }
+        return json_response(400, {"success": False, "message": "Verification code expired."}, event, CORS_METHODS)
 
     except cognito.exceptions.UserNotFoundException:
-        return {
-            "statusCode": 404,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-            },
-            "body": json.dumps({"success": False, "message": "User not found. Please sign up first."})
-        }
+        return json_response(404, {"success": False, "message": "User not found. Please sign up first."}, event, CORS_METHODS)
 
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-            },
-            "body": json.dumps({"success": False, "message": f"An error occurred: {str(e)}"})
-        }
+        return json_response(500, {"success": False, "message": f"An error occurred: {str(e)}"}, event, CORS_METHODS)
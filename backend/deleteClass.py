@@ -1,26 +1,18 @@
 import json
-import boto3
 import os
-from decimal import Decimal
 import time
+from membershipIndex import remove_class, invalidate_active_members
+from classVersion import bump_classes_version
+from shared.clients import get_table
+from shared.responses import json_response
 
-dynamodb = boto3.resource('dynamodb')
-
-# Custom JSON encoder to handle Decimal and other non-serializable types
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return int(obj)  # Or float(obj) for decimal precision
-        if isinstance(obj, int):  # Handle potential int values directly
-            return int(obj)
-        if isinstance(obj, float): # Handle potential float values directly
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
+CORS_METHODS = "GET, OPTIONS, POST"
+CORS_ALLOW_HEADERS = "Content-Type, Authorization"
 
 def lambda_handler(event, context):
     try:
         table_name = os.environ['CLASSES_TABLE']
-        table = dynamodb.Table(table_name)
+        table = get_table(table_name)
         
         # Extract class_id from the request body
         body = json.loads(event.get('body', '{}'))  # Safely parse the request body
@@ -42,29 +34,15 @@ def lambda_handler(event, context):
             }
         elif event['path'] == '/classes/deleteclass':
         # Delete the class from DynamoDB
-            response = table.delete_item(Key={'classId': class_id})
+            response = table.delete_item(Key={'classId': class_id}, ReturnValues='ALL_OLD')
+
+            # Drop the deleted class's rosters from the membership index
+            remove_class(response.get('Attributes', {}))
+            invalidate_active_members()
+            bump_classes_version()
             response_body = {"message": "Class deleted successfully"}
         # Fetch the class details from DynamoDB
 
-        # No explicit conversion needed anymore, DecimalEncoder handles it
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, OPTIONS, POST",  # Added POST
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"  # Added Authorization
-            },
-            "body": json.dumps(response_body, cls=DecimalEncoder)  # Use the custom encoder
-        }
+        return json_response(200, response_body, event, CORS_METHODS, CORS_ALLOW_HEADERS)
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, OPTIONS, POST",  # Added POST
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"  # Added Authorization
-            },
-            "body": json.dumps({"error": str(e)})
-        }
+        return json_response(500, {"error": str(e)}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
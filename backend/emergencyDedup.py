@@ -0,0 +1,256 @@
+import os
+import time
+from botocore.exceptions import ClientError
+from shared.clients import lazy_table
+
+# Dedup / rate-limit store for faculty emergency alerts. storeLocation writes
+# every ping as a new Locations item, so an episode can't be told apart by its
+# ping: it is the student's run of emergency pings. Every class the student is
+# alerted for keeps its own open-episode row, so a publish that failed for one
+# class is retried for that class alone. A ping opens a new episode (and sends
+# the full alert) when the class has none, or the last emergency ping is
+# EPISODE_IDLE_SECONDS old; every other ping is folded into the open episode.
+# The row remembers the last ping it handled, so a stream retry of a ping that
+# already went out is recognised instead of being sent or counted again.
+#
+# Suppressed pings are collapsed, not dropped: the row keeps the latest one
+# (pendingPing) and is listed in the sparse FLUSH_INDEX from the moment the
+# window allows the next update (flushDueAt). Either a later ping sends that
+# update, or the scheduled flush (due_updates / claim_pending_update) sends the
+# pending ping, so the student's last message always reaches faculty.
+#
+# Item layout:
+#   studentName (hash key)
+#   episodeId   (range key) - "class#<classId>"
+#   episodeStartedAt          - epoch seconds of the ping that opened the episode
+#   lastPingAt / lastPingId   - epoch seconds and id (ping_id) of the latest handled ping
+#   firstAlertAt / lastAlertAt - epoch seconds of the first and the latest sent alert
+#   updatesSent               - "update" messages sent after the first alert
+#   suppressedCount           - repeats suppressed since lastAlertAt
+#   totalSuppressed / lastSuppressedAt - suppression record for the whole episode
+#   pendingPing               - stream image (PING_ATTRIBUTES) of the latest suppressed ping
+#   flushPartition / flushDueAt - FLUSH_INDEX keys, only while an update is pending
+#   expiresAt                 - DynamoDB TTL attribute
+
+EMERGENCY_ALERTS_TABLE_NAME = os.environ.get('EMERGENCY_ALERTS_TABLE', 'EmergencyAlerts')
+ALERT_WINDOW_SECONDS = int(os.environ.get('EMERGENCY_ALERT_WINDOW', '300'))
+EPISODE_IDLE_SECONDS = int(os.environ.get('EMERGENCY_EPISODE_IDLE', '1800'))
+EPISODE_TTL_SECONDS = int(os.environ.get('EMERGENCY_EPISODE_TTL', '86400'))
+alerts_table = lazy_table(EMERGENCY_ALERTS_TABLE_NAME)
+
+CLASS_EPISODE_PREFIX = 'class#'
+CLAIM_ATTEMPTS = 3
+
+FLUSH_INDEX = 'pending-flush-index'
+FLUSH_PARTITION = 'pending'
+PENDING_ATTRIBUTES = ('pendingPing', 'flushPartition', 'flushDueAt')
+# What a pending update needs of the suppressed ping's stream image
+PING_ATTRIBUTES = ('id', 'timestamp', 'latitude', 'longitude', 'address', 'emergencyDetails')
+
+ALERT = 'alert'
+UPDATE = 'update'
+SUPPRESSED = 'suppressed'
+HANDLED = 'handled'  # a retried ping this class was already alerted for or suppressed
+
+
+def is_condition_failure(error):
+    return error.response['Error']['Code'] == 'ConditionalCheckFailedException'
+
+
+def ping_id(new_image):
+    """Identity of a Locations stream image: the ping's id and timestamp"""
+    return f"{new_image.get('id', {}).get('S')}#{new_image.get('timestamp', {}).get('N')}"
+
+
+def episode_key(student_name, class_id):
+    return {'studentName': student_name, 'episodeId': f"{CLASS_EPISODE_PREFIX}{class_id}"}
+
+
+def episode_class_id(episode_id):
+    return episode_id[len(CLASS_EPISODE_PREFIX):]
+
+
+def pending_restore(previous):
+    """The pending-update attributes an episode had before a claim, for release_alert"""
+    return {attribute: previous[attribute] for attribute in PENDING_ATTRIBUTES if attribute in previous}
+
+
+def claim_alert(student_name, class_id, ping, image=None, now=None):
+    """
+    Decide what to send class_id's faculty for the emergency ping `ping` (ping_id)
+    of student_name; image is the ping's stream image, kept as the episode's
+    pending update if the ping is suppressed. Returns (decision, claim):
+    decision is ALERT when the ping opens a new episode, UPDATE once
+    ALERT_WINDOW_SECONDS have passed since the
+    episode's last sent alert, HANDLED for a ping the row already handled, else
+    SUPPRESSED. claim carries suppressedCount (repeats collapsed into an update)
+    and must be handed to release_alert if publishing fails.
+    """
+    now = now or int(time.time())
+    key = episode_key(student_name, class_id)
+    expires_at = now + EPISODE_TTL_SECONDS
+
+    for _ in range(CLAIM_ATTEMPTS):
+        try:
+            alerts_table.put_item(
+                Item=dict(key, episodeStartedAt=now, lastPingAt=now, lastPingId=ping, firstAlertAt=now,
+                          lastAlertAt=now, updatesSent=0, suppressedCount=0, totalSuppressed=0, expiresAt=expires_at),
+                ConditionExpression="attribute_not_exists(studentName) OR lastPingAt < :idleStart",
+                ExpressionAttributeValues={':idleStart': now - EPISODE_IDLE_SECONDS}
+            )
+            return ALERT, {'claimedAt': now, 'ping': ping, 'previousAlertAt': None, 'suppressedCount': 0}
+        except ClientError as e:
+            if not is_condition_failure(e):
+                raise
+
+        # The episode is open: an update once the window has passed since the last alert
+        try:
+            response = alerts_table.update_item(
+                Key=key,
+                UpdateExpression=("SET lastAlertAt = :now, lastPingAt = :now, lastPingId = :ping, "
+                                  "suppressedCount = :zero, expiresAt = :expires ADD updatesSent :one "
+                                  f"REMOVE {', '.join(PENDING_ATTRIBUTES)}"),
+                ConditionExpression="attribute_exists(studentName) AND lastPingId <> :ping AND lastAlertAt <= :windowStart",
+                ExpressionAttributeValues={
+                    ':now': now,
+                    ':ping': ping,
+                    ':zero': 0,
+                    ':one': 1,
+                    ':expires': expires_at,
+                    ':windowStart': now - ALERT_WINDOW_SECONDS
+                },
+                ReturnValues="ALL_OLD"
+            )
+            return UPDATE, update_claim(response['Attributes'], now, ping)
+        except ClientError as e:
+            if not is_condition_failure(e):
+                raise
+
+        # Inside the window: keep the ping for the update that goes out once the window has passed
+        try:
+            alerts_table.update_item(
+                Key=key,
+                UpdateExpression=("SET lastSuppressedAt = :now, lastPingAt = :now, lastPingId = :ping, "
+                                  "pendingPing = :image, flushPartition = :pending, flushDueAt = lastAlertAt + :window, "
+                                  "expiresAt = :expires ADD suppressedCount :one, totalSuppressed :one"),
+                ConditionExpression="attribute_exists(studentName) AND lastPingId <> :ping",
+                ExpressionAttributeValues={
+                    ':now': now,
+                    ':ping': ping,
+                    ':image': {name: value for name, value in (image or {}).items() if name in PING_ATTRIBUTES},
+                    ':pending': FLUSH_PARTITION,
+                    ':window': ALERT_WINDOW_SECONDS,
+                    ':one': 1,
+                    ':expires': expires_at
+                }
+            )
+            return SUPPRESSED, None
+        except ClientError as e:
+            if not is_condition_failure(e):
+                raise
+
+        episode = alerts_table.get_item(Key=key, ConsistentRead=True).get('Item')
+        if episode and episode.get('lastPingId') == ping:
+            return HANDLED, None
+        # A failed first alert was released meanwhile, open the episode again
+
+    raise RuntimeError(f"Emergency episode of {student_name} in class {class_id} kept changing while claiming an alert")
+
+
+def update_claim(previous, now, ping):
+    """Claim of an update, from the episode as it was before the update claimed it"""
+    return {
+        'claimedAt': now,
+        'ping': ping,
+        'previousAlertAt': int(previous['lastAlertAt']),
+        'previousPingAt': int(previous['lastPingAt']),
+        'previousPingId': previous['lastPingId'],
+        'suppressedCount': int(previous.get('suppressedCount', 0)),
+        'restore': pending_restore(previous)
+    }
+
+
+def due_updates(now=None):
+    """Keys of the episodes whose suppressed pings are due to go out as an update"""
+    query_kwargs = {
+        'IndexName': FLUSH_INDEX,
+        'KeyConditionExpression': "flushPartition = :pending AND flushDueAt <= :now",
+        'ExpressionAttributeValues': {':pending': FLUSH_PARTITION, ':now': now or int(time.time())}
+    }
+    keys = []
+    while True:
+        response = alerts_table.query(**query_kwargs)
+        keys.extend({'studentName': item['studentName'], 'episodeId': item['episodeId']}
+                    for item in response.get('Items', []))
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            return keys
+        query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+
+def claim_pending_update(student_name, class_id, now=None):
+    """
+    Claim the update that carries an episode's suppressed pings when no later
+    ping did. Returns (pending ping image, claim), or (None, None) if nothing is
+    pending any more or the window hasn't passed.
+    """
+    now = now or int(time.time())
+    try:
+        response = alerts_table.update_item(
+            Key=episode_key(student_name, class_id),
+            UpdateExpression=("SET lastAlertAt = :now, suppressedCount = :zero, expiresAt = :expires "
+                              f"ADD updatesSent :one REMOVE {', '.join(PENDING_ATTRIBUTES)}"),
+            ConditionExpression="suppressedCount > :zero AND lastAlertAt <= :windowStart",
+            ExpressionAttributeValues={
+                ':now': now,
+                ':zero': 0,
+                ':one': 1,
+                ':expires': now + EPISODE_TTL_SECONDS,
+                ':windowStart': now - ALERT_WINDOW_SECONDS
+            },
+            ReturnValues="ALL_OLD"
+        )
+    except ClientError as e:
+        if not is_condition_failure(e):
+            raise
+        # A ping's update got there first
+        return None, None
+
+    previous = response['Attributes']
+    return previous.get('pendingPing', {}), update_claim(previous, now, previous['lastPingId'])
+
+
+def release_alert(student_name, class_id, claim):
+    """Undo a claim whose alert could not be published, so the stream retry (or the next flush) sends it again"""
+    key = episode_key(student_name, class_id)
+    try:
+        if claim['previousAlertAt'] is None:
+            alerts_table.delete_item(
+                Key=key,
+                ConditionExpression="lastPingId = :ping AND episodeStartedAt = :claimedAt AND lastAlertAt = :claimedAt",
+                ExpressionAttributeValues={':ping': claim['ping'], ':claimedAt': claim['claimedAt']}
+            )
+        else:
+            # The pending update, if any, is pending again
+            restore = claim.get('restore', {})
+            alerts_table.update_item(
+                Key=key,
+                UpdateExpression=("SET lastAlertAt = :previous, lastPingAt = :previousPingAt, lastPingId = :previousPingId"
+                                  + ''.join(f", {attribute} = :{attribute}" for attribute in restore)
+                                  + " ADD suppressedCount :count, updatesSent :minusOne"),
+                ConditionExpression="lastPingId = :ping AND lastAlertAt = :claimedAt",
+                ExpressionAttributeValues={
+                    ':previous': claim['previousAlertAt'],
+                    ':previousPingAt': claim['previousPingAt'],
+                    ':previousPingId': claim['previousPingId'],
+                    ':count': claim['suppressedCount'],
+                    ':minusOne': -1,
+                    ':ping': claim['ping'],
+                    ':claimedAt': claim['claimedAt'],
+                    **{f':{attribute}': value for attribute, value in restore.items()}
+                }
+            )
+    except ClientError as e:
+        # Another alert for the episode went out in the meantime, keep its state
+        if not is_condition_failure(e):
+            raise
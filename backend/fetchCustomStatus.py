@@ -1,61 +1,35 @@
 import json
 import os
-import boto3
 from botocore.exceptions import ClientError
+from membershipIndex import get_member_classes
+from shared.responses import json_response, options_response
 
-dynamodb = boto3.client('dynamodb')
+CORS_METHODS = "POST, OPTIONS"
+CORS_ALLOW_HEADERS = "Content-Type, Authorization"
 
 def lambda_handler(event, context):
-    cors_headers = {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'POST, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type, Authorization'
-    }
-
     if event.get('httpMethod') == 'OPTIONS':
-        return {'statusCode': 204, 'headers': cors_headers, 'body': ''}
+        return options_response(CORS_METHODS, CORS_ALLOW_HEADERS, status_code=204)
 
     try:
         body = json.loads(event['body'])
         student_name = body['student_name']
         table_name = os.environ['DYNAMODB_TABLE']
         
-        # Corrected query
-        response = dynamodb.scan(
-            TableName=table_name,
-            FilterExpression='contains(studentsList, :student)',
-            ExpressionAttributeValues={
-                ':student': {'S': student_name}  # Now matches your data structure
-            }
-        )
+        # Resolve the student's classes through the membership index
+        classes = get_member_classes(student_name, table_name, role='student', attributes=['classId', 'customstatus'])
         
-        if not response['Items']:
-            return {
-                'statusCode': 404,
-                'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                'body': json.dumps({'error': 'Student not found in any class'})
-            }
+        if not classes:
+            return json_response(404, {'error': 'Student not found in any class'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
         
         # Process first matching class
-        status_values = [item['S'] for item in response['Items'][0]['customstatus']['L']]
+        status_values = list(classes[0].get('customstatus', []))
         
-        return {
-            'statusCode': 200,
-            'headers': {**cors_headers, 'Content-Type': 'application/json'},
-            'body': json.dumps({'customstatus': status_values})
-        }
+        return json_response(200, {'customstatus': status_values}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
         
     except ClientError as e:
         print(f"DynamoDB Error: {e.response['Error']['Message']}")
-        return {
-            'statusCode': 500,
-            'headers': cors_headers,
-            'body': json.dumps({'error': 'Database error. Check student name format.'})
-        }
+        return json_response(500, {'error': 'Database error. Check student name format.'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
     except Exception as e:
         print(f"Unexpected error: {str(e)}")
-        return {
-            'statusCode': 500,
-            'headers': cors_headers,
-            'body': json.dumps({'error': 'Internal server error'})
-        }
+        return json_response(500, {'error': 'Internal server error'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
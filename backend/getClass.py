@@ -1,42 +1,18 @@
-import json
-import boto3
 import os
-from decimal import Decimal
+from tableScan import scan_all
+from shared.clients import lazy_table
+from shared.responses import json_response
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['CLASSES_TABLE'])
+table = lazy_table(os.environ['CLASSES_TABLE'])
 
-# Custom JSON encoder to handle Decimal and other non-serializable types
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)  # Use float to retain decimal precision
-        return super(DecimalEncoder, self).default(obj)
+CORS_METHODS = "GET, OPTIONS, POST"
+CORS_ALLOW_HEADERS = "Content-Type, Authorization"
 
 def lambda_handler(event, context):
     try:
-        response = table.scan()
-        classes = response.get('Items', [])
+        classes = scan_all(table)
 
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, OPTIONS, POST",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            },
-            "body": json.dumps(classes, cls=DecimalEncoder)
-        }
+        return json_response(200, classes, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Content-Type": "application/json",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, OPTIONS, POST",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization"
-            },
-            "body": json.dumps({"error": str(e)})
-        }
+        return json_response(500, {"error": str(e)}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
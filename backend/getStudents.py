@@ -56,87 +56,87 @@ def lambda_handler(event, context):
         }'''
 
 
-import json
-import boto3
 import os
-from boto3.dynamodb.conditions import Attr
-
-# Initialize DynamoDB resource
-dynamodb = boto3.resource('dynamodb')
+import time
+from membershipIndex import get_role_member_names, get_roster_version
+from userIndex import check_index_key, list_role_members
+from shared.clients import lazy_table
+from shared.pagination import encode_token, page_params
+from shared.responses import json_response
 
-# Ensure the environment variables are set
+# Ensure the environment variable is set
 USER_TABLE_NAME = os.environ.get('USERS_TABLE')
-TRIP_TABLE_NAME = os.environ.get('TRIP_TABLE')
 
-if not USER_TABLE_NAME or not TRIP_TABLE_NAME:
-    raise ValueError("Environment variables USERS_TABLE or TRIP_TABLE are not set")
+if not USER_TABLE_NAME:
+    raise ValueError("Environment variable USERS_TABLE is not set")
 
-user_table = dynamodb.Table(USER_TABLE_NAME)
-trip_table = dynamodb.Table(TRIP_TABLE_NAME)
+user_table = lazy_table(USER_TABLE_NAME)
+
+MAX_PAGE_SIZE = 500
+ASSIGNED_STUDENTS_TTL = int(os.environ.get('ASSIGNED_STUDENTS_TTL', '300'))  # seconds a warm container trusts its set
+
+CORS_METHODS = "OPTIONS,GET,POST"
+CORS_ALLOW_HEADERS = "Content-Type,Authorization"
+
+# Students on any class roster, kept across warm invocations so that paging
+# through the unassigned students doesn't re-read every roster per page. Rebuilt
+# from the ClassMembership index when the TTL lapses or the roster version moves.
+assigned_students_cache = {
+    'students': None,
+    'version': None,
+    'loaded_at': 0.0
+}
+
+def get_assigned_students():
+    """
+    Names of every student already part of a trip. The set is reused while it is
+    younger than ASSIGNED_STUDENTS_TTL and the roster version is unchanged;
+    otherwise it is rebuilt from the student rows of the membership index.
+    """
+    version = get_roster_version()
+    cache_age = time.time() - assigned_students_cache['loaded_at']
+
+    if (assigned_students_cache['students'] is None
+            or cache_age > ASSIGNED_STUDENTS_TTL
+            or assigned_students_cache['version'] != version):
+        assigned_students_cache['students'] = get_role_member_names('student')
+        assigned_students_cache['version'] = version
+        assigned_students_cache['loaded_at'] = time.time()
+        print(f"Loaded {len(assigned_students_cache['students'])} assigned students (roster version {version})")
+
+    return assigned_students_cache['students']
+
+def get_unassigned_students(assigned_students, start_key=None, limit=None):
+    """
+    Walk the students (role index, name order) and collect those who are not part of a trip.
+    Stops once limit students are collected and returns (students, next_key);
+    next_key is None when every student has been read.
+    """
+    return list_role_members(user_table, 'student', assigned_students, start_key, limit)
 
 def lambda_handler(event, context):
     try:
-        students = []
-        last_evaluated_key = None
-        existing_students_in_trips = set()
-
-        # Fetch all students already part of a trip (using pagination)
-        while True:
-            trip_response = trip_table.scan()
-            for trip in trip_response.get('Items', []):
-                # Collect all students in each trip's studentsList
-                for student in trip.get('studentsList', []):
-                    # Check if the student is a dictionary and extract the name correctly
-                    if isinstance(student, dict):
-                        # Assuming the student is stored as a dictionary with a key 'S'
-                        student_name = student.get('S')
-                    else:
-                        # If it's a simple string, assume it's the student's name
-                        student_name = student
-                    
-                    if student_name:
-                        existing_students_in_trips.add(student_name)
-        
-            last_evaluated_key = trip_response.get('LastEvaluatedKey')
-            if not last_evaluated_key:
-                break  # No more pages of trips
-
-        # Paginate through all users and filter out students already part of a trip
-        while True:
-            scan_kwargs = {
-                "FilterExpression": Attr('role').eq('student')
+        try:
+            paginated, limit, start_key = page_params(event, MAX_PAGE_SIZE)
+            if start_key:
+                check_index_key(start_key)
+        except ValueError:
+            return json_response(400, {'error': 'Invalid limit or nextToken'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
+
+        # Fetch all students already part of a trip, then stream the users past them
+        existing_students_in_trips = get_assigned_students()
+        students, next_key = get_unassigned_students(existing_students_in_trips, start_key, limit)
+
+        if paginated:
+            body = {
+                'students': students,
+                'nextToken': encode_token(next_key) if next_key else None
             }
-            if last_evaluated_key:
-                scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
+        else:
+            body = students
 
-            response = user_table.scan(**scan_kwargs)
-            for student in response.get('Items', []):
-                student_name = student.get('name')  # Assuming 'name' is the student name field
-                if student_name not in existing_students_in_trips:
-                    students.append(student)
-
-            last_evaluated_key = response.get('LastEvaluatedKey')
-            if not last_evaluated_key:
-                break  # No more pages of users
-
-        return {
-            'statusCode': 200,
-            'headers': {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type,Authorization",
-                "Access-Control-Allow-Methods": "OPTIONS,GET,POST"
-            },
-            'body': json.dumps(students, default=str)
-        }
+        return json_response(200, body, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
     except Exception as e:
         print(f"Error fetching students: {str(e)}")  # Logs for debugging
-        return {
-            'statusCode': 500,
-            'headers': {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type,Authorization",
-                "Access-Control-Allow-Methods": "OPTIONS,GET,POST"
-            },
-            'body': json.dumps({'error': 'Failed to fetch students'})
-        }
+        return json_response(500, {'error': 'Failed to fetch students'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
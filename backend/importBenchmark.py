@@ -0,0 +1,72 @@
+import os
+import statistics
+import subprocess
+import sys
+
+# Cold-start import-time benchmark: imports every Python handler in a fresh
+# interpreter (like a new Lambda container's init phase) and reports the median
+# wall time over several runs. Usage: python importBenchmark.py [runs]
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SKIP = {'importBenchmark.py', 'aggregateBenchmark.py'}
+
+DUMMY_ENV = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'benchmark',
+    'AWS_SECRET_ACCESS_KEY': 'benchmark',
+    'USER_POOL_ID': 'us-east-1_benchmark',
+    'COGNITO_CLIENT_ID': 'benchmark',
+    'COGNITO_CLIENT_SECRET': 'benchmark',
+    'CLASSES_TABLE': 'ClassesTrips',
+    'CLS_TABLE': 'ClassesTrips',
+    'USER_TABLE': 'UserProfiles',
+    'USERS_TABLE': 'UserProfiles',
+    'TRIP_TABLE': 'ClassesTrips',
+    'DYNAMODB_TABLE': 'ClassesTrips',
+    'DYNAMODB_TABLE_NAME': 'ClassesTrips',
+    'CLASSES_TRIPS_TABLE': 'ClassesTrips',
+}
+
+TIMER = """
+import importlib.util, sys, time
+sys.path.insert(0, {backend_dir!r})
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location('handler', {path!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+print(time.perf_counter() - start)
+"""
+
+
+def handler_files():
+    for root, dirs, files in os.walk(BACKEND_DIR):
+        dirs[:] = sorted(d for d in dirs if d not in ('shared', 'tests', '__pycache__'))
+        for name in sorted(files):
+            if name.endswith('.py') and name not in SKIP:
+                yield os.path.join(root, name)
+
+
+def measure(path, runs):
+    env = dict(os.environ, **DUMMY_ENV)
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', TIMER.format(backend_dir=BACKEND_DIR, path=path)],
+            capture_output=True, text=True, env=env
+        )
+        if result.returncode != 0:
+            return None
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for path in handler_files():
+        median = measure(path, runs)
+        name = os.path.relpath(path, BACKEND_DIR)
+        print(f"{name:40} {'import failed' if median is None else f'{median * 1000:8.1f} ms'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+import os
+import time
+import uuid
+from datetime import datetime
+from botocore.exceptions import ClientError
+from tableScan import projection_kwargs
+from shared.clients import get_table
+
+# Resumable batch jobs in the ProvisioningJobs table (bulk user provisioning,
+# user offboarding). A job is one header item plus one item per unit of work:
+#
+# Item layout:
+#   jobId (hash key)
+#   rowKey (range key) - JOB_KEY for the header; row keys must sort after it
+#                        (start them with a letter, e.g. "row#000001")
+#   header: kind, status, cursor (rowKey of the last committed row), total,
+#           processed, one counter per row outcome, leaseUntil (epoch ms) while
+#           a request is running the job, createdAt / updatedAt
+#   rows:   status plus whatever the job kind needs
+#   expiresAt - TTL on every item
+#
+# A request claims the job's lease, works through the rows after the cursor a
+# chunk at a time and commits each chunk by advancing the cursor, conditional on
+# the cursor it started from. It only works for its time budget, so a run that
+# stopped or crashed is resumed by the next request from the last committed
+# chunk; processing a row twice has to be harmless.
+
+JOBS_TABLE_NAME = os.environ.get('PROVISIONING_JOBS_TABLE', 'ProvisioningJobs')
+JOB_KEY = '#job'
+JOB_TTL_SECONDS = 14 * 24 * 3600
+SAFETY_MARGIN_MS = 5000
+
+# Job states
+INGESTING = 'ingesting'
+RUNNING = 'running'
+COMPLETE = 'complete'
+
+PENDING = 'pending'
+
+
+def is_condition_failure(error):
+    return error.response['Error']['Code'] == 'ConditionalCheckFailedException'
+
+
+def create_job(kind, rows):
+    """
+    Store a new job holding rows (dicts with rowKey and status, streamed through
+    batch_writer) and return its header; a job without rows starts complete.
+    """
+    jobs_table = get_table(JOBS_TABLE_NAME)
+    job_id = str(uuid.uuid4())
+    now = datetime.utcnow().isoformat()
+    expires_at = int(time.time()) + JOB_TTL_SECONDS
+
+    header = {
+        'jobId': job_id,
+        'rowKey': JOB_KEY,
+        'kind': kind,
+        'status': INGESTING,
+        'cursor': '',
+        'total': 0,
+        'processed': 0,
+        'createdAt': now,
+        'updatedAt': now,
+        'expiresAt': expires_at
+    }
+    jobs_table.put_item(Item=header)
+
+    total = 0
+    with jobs_table.batch_writer() as batch:
+        for row in rows:
+            batch.put_item(Item=dict(row, jobId=job_id, expiresAt=expires_at))
+            total += 1
+
+    header.update(status=RUNNING if total else COMPLETE, total=total, updatedAt=datetime.utcnow().isoformat())
+    jobs_table.update_item(
+        Key={'jobId': job_id, 'rowKey': JOB_KEY},
+        UpdateExpression="SET #status = :status, #total = :total, updatedAt = :now",
+        ExpressionAttributeNames={'#status': 'status', '#total': 'total'},
+        ExpressionAttributeValues={':status': header['status'], ':total': total, ':now': header['updatedAt']}
+    )
+    return header
+
+
+def get_job(job_id):
+    """Header of job_id, or None"""
+    return get_table(JOBS_TABLE_NAME).get_item(Key={'jobId': job_id, 'rowKey': JOB_KEY}, ConsistentRead=True).get('Item')
+
+
+def claim_job(job_id, lease_ms):
+    """Take the job's lease; returns its header, or None if another request is running it"""
+    now_ms = int(time.time() * 1000)
+    try:
+        return get_table(JOBS_TABLE_NAME).update_item(
+            Key={'jobId': job_id, 'rowKey': JOB_KEY},
+            UpdateExpression="SET leaseUntil = :until",
+            ConditionExpression="attribute_exists(jobId) AND (attribute_not_exists(leaseUntil) OR leaseUntil < :now)",
+            ExpressionAttributeValues={':until': now_ms + lease_ms, ':now': now_ms},
+            ReturnValues="ALL_NEW"
+        )['Attributes']
+    except ClientError as e:
+        if not is_condition_failure(e):
+            raise
+        return None
+
+
+def commit_chunk(job_id, cursor, rows):
+    """Advance the job past rows and add their outcomes to its counters"""
+    counts = {}
+    for row in rows:
+        counts[row['status']] = counts.get(row['status'], 0) + 1
+
+    names = {'#cursor': 'cursor', '#processed': 'processed'}
+    values = {':cursor': cursor, ':next': rows[-1]['rowKey'], ':rows': len(rows), ':now': datetime.utcnow().isoformat()}
+    additions = ['#processed :rows']
+    for idx, (outcome, count) in enumerate(counts.items()):
+        names[f'#o{idx}'] = outcome
+        values[f':o{idx}'] = count
+        additions.append(f'#o{idx} :o{idx}')
+
+    return get_table(JOBS_TABLE_NAME).update_item(
+        Key={'jobId': job_id, 'rowKey': JOB_KEY},
+        UpdateExpression=f"SET #cursor = :next, updatedAt = :now ADD {', '.join(additions)}",
+        ConditionExpression="#cursor = :cursor",
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values,
+        ReturnValues="ALL_NEW"
+    )['Attributes']
+
+
+def release_job(job_id, status):
+    """Store the job's status and hand it back for the next run"""
+    return get_table(JOBS_TABLE_NAME).update_item(
+        Key={'jobId': job_id, 'rowKey': JOB_KEY},
+        UpdateExpression="SET #status = :status REMOVE leaseUntil",
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={':status': status},
+        ReturnValues="ALL_NEW"
+    )['Attributes']
+
+
+def time_budget_ms(budget_ms, context=None, started=None):
+    """What is left of a request's budget_ms (counted from started) within the Lambda's own deadline"""
+    remaining_ms = context.get_remaining_time_in_millis() - SAFETY_MARGIN_MS if context else budget_ms
+    elapsed_ms = (time.monotonic() - started) * 1000 if started else 0
+    return max(0, min(budget_ms - elapsed_ms, remaining_ms))
+
+
+def run_job(job_id, process_chunk, chunk_size, budget_ms):
+    """
+    Work through the job's rows chunk by chunk for up to budget_ms.
+    process_chunk(rows) returns the rows with their outcomes; rows that changed
+    are stored before the chunk is committed. Returns (header, ran); header is
+    None for an unknown job and ran is False if the job is leased elsewhere.
+    """
+    deadline = time.monotonic() + budget_ms / 1000
+    header = claim_job(job_id, int(budget_ms) + SAFETY_MARGIN_MS)
+    if header is None:
+        # Unknown job, or leased by another request
+        return get_job(job_id), False
+    if header['status'] != RUNNING:
+        return release_job(job_id, header['status']), True
+
+    jobs_table = get_table(JOBS_TABLE_NAME)
+    try:
+        while time.monotonic() < deadline:
+            rows = jobs_table.query(
+                KeyConditionExpression="jobId = :jobId AND rowKey > :cursor",
+                ExpressionAttributeValues={':jobId': job_id, ':cursor': header['cursor'] or JOB_KEY},
+                Limit=chunk_size,
+                ConsistentRead=True
+            ).get('Items', [])
+            if not rows:
+                break
+
+            done = process_chunk(rows)
+            with jobs_table.batch_writer() as batch:
+                for row, before in zip(done, rows):
+                    if row != before:
+                        batch.put_item(Item=row)
+
+            header = commit_chunk(job_id, header['cursor'], done)
+
+        if int(header.get('processed', 0)) >= int(header.get('total', 0)):
+            header['status'] = COMPLETE
+    finally:
+        header = release_job(job_id, header['status'])
+    return header, True
+
+
+def job_summary(header, outcomes):
+    summary = {
+        'jobId': header['jobId'],
+        'status': header['status'],
+        'total': int(header.get('total', 0)),
+        'processed': int(header.get('processed', 0)),
+        'createdAt': header.get('createdAt'),
+        'updatedAt': header.get('updatedAt')
+    }
+    summary['counts'] = {outcome: int(header.get(outcome, 0)) for outcome in outcomes}
+    return summary
+
+
+def get_job_rows(job_id, row_prefix, page_size, start_key=None, skip_statuses=(), attributes=None):
+    """
+    Up to about page_size rows of the job whose rowKey starts with row_prefix
+    (every row for None), leaving out rows in skip_statuses.
+    Returns (rows, last_evaluated_key).
+    """
+    if row_prefix:
+        query_kwargs = {
+            'KeyConditionExpression': "jobId = :jobId AND begins_with(rowKey, :prefix)",
+            'ExpressionAttributeValues': {':jobId': job_id, ':prefix': row_prefix}
+        }
+    else:
+        query_kwargs = {
+            'KeyConditionExpression': "jobId = :jobId AND rowKey > :header",
+            'ExpressionAttributeValues': {':jobId': job_id, ':header': JOB_KEY}
+        }
+    names = {}
+    if skip_statuses:
+        placeholders = []
+        for idx, status in enumerate(skip_statuses):
+            query_kwargs['ExpressionAttributeValues'][f':skip{idx}'] = status
+            placeholders.append(f':skip{idx}')
+        query_kwargs['FilterExpression'] = f"NOT #status IN ({', '.join(placeholders)})"
+        names['#status'] = 'status'
+    if attributes:
+        query_kwargs.update(projection_kwargs(attributes, names))
+    elif names:
+        query_kwargs['ExpressionAttributeNames'] = names
+    if start_key:
+        query_kwargs['ExclusiveStartKey'] = start_key
+
+    jobs_table = get_table(JOBS_TABLE_NAME)
+    rows = []
+    while True:
+        response = jobs_table.query(**query_kwargs)
+        rows.extend(response.get('Items', []))
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key or len(rows) >= page_size:
+            return rows, last_evaluated_key
+        query_kwargs['ExclusiveStartKey'] = last_evaluated_key
@@ -0,0 +1,153 @@
+import { DynamoDBClient, QueryCommand, GetItemCommand } from '@aws-sdk/client-dynamodb';
+
+const dynamodbClient = new DynamoDBClient({ region: 'us-east-1' });
+
+const LOCATIONS_TABLE = process.env.LOCATIONS_TABLE || 'Locations';
+const LOCATIONS_NAME_INDEX = process.env.LOCATIONS_NAME_INDEX || 'name-timestamp-index';
+const CLASSES_TABLE = process.env.CLASSES_TRIPS_TABLE || 'ClassesTrips';
+
+const DEFAULT_PAGE_SIZE = 100;
+const MAX_PAGE_SIZE = 500;
+const DEFAULT_WINDOW_SECONDS = 24 * 60 * 60;
+
+const corsHeaders = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+};
+
+// nextToken = base64url JSON of { s: index into the sorted roster, k: LastEvaluatedKey,
+// since, until }; the window travels with the token so every page of a listing
+// reads the same [since, until], however long the client takes to ask for it
+const encodeToken = (position) => Buffer.from(JSON.stringify(position)).toString('base64url');
+const decodeToken = (token) => {
+    const position = JSON.parse(Buffer.from(token, 'base64url').toString('utf8'));
+    if (!Number.isInteger(position.s) || position.s < 0) {
+        throw new Error('Invalid token position');
+    }
+    if (!Number.isInteger(position.since) || !Number.isInteger(position.until)) {
+        throw new Error('Invalid token window');
+    }
+    return position;
+};
+
+const parseEpochSeconds = (value, fallback) => {
+    if (value === undefined || value === null || value === '') return fallback;
+    const seconds = Number(value);
+    if (!Number.isFinite(seconds)) {
+        throw new Error(`Invalid epoch seconds: ${value}`);
+    }
+    return Math.floor(seconds);
+};
+
+const getClassStudents = async (classId) => {
+    const response = await dynamodbClient.send(new GetItemCommand({
+        TableName: CLASSES_TABLE,
+        Key: { classId: { S: classId } },
+        ProjectionExpression: "studentsList"
+    }));
+
+    const students = (response.Item?.studentsList?.L || []).map(student => student.S).filter(Boolean);
+    return [...new Set(students)].sort();
+};
+
+const toLocation = (item) => ({
+    name: item.name.S,
+    address: item.address?.S || '',
+    date: item.date?.S || '',
+    time: item.time?.S || '',
+    latitude: parseFloat(item.latitude.N),
+    longitude: parseFloat(item.longitude.N),
+    mapsLink: item.mapsLink?.S || '',
+    emergency: item.emergency?.BOOL || false,
+    emergencyDetails: item.emergencyDetails?.S || '',
+    peers: item.peers?.S || 'None',
+    place: item.place?.S || '',
+    studentStatus: item.studentStatus?.S || 'None',
+    comments: item.comments?.S || '',
+    timestamp: parseInt(item.timestamp.N, 10)
+});
+
+// Read up to `limit` pings of the given students within [since, until], resuming at `position`
+const queryHistory = async (students, since, until, limit, position) => {
+    const locations = [];
+    let studentIndex = position.s;
+    let exclusiveStartKey = position.k;
+
+    while (studentIndex < students.length && locations.length < limit) {
+        const response = await dynamodbClient.send(new QueryCommand({
+            TableName: LOCATIONS_TABLE,
+            IndexName: LOCATIONS_NAME_INDEX,
+            KeyConditionExpression: "#nm = :name AND #ts BETWEEN :since AND :until",
+            ExpressionAttributeNames: { "#nm": "name", "#ts": "timestamp" },
+            ExpressionAttributeValues: {
+                ":name": { S: students[studentIndex] },
+                ":since": { N: String(since) },
+                ":until": { N: String(until) }
+            },
+            Limit: limit - locations.length,
+            ExclusiveStartKey: exclusiveStartKey
+        }));
+
+        locations.push(...response.Items.map(toLocation));
+        exclusiveStartKey = response.LastEvaluatedKey;
+        if (!exclusiveStartKey) {
+            studentIndex += 1;
+        }
+    }
+
+    const nextToken = studentIndex < students.length
+        ? encodeToken({ s: studentIndex, k: exclusiveStartKey, since, until })
+        : null;
+    return { locations, nextToken };
+};
+
+export const handler = async (event) => {
+    const params = event.queryStringParameters || {};
+
+    let since, until, limit, position;
+    try {
+        limit = Math.min(Math.max(parseInt(params.limit || DEFAULT_PAGE_SIZE, 10) || DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE);
+        if (params.nextToken) {
+            // Resuming: the window is the one the first page was read with
+            position = decodeToken(params.nextToken);
+            ({ since, until } = position);
+        } else {
+            until = parseEpochSeconds(params.until, Math.floor(Date.now() / 1000));
+            since = parseEpochSeconds(params.since, until - DEFAULT_WINDOW_SECONDS);
+            position = { s: 0 };
+        }
+    } catch (e) {
+        console.error("Invalid history parameters:", e);
+        return {
+            statusCode: 400,
+            headers: corsHeaders,
+            body: JSON.stringify({ message: 'Invalid since, until or nextToken' })
+        };
+    }
+
+    if (!params.classId && !params.studentName) {
+        return {
+            statusCode: 400,
+            headers: corsHeaders,
+            body: JSON.stringify({ message: 'classId or studentName is required' })
+        };
+    }
+
+    try {
+        const students = params.studentName ? [params.studentName] : await getClassStudents(params.classId);
+        const { locations, nextToken } = await queryHistory(students, since, until, limit, position);
+
+        return {
+            statusCode: 200,
+            headers: corsHeaders,
+            body: JSON.stringify({ locations, nextToken, since, until })
+        };
+    } catch (error) {
+        console.error('Error fetching location history:', error);
+        return {
+            statusCode: 500,
+            headers: corsHeaders,
+            body: JSON.stringify({ message: 'Failed to fetch location history' })
+        };
+    }
+};
@@ -1,7 +1,91 @@
-import { DynamoDBClient, ScanCommand } from '@aws-sdk/client-dynamodb';
+import { DynamoDBClient, QueryCommand, BatchGetItemCommand } from '@aws-sdk/client-dynamodb';
 
 const dynamodbClient = new DynamoDBClient({ region: 'us-east-1' });
 
+const CLASSES_TABLE = process.env.CLASSES_TRIPS_TABLE || 'ClassesTrips';
+const MEMBERSHIP_TABLE = process.env.MEMBERSHIP_TABLE || 'ClassMembership';
+const LATEST_LOCATION_TABLE = process.env.LATEST_LOCATION_TABLE || 'LatestLocation';
+
+const BATCH_GET_LIMIT = 100;
+const BATCH_GET_MAX_ATTEMPTS = 8;
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+// Classes this faculty member teaches, from the userName -> classId membership index
+const getFacultyClassIds = async (facultyName) => {
+    const classIds = [];
+    let exclusiveStartKey;
+
+    do {
+        const response = await dynamodbClient.send(new QueryCommand({
+            TableName: MEMBERSHIP_TABLE,
+            KeyConditionExpression: "userName = :faculty",
+            ProjectionExpression: "classId, #roles",
+            ExpressionAttributeNames: { "#roles": "roles" },
+            ExpressionAttributeValues: { ":faculty": { S: facultyName } },
+            ExclusiveStartKey: exclusiveStartKey
+        }));
+
+        response.Items.forEach(item => {
+            if (item.roles?.SS?.includes('faculty')) {
+                classIds.push(item.classId.S);
+            }
+        });
+        exclusiveStartKey = response.LastEvaluatedKey;
+    } while (exclusiveStartKey);
+
+    return classIds;
+};
+
+// BatchGetItem every key (100 per request), retrying UnprocessedKeys with
+// exponential backoff; throws once a chunk still has unprocessed keys after
+// BATCH_GET_MAX_ATTEMPTS requests rather than hammering a throttled table
+const batchGetAll = async (tableName, keys, projection) => {
+    const items = [];
+
+    for (let start = 0; start < keys.length; start += BATCH_GET_LIMIT) {
+        let requestItems = {
+            [tableName]: { Keys: keys.slice(start, start + BATCH_GET_LIMIT), ...projection }
+        };
+
+        for (let attempt = 1; ; attempt++) {
+            const response = await dynamodbClient.send(new BatchGetItemCommand({ RequestItems: requestItems }));
+            items.push(...(response.Responses?.[tableName] || []));
+            requestItems = response.UnprocessedKeys;
+            if (!requestItems || Object.keys(requestItems).length === 0) {
+                break;
+            }
+            if (attempt >= BATCH_GET_MAX_ATTEMPTS) {
+                throw new Error(`${tableName}: keys still unprocessed after ${attempt} BatchGetItem attempts`);
+            }
+            await sleep(Math.min(50 * 2 ** attempt, 1000));
+        }
+    }
+
+    return items;
+};
+
+// The rosters of the given classes
+const getClassRosters = (classIds) => batchGetAll(
+    CLASSES_TABLE,
+    classIds.map(classId => ({ classId: { S: classId } })),
+    { ProjectionExpression: "classId, studentsList" }
+);
+
+// Each student's newest ping from the LatestLocation projection
+const getLatestLocations = (studentNames) => batchGetAll(
+    LATEST_LOCATION_TABLE,
+    studentNames.map(name => ({ name: { S: name } })),
+    {
+        ProjectionExpression: "#nm, address, #dt, latitude, longitude, mapsLink, #tm, emergency, emergencyDetails, peers, place, studentStatus, comments",
+        ExpressionAttributeNames: {
+            "#nm": "name",
+            "#dt": "date",
+            "#tm": "time"
+        }
+    }
+);
+
 export const handler = async (event) => {
     try {
         // Get faculty name from various possible sources
@@ -30,67 +114,43 @@ export const handler = async (event) => {
         }
 
         // Step 1: Get classes/trips taught by this faculty
-        const classParams = {
-            TableName: 'ClassesTrips',
-            FilterExpression: "contains(facultyList, :faculty)",
-            ExpressionAttributeValues: { ":faculty": { S: facultyName } }
-        };
-
-        const classesData = await dynamodbClient.send(new ScanCommand(classParams));
+        const classIds = await getFacultyClassIds(facultyName);
+        const classes = await getClassRosters(classIds);
 
         // Step 2: Extract student names from these classes
         const studentSet = new Set();
-        classesData.Items.forEach(classItem => {
+        classes.forEach(classItem => {
             if (classItem.studentsList && Array.isArray(classItem.studentsList.L)) {
                 classItem.studentsList.L.forEach(student => {
-                    studentSet.add(student.S);
+                    // Legacy rosters hold {'S': name} maps instead of plain strings
+                    const studentName = student.S ?? student.M?.S?.S;
+                    if (studentName) {
+                        studentSet.add(studentName);
+                    }
                 });
             }
         });
 
-        // Step 3: Get all location data with additional fields
-        const locationParams = {
-            TableName: 'Locations',
-            ProjectionExpression: "#nm, address, #dt, latitude, longitude, mapsLink, #tm, emergency, emergencyDetails, peers, place, studentStatus, comments",
-            ExpressionAttributeNames: { 
-                "#nm": "name",
-                "#dt": "date",
-                "#tm": "time"
-            }
-        };
+        // Step 3: Get the latest location of each student in faculty's classes
+        const locations = await getLatestLocations([...studentSet]);
 
-        const locationsData = await dynamodbClient.send(new ScanCommand(locationParams));
-
-        // Step 4: Filter locations to include only students in faculty's classes
-        const latestEntries = locationsData.Items.reduce((acc, item) => {
-            const name = item.name.S;
-
-            // Skip if not in faculty's class
-            if (!studentSet.has(name)) return acc;
-
-            const entryTime = new Date(`${item.date.S}T${item.time.S}`).getTime();
-
-            // Keep only the latest entry for each student
-            if (!acc[name] || entryTime > acc[name].timestamp) {
-                acc[name] = {
-                    name: item.name.S,
-                    address: item.address.S,
-                    date: item.date.S,
-                    time: item.time.S,
-                    latitude: parseFloat(item.latitude.N),
-                    longitude: parseFloat(item.longitude.N),
-                    mapsLink: item.mapsLink.S,
-                    emergency: item.emergency?.BOOL || false,
-                    emergencyDetails: item.emergencyDetails?.S || '',
-                    peers: item.peers?.S || 'None',
-                    place: item.place?.S || '',
-                    studentStatus: item.studentStatus?.S || 'None',
-                    comments: item.comments?.S || '',
-                    timestamp: entryTime
-                };
-            }
-            return acc;
-        }, {});
+        // Step 4: Shape the response
+        const latestEntries = locations.map(item => ({
+            name: item.name.S,
+            address: item.address.S,
+            date: item.date.S,
+            time: item.time.S,
+            latitude: parseFloat(item.latitude.N),
+            longitude: parseFloat(item.longitude.N),
+            mapsLink: item.mapsLink.S,
+            emergency: item.emergency?.BOOL || false,
+            emergencyDetails: item.emergencyDetails?.S || '',
+            peers: item.peers?.S || 'None',
+            place: item.place?.S || '',
+            studentStatus: item.studentStatus?.S || 'None',
+            comments: item.comments?.S || '',
+            timestamp: new Date(`${item.date.S}T${item.time.S}`).getTime()
+        }));
 
         return {
             statusCode: 200,
@@ -98,7 +158,7 @@ export const handler = async (event) => {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*' 
             },
-            body: JSON.stringify(Object.values(latestEntries))
+            body: JSON.stringify(latestEntries)
         };
     } catch (error) {
         console.error('Error fetching locations:', error);
@@ -117,54 +117,42 @@ def lambda_handler(event, context):
 '''
 
 #allow only active trip users to login
-import boto3
 import os
 import json
-import hmac
-import hashlib
-import base64
+from membershipIndex import is_class_member
+from shared.clients import lazy_client
+from shared.auth import calculate_secret_hash
+from shared.responses import json_response, options_response
 
-cognito = boto3.client('cognito-idp')
-dynamodb = boto3.client('dynamodb')
+cognito = lazy_client('cognito-idp')
 
 USER_POOL_ID = os.environ.get('USER_POOL_ID')
 CLIENT_ID = os.environ.get('COGNITO_CLIENT_ID')
 CLIENT_SECRET = os.environ.get('COGNITO_CLIENT_SECRET')
-CLASSES_TABLE = os.environ.get('CLASSES_TABLE', 'ClassesTrips')  # Add classes table name from environment variables
+
+CORS_METHODS = "OPTIONS,POST"
+CORS_ALLOW_HEADERS = "Content-Type,Authorization"
 
 if not all([USER_POOL_ID, CLIENT_ID, CLIENT_SECRET]):
     raise ValueError("Missing required environment variables")
 
-def calculate_secret_hash(username):
-    message = username + CLIENT_ID
-    secret = bytes(CLIENT_SECRET, 'utf-8')
-    dig = hmac.new(secret, msg=message.encode('utf-8'), digestmod=hashlib.sha256).digest()
-    return base64.b64encode(dig).decode()
-
-def check_user_exists(email):
-    try:
-        cognito.admin_get_user(UserPoolId=USER_POOL_ID, Username=email)
-        return True
-    except cognito.exceptions.UserNotFoundException:
-        return False
-
 def get_user_attributes(email):
+    """
+    Fetch the user from Cognito once per request.
+    Returns the attribute dict, or None if the user does not exist.
+    """
     try:
         user_info = cognito.admin_get_user(UserPoolId=USER_POOL_ID, Username=email)
-        user_attributes = {attr['Name']: attr['Value'] for attr in user_info['UserAttributes']}
-        return user_attributes
-    except Exception as e:
-        print(f"Error fetching user attributes for {email}: {str(e)}")
-        return {}
+    except cognito.exceptions.UserNotFoundException:
+        return None
+    return {attr['Name']: attr['Value'] for attr in user_info.get('UserAttributes', [])}
 
-def get_user_role(email):
-    user_attributes = get_user_attributes(email)
+def get_user_role(email, user_attributes):
     role = user_attributes.get('custom:userRole', None)
     print(f"Retrieved role for {email}: {role}")
     return role
 
-def get_user_name(email):
-    user_attributes = get_user_attributes(email)
+def get_user_name(email, user_attributes):
     firstName = user_attributes.get('given_name', '')
     lastName = user_attributes.get('family_name', '')
     fullName = f"{firstName} {lastName}".strip()
@@ -183,47 +171,10 @@ def check_user_in_classes(email, full_name=None):
         bool: True if the user exists in any class, False otherwise
     """
     try:
-        # Scan the classes table
-        response = dynamodb.scan(
-            TableName=CLASSES_TABLE,
-            Select='ALL_ATTRIBUTES'
-        )
-        
-        if 'Items' not in response:
-            print(f"No classes found in table {CLASSES_TABLE}")
-            return False
-            
-        print(f"DEBUG - Looking for user {email} or {full_name} in class records")
-        
-        for class_item in response['Items']:
-            class_id = class_item.get('classId', {}).get('S', 'unknown')
-            print(f"DEBUG - Checking class {class_id}")
-            
-            # Check if user is in facultyList
-            if 'facultyList' in class_item:
-                faculty_list = []
-                for item in class_item['facultyList']['L']:
-                    if 'S' in item:
-                        faculty_list.append(item['S'])
-                
-                print(f"DEBUG - Faculty list: {faculty_list}")
-                
-                if email in faculty_list or (full_name and full_name in faculty_list):
-                    print(f"User {email} found in facultyList of class {class_id}")
-                    return True
-                    
-            # Check if user is in studentsList
-            if 'studentsList' in class_item:
-                students_list = []
-                for item in class_item['studentsList']['L']:
-                    if 'S' in item:
-                        students_list.append(item['S'])
-                
-                print(f"DEBUG - Students list: {students_list}")
-                
-                if email in students_list or (full_name and full_name in students_list):
-                    print(f"User {email} found in studentsList of class {class_id}")
-                    return True
+        # One keyed ClassMembership lookup per name
+        if is_class_member(email) or (full_name and is_class_member(full_name)):
+            print(f"User {email} found in an active class")
+            return True
         
         print(f"User {email} not found in any class")
         return False
@@ -235,20 +186,9 @@ def check_user_in_classes(email, full_name=None):
         return True  # Changed to True to prevent login issues if there's a problem with class check
 
 def lambda_handler(event, context):
-    # Define CORS headers once
-    cors_headers = {
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Headers": "Content-Type,Authorization",
-        "Access-Control-Allow-Methods": "OPTIONS,POST"
-    }
-    
     # Handle OPTIONS request for CORS
     if event.get('httpMethod') == 'OPTIONS':
-        return {
-            "statusCode": 200,
-            "headers": cors_headers,
-            "body": ""
-        }
+        return options_response(CORS_METHODS, CORS_ALLOW_HEADERS)
     
     try:
         # Print the entire event for debugging
@@ -259,29 +199,27 @@ def lambda_handler(event, context):
         action = body.get('action', 'login')
         
         print(f"Processing {action} request for email: {email}")
-        user_exists = check_user_exists(email)
+        # Single admin_get_user call, reused for existence, role and name
+        user_attributes = get_user_attributes(email)
+        user_exists = user_attributes is not None
         
         if action == 'check':
-            return {
-                "statusCode": 200 if user_exists else 404,
-                "headers": cors_headers,
-                "body": json.dumps({
-                    "success": user_exists,
-                    "message": "User exists" if user_exists else "User not found"
-                })
-            }
+            return json_response(200 if user_exists else 404, {
+                "success": user_exists,
+                "message": "User exists" if user_exists else "User not found"
+            }, event, CORS_METHODS, CORS_ALLOW_HEADERS)
             
         elif action == 'login':
             if not user_exists:
-                return {"statusCode": 404, "headers": cors_headers, "body": json.dumps({"success": False, "message": "Login failed: User not found"})}
+                return json_response(404, {"success": False, "message": "Login failed: User not found"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
             if 'password' not in body:
-                return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"success": False, "message": "Login failed: Password is required"})}
+                return json_response(400, {"success": False, "message": "Login failed: Password is required"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
             
             # Get user info first for class membership check
-            name = get_user_name(email)
+            name = get_user_name(email, user_attributes)
             
             # Get the user's role
-            role = get_user_role(email)
+            role = get_user_role(email, user_attributes)
             print(f"User role: {role}")
             
             # Skip class membership check for admins
@@ -303,11 +241,11 @@ def lambda_handler(event, context):
                     print(f"Fallback class check result for {username}: {user_in_class}")
             
             if not user_in_class:
-                return {"statusCode": 403, "headers": cors_headers, "body": json.dumps({
+                return json_response(403, {
                     "success": False, 
                     "message": "Access denied: User not enrolled in any class",
                     "error": "NOT_IN_CLASS"
-                })}
+                }, event, CORS_METHODS, CORS_ALLOW_HEADERS)
             
             # User exists in Cognito and is in a class (or is an admin), proceed with authentication
             try:
@@ -321,33 +259,29 @@ def lambda_handler(event, context):
                 
                 print(f"Login successful for email: {email}, role: {role}, name: {name}")
                 
-                return {
-                    "statusCode": 200,
-                    "headers": cors_headers,
-                    "body": json.dumps({
-                        "success": True,
-                        "message": f"Login successful for {email}",
-                        "idToken": tokens.get('IdToken'),
-                        "accessToken": tokens.get('AccessToken'),
-                        "refreshToken": tokens.get('RefreshToken') if body.get('remember', False) else None,
-                        "role": role,
-                        "name": name,
-                        "expiresIn": tokens.get('ExpiresIn')
-                    })
-                }
+                return json_response(200, {
+                    "success": True,
+                    "message": f"Login successful for {email}",
+                    "idToken": tokens.get('IdToken'),
+                    "accessToken": tokens.get('AccessToken'),
+                    "refreshToken": tokens.get('RefreshToken') if body.get('remember', False) else None,
+                    "role": role,
+                    "name": name,
+                    "expiresIn": tokens.get('ExpiresIn')
+                }, event, CORS_METHODS, CORS_ALLOW_HEADERS)
             except cognito.exceptions.NotAuthorizedException as e:
                 print(f"Authentication error: {str(e)}")
-                return {"statusCode": 401, "headers": cors_headers, "body": json.dumps({"success": False, "message": f"Login failed: Incorrect password for {email}"})}
+                return json_response(401, {"success": False, "message": f"Login failed: Incorrect password for {email}"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
             except cognito.exceptions.UserNotConfirmedException:
-                return {"statusCode": 403, "headers": cors_headers, "body": json.dumps({"success": False, "message": f"Login failed: User not confirmed: {email}"})}
+                return json_response(403, {"success": False, "message": f"Login failed: User not confirmed: {email}"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
             except Exception as e:
                 print(f"Cognito auth error: {str(e)}")
-                return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"success": False, "message": f"Login error: {str(e)}"})}
+                return json_response(500, {"success": False, "message": f"Login error: {str(e)}"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
                 
     except cognito.exceptions.NotAuthorizedException as e:
-        return {"statusCode": 401, "headers": cors_headers, "body": json.dumps({"success": False, "message": f"Login failed: Incorrect password for {email}"})}
+        return json_response(401, {"success": False, "message": f"Login failed: Incorrect password for {email}"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
     except cognito.exceptions.UserNotConfirmedException:
-        return {"statusCode": 403, "headers": cors_headers, "body": json.dumps({"success": False, "message": f"Login failed: User not confirmed: {email}"})}
+        return json_response(403, {"success": False, "message": f"Login failed: User not confirmed: {email}"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
     except Exception as e:
         print(f"Error processing request: {str(e)}")
-        return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"success": False, "message": "Internal server error"})}
+        return json_response(500, {"success": False, "message": "Internal server error"}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
@@ -0,0 +1,259 @@
+import os
+from botocore.exceptions import ClientError
+from tableScan import scan_all, batch_get_items
+from versionMarkers import ROSTER_VERSION, bump_version_marker, get_version_marker
+from shared.clients import get_table, lazy_table
+
+# Shared helpers for the ClassMembership reverse index (userName -> classId).
+# The roster handlers write it whenever studentsList/facultyList changes so that
+# "which classes is this user in" becomes a single keyed Query instead of a
+# contains() scan over the whole ClassesTrips table.
+#
+# Item layout:
+#   userName (hash key)  - student or faculty name as stored in the roster lists
+#   classId  (range key) - ClassesTrips classId
+#   roles                - string set, {'student'} / {'faculty'} / both
+#   className            - student rows only: class name, for emergency routing
+#   facultyList          - student rows only: the class facultyList, for emergency routing
+#
+# Roster writers bump the ROSTER_VERSION marker (see versionMarkers) through
+# invalidate_active_members(), so warm caches built from the index (emergency
+# routes, assigned students) know when to rebuild.
+
+MEMBERSHIP_TABLE_NAME = os.environ.get('MEMBERSHIP_TABLE', 'ClassMembership')
+membership_table = lazy_table(MEMBERSHIP_TABLE_NAME)
+
+ROLE_LISTS = {
+    'student': 'studentsList',
+    'faculty': 'facultyList'
+}
+
+# Version marker rows earlier deployments kept in this table, skipped by scans
+MARKER_NAMES = {'#roster-version', '#classes-version'}
+
+
+def member_name(entry):
+    """Extract a name from a roster entry (plain string or legacy {'S': value} map)"""
+    if isinstance(entry, dict):
+        return entry.get('S')
+    return entry
+
+
+def add_membership(user_name, class_id, role):
+    """Record that user_name is a member of class_id with the given role"""
+    if not user_name or not class_id:
+        return
+    membership_table.update_item(
+        Key={'userName': user_name, 'classId': class_id},
+        UpdateExpression="ADD #roles :role",
+        ExpressionAttributeNames={'#roles': 'roles'},
+        ExpressionAttributeValues={':role': {role}}
+    )
+
+
+def remove_membership(user_name, class_id, role):
+    """Drop one role of user_name in class_id, deleting the row once no role is left"""
+    if not user_name or not class_id:
+        return
+    response = membership_table.update_item(
+        Key={'userName': user_name, 'classId': class_id},
+        UpdateExpression="DELETE #roles :role",
+        ExpressionAttributeNames={'#roles': 'roles'},
+        ExpressionAttributeValues={':role': {role}},
+        ReturnValues="ALL_NEW"
+    )
+
+    # DynamoDB removes a set attribute once it becomes empty
+    if 'roles' in response.get('Attributes', {}):
+        return
+    try:
+        membership_table.delete_item(
+            Key={'userName': user_name, 'classId': class_id},
+            ConditionExpression="attribute_not_exists(#roles)",
+            ExpressionAttributeNames={'#roles': 'roles'}
+        )
+    except ClientError as e:
+        # A concurrent add re-populated the row, keep it
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+
+def remove_class(class_item):
+    """Remove every membership row of a deleted class item"""
+    class_id = class_item.get('classId')
+    for role, list_name in ROLE_LISTS.items():
+        roster = class_item.get(list_name) or []
+        if isinstance(roster, str):
+            roster = [name.strip() for name in roster.split(',')]
+        for entry in roster:
+            remove_membership(member_name(entry), class_id, role)
+
+
+def set_student_route(user_name, class_id, class_name, faculty_list):
+    """Store the emergency-alert routing (class name and faculty) on a student's membership row"""
+    if not user_name or not class_id:
+        return
+    try:
+        membership_table.update_item(
+            Key={'userName': user_name, 'classId': class_id},
+            UpdateExpression="SET #className = :className, #facultyList = :facultyList",
+            ConditionExpression="attribute_exists(userName)",
+            ExpressionAttributeNames={'#className': 'className', '#facultyList': 'facultyList'},
+            ExpressionAttributeValues={
+                ':className': class_name or 'Unknown Class',
+                ':facultyList': [member_name(entry) for entry in faculty_list or []]
+            }
+        )
+    except ClientError as e:
+        # The student left the class meanwhile, don't resurrect the row
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+
+def add_student_membership(user_name, class_id, class_name, faculty_list):
+    """add_membership + set_student_route for a student joining a class, in one write"""
+    if not user_name or not class_id:
+        return
+    membership_table.update_item(
+        Key={'userName': user_name, 'classId': class_id},
+        UpdateExpression="ADD #roles :role SET #className = :className, #facultyList = :facultyList",
+        ExpressionAttributeNames={'#roles': 'roles', '#className': 'className', '#facultyList': 'facultyList'},
+        ExpressionAttributeValues={
+            ':role': {'student'},
+            ':className': class_name or 'Unknown Class',
+            ':facultyList': [member_name(entry) for entry in faculty_list or []]
+        }
+    )
+
+
+def refresh_class_routes(class_id, class_name, faculty_list, students_list):
+    """Rewrite the routing of every student in a class after its name or facultyList changed"""
+    if isinstance(students_list, str):
+        students_list = [name.strip() for name in students_list.split(',')]
+    for entry in students_list or []:
+        set_student_route(member_name(entry), class_id, class_name, faculty_list)
+
+
+def get_student_routes(user_name):
+    """Return [{'classId', 'name', 'facultyList'}] for every class user_name attends as a student"""
+    routes = []
+    query_kwargs = {
+        'KeyConditionExpression': 'userName = :userName',
+        'ProjectionExpression': 'classId, #roles, #className, #facultyList',
+        'ExpressionAttributeNames': {'#roles': 'roles', '#className': 'className', '#facultyList': 'facultyList'},
+        'ExpressionAttributeValues': {':userName': user_name}
+    }
+
+    while True:
+        response = membership_table.query(**query_kwargs)
+        for item in response.get('Items', []):
+            if 'student' in item.get('roles', set()):
+                routes.append({
+                    'classId': item['classId'],
+                    'name': item.get('className', 'Unknown Class'),
+                    'facultyList': item.get('facultyList', [])
+                })
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            break
+        query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+    return routes
+
+
+def invalidate_active_members():
+    """Invalidation hook for roster writers: bump the roster version marker"""
+    bump_version_marker(ROSTER_VERSION)
+
+
+def get_roster_version():
+    """Current roster version (0 if no roster write has happened yet)"""
+    return get_version_marker(ROSTER_VERSION)
+
+
+def is_class_member(user_name):
+    """Whether user_name belongs to at least one class: a keyed Query for one row"""
+    if not user_name or user_name in MARKER_NAMES:
+        return False
+    response = membership_table.query(
+        KeyConditionExpression='userName = :userName',
+        ProjectionExpression='userName',
+        ExpressionAttributeValues={':userName': user_name},
+        Limit=1
+    )
+    return bool(response.get('Items'))
+
+
+def get_role_member_names(role):
+    """Every userName that holds role in at least one class"""
+    return {item['userName'] for item in scan_all(membership_table, attributes=['userName', 'roles'])
+            if role in item.get('roles', set())} - MARKER_NAMES
+
+
+def get_memberships(user_name):
+    """{classId: roles} for every class user_name belongs to"""
+    memberships = {}
+    query_kwargs = {
+        'KeyConditionExpression': 'userName = :userName',
+        'ProjectionExpression': 'classId, #roles',
+        'ExpressionAttributeNames': {'#roles': 'roles'},
+        'ExpressionAttributeValues': {':userName': user_name}
+    }
+
+    while True:
+        response = membership_table.query(**query_kwargs)
+        for item in response.get('Items', []):
+            memberships[item['classId']] = item.get('roles', set())
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            break
+        query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+    return memberships
+
+
+def get_class_ids(user_name, role=None):
+    """Return the classIds user_name belongs to, optionally restricted to one role"""
+    return [class_id for class_id, roles in get_memberships(user_name).items() if role is None or role in roles]
+
+
+def get_classes(classes_table_name, class_ids, attributes=None):
+    """BatchGetItem the given classIds from ClassesTrips, optionally projecting attributes"""
+    keys = [{'classId': class_id} for class_id in dict.fromkeys(class_ids)]
+    return batch_get_items(classes_table_name, keys, attributes)
+
+
+def get_member_classes(user_name, classes_table_name, role=None, attributes=None):
+    """Resolve the ClassesTrips items user_name belongs to via the membership index"""
+    class_ids = get_class_ids(user_name, role)
+    if not class_ids:
+        return []
+    return get_classes(classes_table_name, class_ids, attributes)
+
+
+def rebuild_from_classes(classes_table_name):
+    """Backfill the index from the current ClassesTrips rosters (one-off migration)"""
+    classes_table = get_table(classes_table_name)
+
+    count = 0
+    for class_item in scan_all(classes_table, attributes=['classId', 'name', 'studentsList', 'facultyList']):
+        for role, list_name in ROLE_LISTS.items():
+            for entry in class_item.get(list_name) or []:
+                add_membership(member_name(entry), class_item['classId'], role)
+                count += 1
+        refresh_class_routes(
+            class_item['classId'],
+            class_item.get('name'),
+            class_item.get('facultyList'),
+            class_item.get('studentsList')
+        )
+
+    invalidate_active_members()
+    print(f"Indexed {count} memberships from {classes_table_name}")
+    return count
+
+
+if __name__ == '__main__':
+    rebuild_from_classes(os.environ.get('CLASSES_TABLE', 'ClassesTrips'))
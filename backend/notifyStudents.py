@@ -214,97 +214,234 @@ def lambda_handler(event, context):
 '''
 
 import json
-import boto3
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
+from shared.clients import get_table, lazy_client
+from shared.names import normalize_name
+from shared.responses import json_response
 
 # Initialize AWS services
 '''dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
 sns = boto3.client('sns', region_name='us-east-1')'''
 
-dynamodb = boto3.resource('dynamodb')
-sns = boto3.client('sns')
+sns = lazy_client('sns')
 
 # Fetching the environment variables
 CLASSES_TRIPS_TABLE = os.environ.get('CLASSES_TRIPS_TABLE', 'ClassesTrips')
 STUDENT_SNS_TOPIC_ARN = os.environ.get('STUDENT_SNS_TOPIC_ARN')
 USERS_TABLE = os.environ.get('USERS_TABLE', 'Users')
 
-def normalize_name(name):
-    """Standardize name formatting for consistent SNS filtering"""
-    if not name:
-        return ""
-    # Remove any special characters, keep only alphanumeric and spaces
-    clean_name = ''.join(c for c in name if c.isalnum() or c == ' ')
-    # Replace spaces with hyphens
-    return clean_name.replace(' ', '-')
+# SNS fan-out settings: publish_batch accepts at most 10 entries per call
+PUBLISH_BATCH_SIZE = 10
+PUBLISH_WORKERS = int(os.environ.get('PUBLISH_WORKERS', '8'))
+PUBLISH_MAX_RETRIES = int(os.environ.get('PUBLISH_MAX_RETRIES', '3'))
+THROTTLING_ERROR_CODES = {'Throttling', 'ThrottlingException', 'Throttled', 'TooManyRequestsException'}
+SERVER_ERROR_CODES = {'InternalError', 'InternalFailure', 'ServiceUnavailable'}
 
-def format_email_message(student_name, faculty_name, message_title, message_content, student_classes, custom_status_options=None):
+CORS_METHODS = "POST,OPTIONS"
+CORS_ALLOW_HEADERS = "Content-Type"
+
+def aggregate_students(classes_items):
     """
-    Format a more personalized and meaningful email message
+    Build, in one pass over the rosters, the class details plus a
+    student -> {'classes': [...], 'statusOptions': [...]} map.
+    Dedup uses dicts keyed by name/status, so the cost is linear in the total roster size.
     """
-    now = datetime.now()
-    formatted_date = now.strftime("%B %d, %Y")
-    
-    # Create a list of classes the student is part of
-    class_list = ""
-    for idx, class_info in enumerate(student_classes):
-        class_list += f"{idx+1}. {class_info['className']}\n"
-    
-    # Format status options if provided
-    status_options = ""
-    if custom_status_options and isinstance(custom_status_options, list) and len(custom_status_options) > 0:
-        status_options = "Available status options:\n"
-        for idx, status in enumerate(custom_status_options):
-            if isinstance(status, dict) and 'S' in status:
-                status_options += f"- {status['S']}\n"
+    class_details = {}
+    students = {}
+
+    for class_item in classes_items:
+        class_id = class_item.get('classId')
+        class_name = class_item.get('name', 'Unnamed Class')
+        custom_status = class_item.get('customstatus', []) or []
+
+        # Store class details for later use
+        class_details[class_id] = {
+            'name': class_name,
+            'customStatus': custom_status
+        }
+
+        for student_entry in class_item.get('studentsList', []) or []:
+            # Extract student name based on the format (using 'S' key if it's a DynamoDB object)
+            if isinstance(student_entry, dict) and 'S' in student_entry:
+                student_name = student_entry['S']
             else:
-                status_options += f"- {status}\n"
-    
-    # Construct the email message
-    email_message = f"""
-Dear {student_name},
+                student_name = student_entry
+
+            if not student_name:
+                continue
+
+            student = students.setdefault(student_name, {'classIds': {}, 'statusOptions': {}})
+            if class_id in student['classIds']:
+                continue
+            student['classIds'][class_id] = {
+                'classId': class_id,
+                'className': class_name
+            }
+
+            # Merge the class's custom status options, keeping first-seen order
+            for status in custom_status:
+                status_key = status['S'] if isinstance(status, dict) and 'S' in status else status
+                student['statusOptions'].setdefault(status_key, status)
+
+    student_map = {
+        student_name: {
+            'classes': list(student['classIds'].values()),
+            'statusOptions': list(student['statusOptions'].values())
+        }
+        for student_name, student in students.items()
+    }
+    return class_details, student_map
+
+def is_transient(error):
+    """Throttles, SNS server errors and dropped or timed out connections are worth another try"""
+    if isinstance(error, ClientError):
+        return error.response['Error']['Code'] in THROTTLING_ERROR_CODES | SERVER_ERROR_CODES
+    return isinstance(error, (BotoConnectionError, HTTPClientError))
+
+def publish_batch_with_retry(entries, students_by_id):
+    """
+    Publish up to 10 entries with a single publish_batch call.
+    Throttled entries (or a call that failed transiently) are retried with
+    exponential backoff; returns one result per entry keyed by entry Id, so any
+    other error only fails this batch's entries.
+    """
+    results = {}
+    pending = entries
+    attempt = 0
+
+    while pending:
+        try:
+            response = sns.publish_batch(
+                TopicArn=STUDENT_SNS_TOPIC_ARN,
+                PublishBatchRequestEntries=pending
+            )
+        except Exception as e:
+            if is_transient(e) and attempt < PUBLISH_MAX_RETRIES:
+                attempt += 1
+                time.sleep(0.1 * (2 ** attempt))
+                continue
+            for entry in pending:
+                results[entry['Id']] = {
+                    'student': students_by_id[entry['Id']],
+                    'status': 'failure',
+                    'error': str(e)
+                }
+            break
+
+        for published in response.get('Successful', []):
+            results[published['Id']] = {
+                'student': students_by_id[published['Id']],
+                'status': 'success',
+                'messageId': published['MessageId']
+            }
+
+        entries_by_id = {entry['Id']: entry for entry in pending}
+        retry_entries = []
+        for failed in response.get('Failed', []):
+            if failed.get('Code') in THROTTLING_ERROR_CODES | SERVER_ERROR_CODES and attempt < PUBLISH_MAX_RETRIES:
+                retry_entries.append(entries_by_id[failed['Id']])
+            else:
+                results[failed['Id']] = {
+                    'student': students_by_id[failed['Id']],
+                    'status': 'failure',
+                    'error': f"{failed.get('Code')}: {failed.get('Message', '')}"
+                }
+
+        pending = retry_entries
+        if pending:
+            attempt += 1
+            print(f"Retrying {len(pending)} throttled or failed notification(s), attempt {attempt}")
+            time.sleep(0.1 * (2 ** attempt))
 
-{message_content}
+    return results
 
-This notification relates to the following program(s):
-{class_list}
+def publish_notifications(entries, students_by_id):
+    """Fan out the entries in batches of 10 on a bounded thread pool, preserving input order"""
+    batches = [entries[i:i + PUBLISH_BATCH_SIZE] for i in range(0, len(entries), PUBLISH_BATCH_SIZE)]
+    results = {}
 
-{status_options}
+    with ThreadPoolExecutor(max_workers=max(1, min(PUBLISH_WORKERS, len(batches)))) as executor:
+        for batch_results in executor.map(lambda batch: publish_batch_with_retry(batch, students_by_id), batches):
+            results.update(batch_results)
 
-Please log into the Study Abroad Portal to update your status and ensure your safety information is current.
+    return [results[entry['Id']] for entry in entries]
 
-Sent by: {faculty_name}
-Date: {formatted_date}
+class EmailTemplate:
+    """
+    Email body for one broadcast. The fixed text (message, sender, date, footer) is
+    rendered once, the class/status section is memoized per class-set signature and
+    only the greeting is substituted per student.
+    """
 
-TEXAS A&M UNIVERSITY
-Study Abroad Programs
-+1 (979) 123-4567
-http://studyabroad.tamu.edu
+    def __init__(self, faculty_name, message_content, sent_at=None):
+        formatted_date = (sent_at or datetime.now()).strftime("%B %d, %Y")
+        self._intro = (
+            f"\n{message_content}\n\n"
+            "This notification relates to the following program(s):\n"
+        )
+        self._closing = (
+            "\n\nPlease log into the Study Abroad Portal to update your status and ensure your safety information is current.\n\n"
+            f"Sent by: {faculty_name}\n"
+            f"Date: {formatted_date}\n\n"
+            "TEXAS A&M UNIVERSITY\n"
+            "Study Abroad Programs\n"
+            "+1 (979) 123-4567\n"
+            "http://studyabroad.tamu.edu\n\n"
+            "IMPORTANT: This email contains information related to your participation in a Texas A&M University study abroad program. Please do not ignore this communication.\n"
+        )
+        self._bodies = {}
+
+    @staticmethod
+    def _status_label(status):
+        if isinstance(status, dict) and 'S' in status:
+            return status['S']
+        return status
+
+    def _render_body(self, student_classes, custom_status_options):
+        # Create a list of classes the student is part of
+        class_list = "".join(
+            f"{idx + 1}. {class_info['className']}\n" for idx, class_info in enumerate(student_classes)
+        )
+
+        # Format status options if provided
+        status_options = ""
+        if custom_status_options and isinstance(custom_status_options, list):
+            status_options = "Available status options:\n" + "".join(
+                f"- {self._status_label(status)}\n" for status in custom_status_options
+            )
+
+        return f"{self._intro}{class_list}\n\n{status_options}{self._closing}"
+
+    def render(self, student_name, student_classes, custom_status_options=None):
+        signature = (
+            tuple(class_info['classId'] for class_info in student_classes),
+            tuple(self._status_label(status) for status in custom_status_options or [])
+        )
+        body = self._bodies.get(signature)
+        if body is None:
+            body = self._render_body(student_classes, custom_status_options)
+            self._bodies[signature] = body
+        return f"\nDear {student_name},\n{body}"
 
-IMPORTANT: This email contains information related to your participation in a Texas A&M University study abroad program. Please do not ignore this communication.
-"""
-    return email_message
+def format_email_message(student_name, faculty_name, message_title, message_content, student_classes, custom_status_options=None):
+    """
+    Format a more personalized and meaningful email message
+    """
+    template = EmailTemplate(faculty_name, message_content)
+    return template.render(student_name, student_classes, custom_status_options)
 
 def lambda_handler(event, context):
     print("Event received:", json.dumps(event))
-    headers = {
-        'Content-Type': 'application/json',
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'POST,OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type'
-    }
-
     try:
         # 1. Parse request body
         try:
             body = json.loads(event['body'])
         except (json.JSONDecodeError, KeyError) as e:
-            return {
-                'statusCode': 400,
-                'body': json.dumps({'message': 'Invalid request body'}),
-                'headers': headers
-            }
+            return json_response(400, {'message': 'Invalid request body'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
         # 2. Extract required fields
         faculty_name = body.get('facultyName')
@@ -313,14 +450,10 @@ def lambda_handler(event, context):
         specific_class_id = body.get('classId')  # Optional: to send to students of specific class only
         
         if not faculty_name:
-            return {
-                'statusCode': 400,
-                'body': json.dumps({'message': 'facultyName field is required'}),
-                'headers': headers
-            }
+            return json_response(400, {'message': 'facultyName field is required'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
         # 3. Get classes for this faculty member
-        classes_trips_table = dynamodb.Table(CLASSES_TRIPS_TABLE)
+        classes_trips_table = get_table(CLASSES_TRIPS_TABLE)
         
         if specific_class_id:
             # Get specific class
@@ -332,11 +465,7 @@ def lambda_handler(event, context):
                 
                 # Verify faculty is part of this class
                 if classes_items and faculty_name not in classes_items[0].get('facultyList', []):
-                    return {
-                        'statusCode': 403,
-                        'body': json.dumps({'message': 'Faculty is not authorized for this class'}),
-                        'headers': headers
-                    }
+                    return json_response(403, {'message': 'Faculty is not authorized for this class'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
             except Exception as e:
                 print(f"Error retrieving specific class: {str(e)}")
                 classes_items = []
@@ -350,87 +479,40 @@ def lambda_handler(event, context):
             classes_items = classes_response.get('Items', [])
         
         if not classes_items:
-            return {
-                'statusCode': 200,
-                'body': json.dumps({'message': 'No classes found for this faculty'}),
-                'headers': headers
-            }
+            return json_response(200, {'message': 'No classes found for this faculty'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
-        # 4. Collect student names from the classes
-        students_list = []
-        class_details = {}
-        
-        for class_item in classes_items:
-            class_id = class_item.get('classId')
-            class_name = class_item.get('name', 'Unnamed Class')
-            custom_status = class_item.get('customstatus', [])
-            
-            # Store class details for later use
-            class_details[class_id] = {
-                'name': class_name,
-                'students': [],
-                'customStatus': custom_status
-            }
-            
-            # Get students from this class
-            if 'studentsList' in class_item:
-                for student_entry in class_item['studentsList']:
-                    # Extract student name based on the format (using 'S' key if it's a DynamoDB object)
-                    if isinstance(student_entry, dict) and 'S' in student_entry:
-                        student_name = student_entry['S']
-                    else:
-                        student_name = student_entry
-                    
-                    if student_name and student_name not in students_list:
-                        students_list.append(student_name)
-                        class_details[class_id]['students'].append(student_name)
+        # 4. Collect student names from the classes, with each student's classes and status options
+        class_details, student_map = aggregate_students(classes_items)
 
-        if not students_list:
-            return {
-                'statusCode': 200,
-                'body': json.dumps({'message': 'No students found in these classes'}),
-                'headers': headers
-            }
+        if not student_map:
+            return json_response(200, {'message': 'No students found in these classes'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
-        # 5. Send notifications to students
-        success_count = 0
-        failure_count = 0
+        # 5. Build one notification per student
         notification_results = []
+        publish_entries = []
+        students_by_id = {}
+
+        # Parts shared by every recipient of this broadcast are rendered once
+        sent_at = datetime.now()
+        email_template = EmailTemplate(faculty_name, message_content, sent_at)
+        timestamp = sent_at.isoformat()
+        sms_message = f"{message_title}: {message_content[:100]}..." if len(message_content) > 100 else f"{message_title}: {message_content}"
         
-        for student_name in students_list:
+        for student_name, student in student_map.items():
             try:
-                # Gather all classes this student belongs to
-                student_classes = []
-                custom_status_options = []
-                
-                for class_id, details in class_details.items():
-                    if student_name in details['students']:
-                        student_classes.append({
-                            'classId': class_id,
-                            'className': details['name']
-                        })
-                        # Get custom status options if available
-                        if details['customStatus'] and len(details['customStatus']) > 0:
-                            for status in details['customStatus']:
-                                if status not in custom_status_options:
-                                    custom_status_options.append(status)
+                # Classes this student belongs to and their merged status options
+                student_classes = student['classes']
+                custom_status_options = student['statusOptions']
                 
                 # Format a meaningful email message
-                email_message = format_email_message(
-                    student_name=student_name,
-                    faculty_name=faculty_name,
-                    message_title=message_title,
-                    message_content=message_content,
-                    student_classes=student_classes,
-                    custom_status_options=custom_status_options
-                )
+                email_message = email_template.render(student_name, student_classes, custom_status_options)
                 
                 # JSON payload for the mobile app
                 json_payload = {
                     'title': message_title,
                     'message': message_content,
                     'facultyName': faculty_name,
-                    'timestamp': datetime.now().isoformat(),
+                    'timestamp': timestamp,
                     'classes': student_classes,
                     'statusOptions': custom_status_options
                 }
@@ -450,53 +532,46 @@ def lambda_handler(event, context):
                     }
                 }
                 
-                # Send the notification - format differently for email vs. mobile
-                response = sns.publish(
-                    TopicArn=STUDENT_SNS_TOPIC_ARN,
-                    Message=json.dumps({
+                # Queue the notification - format differently for email vs. mobile
+                entry_id = f"student-{len(publish_entries)}"
+                students_by_id[entry_id] = student_name
+                publish_entries.append({
+                    'Id': entry_id,
+                    'Message': json.dumps({
                         'default': json.dumps(json_payload),
                         'email': email_message,
-                        'sms': f"{message_title}: {message_content[:100]}..." if len(message_content) > 100 else f"{message_title}: {message_content}"
+                        'sms': sms_message
                     }),
-                    Subject=message_title,
-                    MessageStructure='json',
-                    MessageAttributes=message_attributes
-                )
-                
-                print(f"Sent notification to student {student_name}, MessageId: {response['MessageId']}")
-                success_count += 1
-                notification_results.append({
-                    'student': student_name,
-                    'status': 'success',
-                    'messageId': response['MessageId']
+                    'Subject': message_title,
+                    'MessageStructure': 'json',
+                    'MessageAttributes': message_attributes
                 })
                 
             except Exception as e:
-                print(f"Failed to send notification to student {student_name}: {str(e)}")
-                failure_count += 1
+                print(f"Failed to build notification for student {student_name}: {str(e)}")
                 notification_results.append({
                     'student': student_name,
                     'status': 'failure',
                     'error': str(e)
                 })
 
-        # 6. Return results
-        return {
-            'statusCode': 200,
-            'body': json.dumps({
-                'message': f'Successfully notified {success_count} students. Failed to notify {failure_count} students.',
-                'success': success_count,
-                'failure': failure_count,
-                'results': notification_results,
-                'classes': [{'classId': c_id, 'name': details['name']} for c_id, details in class_details.items()]
-            }),
-            'headers': headers
-        }
+        # 6. Send notifications in batches of 10 on a bounded thread pool
+        if publish_entries:
+            notification_results.extend(publish_notifications(publish_entries, students_by_id))
+
+        success_count = sum(1 for result in notification_results if result['status'] == 'success')
+        failure_count = len(notification_results) - success_count
+        print(f"Notification fan-out complete: {success_count} sent, {failure_count} failed")
+
+        # 7. Return results
+        return json_response(200, {
+            'message': f'Successfully notified {success_count} students. Failed to notify {failure_count} students.',
+            'success': success_count,
+            'failure': failure_count,
+            'results': notification_results,
+            'classes': [{'classId': c_id, 'name': details['name']} for c_id, details in class_details.items()]
+        }, event, CORS_METHODS, CORS_ALLOW_HEADERS)
 
     except Exception as e:
         print(f"An error occurred: {str(e)}")
-        return {
-            'statusCode': 500,
-            'body': json.dumps({'message': f'Error processing request: {str(e)}'}),
-            'headers': headers
-        }
+        return json_response(500, {'message': f'Error processing request: {str(e)}'}, event, CORS_METHODS, CORS_ALLOW_HEADERS)
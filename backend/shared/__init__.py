@@ -0,0 +1,3 @@
+# Shared runtime for the Study Abroad Lambda handlers, shipped as a Lambda layer
+# (see terraform-project/modules/lambda-layer). Keep it free of heavy imports:
+# boto3 is only loaded when the first client is actually used.
@@ -0,0 +1,19 @@
+import base64
+import hashlib
+import hmac
+import os
+
+
+def calculate_secret_hash(username, client_id=None, client_secret=None):
+    """
+    Calculate the SECRET_HASH required for Cognito API calls.
+    Defaults to the COGNITO_CLIENT_ID / COGNITO_CLIENT_SECRET environment variables;
+    returns None when the app client has no secret.
+    """
+    client_id = client_id or os.environ['COGNITO_CLIENT_ID']
+    client_secret = client_secret if client_secret is not None else os.environ.get('COGNITO_CLIENT_SECRET')
+    if not client_secret:
+        return None
+    message = username + client_id
+    dig = hmac.new(client_secret.encode('utf-8'), msg=message.encode('utf-8'), digestmod=hashlib.sha256).digest()
+    return base64.b64encode(dig).decode()
@@ -0,0 +1,182 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from shared.responses import get_header
+
+# Local verification of the Cognito tokens the frontend sends as
+# `Authorization: Bearer <idToken>`: RS256 signature against the user pool's
+# JWKS, then expiry, issuer, token use and (when COGNITO_CLIENT_ID is set) the
+# app client. The JWKS is fetched once per warm container and refetched when a
+# token names a key it doesn't hold (Cognito key rotation), so an authorized
+# request costs no network call and no DynamoDB read.
+#
+# Plain stdlib on purpose: the Lambda runtime ships no JWT/crypto package and
+# RS256 verification is one modular exponentiation.
+#
+# Roles come from the `cognito:groups` claim. `custom:userRole` is writable by
+# the user through the app client, so it is never trusted for authorization.
+
+JWKS_MAX_AGE = int(os.environ.get('JWKS_MAX_AGE_SECONDS', '21600'))
+# Unknown kids trigger a refetch at most this often, so forged kids can't hammer Cognito
+JWKS_MIN_REFRESH_INTERVAL = int(os.environ.get('JWKS_MIN_REFRESH_SECONDS', '60'))
+JWKS_FETCH_TIMEOUT = 3  # seconds
+CLOCK_SKEW_LEEWAY = 60  # seconds
+
+TOKEN_USES = ('id', 'access')
+
+# ASN.1 DigestInfo prefix of a SHA-256 hash (RFC 8017 section 9.2)
+SHA256_DIGEST_INFO = bytes.fromhex('3031300d060960864801650304020105000420')
+
+_jwks_cache = {}  # jwks url -> {'keys': {kid: (n, e)}, 'fetchedAt': epoch seconds}
+_jwks_lock = threading.Lock()
+
+
+class AuthError(Exception):
+    """The request carries no valid token, or the token lacks the required group"""
+
+
+def b64url_decode(segment):
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+
+def b64url_int(segment):
+    return int.from_bytes(b64url_decode(segment), 'big')
+
+
+def pool_region(user_pool_id):
+    """Region of a user pool id such as us-east-1_AbCdEf"""
+    return user_pool_id.split('_', 1)[0]
+
+
+def pool_issuer(user_pool_id):
+    return f"https://cognito-idp.{pool_region(user_pool_id)}.amazonaws.com/{user_pool_id}"
+
+
+def fetch_jwks(url):
+    """Download a JWKS document"""
+    import urllib.request
+
+    with urllib.request.urlopen(url, timeout=JWKS_FETCH_TIMEOUT) as response:
+        return json.loads(response.read())
+
+
+def parse_jwks(jwks):
+    """{kid: (modulus, exponent)} of the RS256 signing keys in a JWKS document"""
+    keys = {}
+    for key in jwks.get('keys', []):
+        if key.get('kty') != 'RSA' or key.get('alg', 'RS256') != 'RS256' or key.get('use', 'sig') != 'sig':
+            continue
+        keys[key['kid']] = (b64url_int(key['n']), b64url_int(key['e']))
+    return keys
+
+
+def get_signing_key(jwks_url, kid):
+    """(n, e) of key kid, refetching the JWKS when it is stale or doesn't know kid; None if unknown"""
+    entry = _jwks_cache.get(jwks_url)
+    now = time.time()
+    if entry and kid in entry['keys'] and now - entry['fetchedAt'] < JWKS_MAX_AGE:
+        return entry['keys'][kid]
+    if entry and now - entry['fetchedAt'] < JWKS_MIN_REFRESH_INTERVAL:
+        return entry['keys'].get(kid)
+
+    with _jwks_lock:
+        # Another thread may have refreshed while this one waited
+        entry = _jwks_cache.get(jwks_url)
+        if not entry or time.time() - entry['fetchedAt'] >= JWKS_MIN_REFRESH_INTERVAL:
+            try:
+                entry = {'keys': parse_jwks(fetch_jwks(jwks_url)), 'fetchedAt': time.time()}
+                _jwks_cache[jwks_url] = entry
+            except Exception as e:
+                if not entry:
+                    raise AuthError(f"Could not load JWKS: {str(e)}") from e
+                # Keep serving the keys already held
+                print(f"JWKS refresh failed, using cached keys: {str(e)}")
+    return entry['keys'].get(kid)
+
+
+def rs256_verify(signing_input, signature, n, e):
+    """RSASSA-PKCS1-v1_5 / SHA-256 signature check (RFC 8017 section 8.2.2)"""
+    size = (n.bit_length() + 7) // 8
+    if len(signature) != size:
+        return False
+    s = int.from_bytes(signature, 'big')
+    if s >= n:
+        return False
+
+    # Compare against the full expected encoding rather than parsing the decrypted block
+    digest_info = SHA256_DIGEST_INFO + hashlib.sha256(signing_input).digest()
+    if size < len(digest_info) + 11:
+        return False
+    expected = b'\x00\x01' + b'\xff' * (size - len(digest_info) - 3) + b'\x00' + digest_info
+    return hmac.compare_digest(pow(s, e, n).to_bytes(size, 'big'), expected)
+
+
+def verify_token(token, user_pool_id=None, client_id=None):
+    """
+    Claims of a Cognito id or access token issued by user_pool_id (default
+    USER_POOL_ID) for client_id (default COGNITO_CLIENT_ID, unchecked when
+    unset). Raises AuthError if the token is malformed, forged, expired or
+    issued elsewhere.
+    """
+    user_pool_id = user_pool_id or os.environ['USER_POOL_ID']
+    client_id = client_id or os.environ.get('COGNITO_CLIENT_ID')
+    issuer = pool_issuer(user_pool_id)
+
+    try:
+        header_segment, claims_segment, signature_segment = token.split('.')
+        header = json.loads(b64url_decode(header_segment))
+        claims = json.loads(b64url_decode(claims_segment))
+        signature = b64url_decode(signature_segment)
+    except (ValueError, TypeError, AttributeError) as e:
+        raise AuthError("Malformed token") from e
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        raise AuthError("Malformed token")
+
+    if header.get('alg') != 'RS256':
+        raise AuthError(f"Unsupported token algorithm {header.get('alg')}")
+    key = get_signing_key(f"{issuer}/.well-known/jwks.json", header.get('kid'))
+    if not key:
+        raise AuthError(f"Unknown signing key {header.get('kid')}")
+    if not rs256_verify(f"{header_segment}.{claims_segment}".encode('ascii'), signature, *key):
+        raise AuthError("Invalid token signature")
+
+    now = time.time()
+    if not isinstance(claims.get('exp'), (int, float)) or claims['exp'] + CLOCK_SKEW_LEEWAY < now:
+        raise AuthError("Token expired")
+    if claims.get('iss') != issuer:
+        raise AuthError("Token issued by another user pool")
+    token_use = claims.get('token_use')
+    if token_use not in TOKEN_USES:
+        raise AuthError(f"Unexpected token use {token_use}")
+    if client_id:
+        audience = claims.get('aud') if token_use == 'id' else claims.get('client_id')
+        if audience != client_id:
+            raise AuthError("Token issued for another app client")
+    return claims
+
+
+def bearer_token(event):
+    """Token of the request's `Authorization: Bearer` header, or None"""
+    auth_header = get_header(event, 'Authorization') or ''
+    scheme, _, token = auth_header.partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        return None
+    return token.strip()
+
+
+def authorize(event, group=None):
+    """
+    Verified token claims of the request; with group, the caller must also be a
+    member of that Cognito group. Raises AuthError otherwise.
+    """
+    token = bearer_token(event)
+    if not token:
+        raise AuthError("Missing bearer token")
+    claims = verify_token(token)
+    if group and group not in claims.get('cognito:groups', []):
+        raise AuthError(f"{claims.get('cognito:username') or claims.get('username')} is not in group {group}")
+    return claims
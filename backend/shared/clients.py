@@ -0,0 +1,83 @@
+import threading
+
+# Lazily constructed, process-wide cached boto3 clients/resources/tables.
+# Handlers keep their module-level names (cognito, sns, table, ...) but bind
+# them to lazy proxies, so a cold start only pays for boto3 and the service
+# models a request actually touches, and every module in the container shares
+# one client per service.
+
+_lock = threading.Lock()
+_clients = {}
+_resources = {}
+_tables = {}
+
+
+def get_client(service_name):
+    """Cached boto3 client for service_name"""
+    client = _clients.get(service_name)
+    if client is None:
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                import boto3
+                client = _clients[service_name] = boto3.client(service_name)
+    return client
+
+
+def get_resource(service_name):
+    """Cached boto3 resource for service_name"""
+    resource = _resources.get(service_name)
+    if resource is None:
+        with _lock:
+            resource = _resources.get(service_name)
+            if resource is None:
+                import boto3
+                resource = _resources[service_name] = boto3.resource(service_name)
+    return resource
+
+
+def get_table(table_name):
+    """Cached DynamoDB Table resource"""
+    table = _tables.get(table_name)
+    if table is None:
+        table = get_resource('dynamodb').Table(table_name)
+        _tables[table_name] = table
+    return table
+
+
+class LazyProxy:
+    """Stand-in that builds its target on first attribute access"""
+
+    __slots__ = ('_factory', '_target')
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_target', None)
+
+    def _resolve(self):
+        target = object.__getattribute__(self, '_target')
+        if target is None:
+            target = object.__getattribute__(self, '_factory')()
+            object.__setattr__(self, '_target', target)
+        return target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._resolve(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self._resolve(), name)
+
+
+def lazy_client(service_name):
+    return LazyProxy(lambda: get_client(service_name))
+
+
+def lazy_resource(service_name):
+    return LazyProxy(lambda: get_resource(service_name))
+
+
+def lazy_table(table_name):
+    return LazyProxy(lambda: get_table(table_name))
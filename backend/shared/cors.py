@@ -0,0 +1,7 @@
+def build_cors_headers(methods="OPTIONS,POST", allow_headers="Content-Type"):
+    """CORS response headers shared by the API handlers"""
+    return {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Headers": allow_headers,
+        "Access-Control-Allow-Methods": methods
+    }
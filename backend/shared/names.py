@@ -0,0 +1,8 @@
+def normalize_name(name):
+    """Standardize name formatting for consistent SNS filtering"""
+    if not name:
+        return ""
+    # Remove any special characters, keep only alphanumeric and spaces
+    clean_name = ''.join(c for c in name if c.isalnum() or c == ' ')
+    # Replace spaces with hyphens
+    return clean_name.replace(' ', '-')
@@ -0,0 +1,36 @@
+import base64
+import json
+from shared.responses import dumps
+
+# Opt-in cursor pagination for list endpoints: a request carrying `limit` or
+# `nextToken` gets one page and an opaque token for the next, while requests
+# without them keep the full, unpaginated response.
+
+
+def encode_token(key):
+    """Opaque continuation token for a DynamoDB ExclusiveStartKey"""
+    return base64.urlsafe_b64encode(dumps(key).encode('utf-8')).decode('utf-8')
+
+
+def decode_token(token):
+    key = json.loads(base64.urlsafe_b64decode(token.encode('utf-8')))
+    if not isinstance(key, dict) or not key:
+        raise ValueError("Invalid continuation token")
+    return key
+
+
+def page_params(event, max_page_size):
+    """
+    (paginated, limit, start_key) from the query string; limit is clamped to
+    1..max_page_size. Raises ValueError for a malformed limit or nextToken.
+    """
+    query_params = (event or {}).get('queryStringParameters') or {}
+    if 'limit' not in query_params and 'nextToken' not in query_params:
+        return False, None, None
+
+    try:
+        limit = max(1, min(int(query_params.get('limit') or max_page_size), max_page_size))
+        start_key = decode_token(query_params['nextToken']) if query_params.get('nextToken') else None
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid limit or nextToken") from e
+    return True, limit, start_key
@@ -0,0 +1,130 @@
+import base64
+import gzip
+import hashlib
+import json
+import os
+from decimal import Decimal
+from shared.cors import build_cors_headers
+
+# One JSON/HTTP response layer for the API handlers: a single Decimal/set-aware
+# encoder (DynamoDB items come back with Decimal numbers and Python sets),
+# CORS + Content-Type headers, ETags for conditional GETs and optional gzip.
+#
+# Gzip is off unless RESPONSE_GZIP_MIN_BYTES is set: API Gateway only passes a
+# base64 gzip body through as binary when the API is configured for it.
+
+GZIP_MIN_BYTES = int(os.environ.get('RESPONSE_GZIP_MIN_BYTES', '0'))
+GZIP_LEVEL = 5
+
+
+def encode_default(obj):
+    """JSON fallback for the types DynamoDB hands back"""
+    if isinstance(obj, Decimal):
+        # Whole numbers stay ints, fractions keep their precision as floats
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        try:
+            return sorted(obj)
+        except TypeError:
+            return list(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return base64.b64encode(obj).decode('ascii')
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# Reused encoder instance: json.dumps(cls=...) builds a new encoder per call
+_encoder = json.JSONEncoder(default=encode_default, separators=(',', ':'))
+
+
+def dumps(data):
+    """Serialize data (DynamoDB items included) to a compact JSON string"""
+    return _encoder.encode(data)
+
+
+def get_header(event, name):
+    """Case-insensitive request header lookup"""
+    headers = (event or {}).get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def compute_etag(body):
+    """Strong ETag of a response body"""
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(event, etag):
+    """True if the request's If-None-Match covers etag"""
+    if_none_match = get_header(event, 'If-None-Match')
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Weak comparison, as RFC 9110 prescribes for If-None-Match
+    return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
+
+
+def accepts_gzip(event):
+    accept_encoding = get_header(event, 'Accept-Encoding') or ''
+    return 'gzip' in accept_encoding.lower()
+
+
+def json_response(status_code, data, event=None, methods="OPTIONS,POST", allow_headers="Content-Type",
+                  headers=None, etag=False):
+    """
+    Build an API Gateway proxy response with a JSON body.
+    With etag=True the body's ETag is returned (or etag itself when it is a
+    precomputed tag), and a request whose If-None-Match already holds it gets an
+    empty 304. Bodies of at least RESPONSE_GZIP_MIN_BYTES are gzipped for clients
+    that accept it.
+    """
+    response_headers = {'Content-Type': 'application/json'}
+    response_headers.update(build_cors_headers(methods, allow_headers))
+    if headers:
+        response_headers.update(headers)
+
+    body = None
+    if etag and status_code == 200:
+        if not isinstance(etag, str):
+            body = dumps(data)
+            etag = compute_etag(body)
+        response_headers['ETag'] = etag
+        response_headers['Access-Control-Expose-Headers'] = 'ETag'
+        if etag_matches(event, etag):
+            return {'statusCode': 304, 'headers': response_headers, 'body': ''}
+
+    if body is None:
+        body = dumps(data)
+
+    if GZIP_MIN_BYTES and len(body) >= GZIP_MIN_BYTES and accepts_gzip(event):
+        response_headers['Content-Encoding'] = 'gzip'
+        response_headers['Vary'] = 'Accept-Encoding'
+        return {
+            'statusCode': status_code,
+            'headers': response_headers,
+            'body': base64.b64encode(gzip.compress(body.encode('utf-8'), GZIP_LEVEL)).decode('ascii'),
+            'isBase64Encoded': True
+        }
+
+    return {'statusCode': status_code, 'headers': response_headers, 'body': body}
+
+
+def not_modified_response(etag, methods="OPTIONS,POST", allow_headers="Content-Type"):
+    """304 for a conditional request whose If-None-Match already holds etag"""
+    response_headers = build_cors_headers(methods, allow_headers)
+    response_headers['ETag'] = etag
+    response_headers['Access-Control-Expose-Headers'] = 'ETag'
+    return {'statusCode': 304, 'headers': response_headers, 'body': ''}
+
+
+def options_response(methods="OPTIONS,POST", allow_headers="Content-Type", status_code=200):
+    """Response to a CORS preflight request"""
+    return {
+        'statusCode': status_code,
+        'headers': build_cors_headers(methods, allow_headers),
+        'body': ''
+    }
@@ -0,0 +1,39 @@
+import random
+import threading
+import time
+
+# Client-side throttling for batch jobs that call rate-limited AWS APIs (the
+# Cognito user pool quotas) from a worker pool.
+
+
+class RateLimiter:
+    """Spaces calls from all worker threads at least 1/rate seconds apart"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def error_code(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+
+def throttled_call(limiter, function, max_attempts, throttle_code='TooManyRequestsException', **kwargs):
+    """function(**kwargs) behind limiter, backing off while the service answers throttle_code"""
+    for attempt in range(max_attempts):
+        limiter.acquire()
+        try:
+            return function(**kwargs)
+        except Exception as e:
+            if error_code(e) != throttle_code or attempt == max_attempts - 1:
+                raise
+            time.sleep(random.uniform(0, min(0.2 * 2 ** attempt, 5)))
@@ -0,0 +1,118 @@
+import os
+import json
+from datetime import datetime
+from shared.clients import lazy_client, lazy_table
+from shared.names import normalize_name
+
+# Registry of the SNS email subscriptions made for users, keyed by
+# (email, topicArn), so a filter-policy update is a GetItem instead of a
+# list_subscriptions_by_topic walk over every subscriber of the topic.
+#
+# Item layout:
+#   email (hash key)     - subscribed address, lower-cased
+#   topicArn (range key) - topic the address is subscribed to
+#   subscriptionArn      - ARN returned by subscribe (ReturnSubscriptionArn=True)
+#   role                 - 'faculty' / 'student'
+#   createdAt / updatedAt
+#
+# Subscriptions made before the registry existed are found once by a paginated
+# topic listing and recorded on the way.
+
+SUBSCRIPTIONS_TABLE_NAME = os.environ.get('SUBSCRIPTIONS_TABLE', 'SnsSubscriptions')
+subscriptions_table = lazy_table(SUBSCRIPTIONS_TABLE_NAME)
+sns = lazy_client('sns')
+
+# role -> (per-user attribute prefix, attribute every member of the role matches)
+ROLE_FILTERS = {
+    'faculty': ('faculty', 'all-faculty'),
+    'student': ('student', 'all-students')
+}
+
+PENDING_CONFIRMATION = 'pending confirmation'
+
+
+def filter_policy(role, full_name):
+    """SNS filter policy delivering a user's own messages and their role's broadcasts"""
+    prefix, everyone = ROLE_FILTERS[role]
+    return {
+        f"{prefix}-{normalize_name(full_name)}": ["true"],
+        everyone: ["true"]
+    }
+
+
+def record_subscription(email, topic_arn, subscription_arn, role):
+    """Register the subscription returned by sns.subscribe"""
+    if not subscription_arn or not subscription_arn.startswith('arn:'):
+        # Without ReturnSubscriptionArn a pending subscription has no ARN yet
+        return
+    now = datetime.utcnow().isoformat()
+    subscriptions_table.update_item(
+        Key={'email': email.lower(), 'topicArn': topic_arn},
+        UpdateExpression="SET subscriptionArn = :arn, #role = :role, updatedAt = :now, "
+                         "createdAt = if_not_exists(createdAt, :now)",
+        ExpressionAttributeNames={'#role': 'role'},
+        ExpressionAttributeValues={':arn': subscription_arn, ':role': role, ':now': now}
+    )
+
+
+def forget_subscription(email, topic_arn):
+    subscriptions_table.delete_item(Key={'email': email.lower(), 'topicArn': topic_arn})
+
+
+def get_subscription_arn(email, topic_arn):
+    """Registered subscription ARN of email on topic_arn, or None"""
+    response = subscriptions_table.get_item(
+        Key={'email': email.lower(), 'topicArn': topic_arn},
+        ProjectionExpression='subscriptionArn'
+    )
+    return response.get('Item', {}).get('subscriptionArn')
+
+
+def find_subscription_arn(email, topic_arn):
+    """Look email up in the topic's full subscriber listing (every page); None if absent or still pending"""
+    kwargs = {'TopicArn': topic_arn}
+    while True:
+        response = sns.list_subscriptions_by_topic(**kwargs)
+        for subscription in response.get('Subscriptions', []):
+            subscription_arn = subscription.get('SubscriptionArn', '')
+            if (subscription.get('Endpoint') or '').lower() == email.lower() and subscription_arn.startswith('arn:'):
+                return subscription_arn
+
+        if not response.get('NextToken'):
+            return None
+        kwargs['NextToken'] = response['NextToken']
+
+
+def set_filter_policy(subscription_arn, role, full_name):
+    policy = filter_policy(role, full_name)
+    print(f"Setting filter policy for subscription: {json.dumps(policy)}")
+    sns.set_subscription_attributes(
+        SubscriptionArn=subscription_arn,
+        AttributeName='FilterPolicy',
+        AttributeValue=json.dumps(policy)
+    )
+
+
+def update_filter_policy(email, topic_arn, role, full_name):
+    """
+    Point the filter policy of email's subscription at full_name.
+    Returns False if email has no (confirmed or pending) subscription on the topic.
+    """
+    subscription_arn = get_subscription_arn(email, topic_arn)
+    if subscription_arn:
+        try:
+            set_filter_policy(subscription_arn, role, full_name)
+            return True
+        except Exception as e:
+            if getattr(e, 'response', {}).get('Error', {}).get('Code') != 'NotFound':
+                raise
+            # Unsubscribed since it was registered
+            print(f"Registered subscription {subscription_arn} no longer exists")
+            forget_subscription(email, topic_arn)
+
+    subscription_arn = find_subscription_arn(email, topic_arn)
+    if not subscription_arn:
+        return False
+    record_subscription(email, topic_arn, subscription_arn, role)
+    set_filter_policy(subscription_arn, role, full_name)
+    return True
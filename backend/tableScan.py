@@ -0,0 +1,97 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from shared.clients import get_resource
+
+# Shared DynamoDB scan helpers. A single table.scan() call stops at 1 MB and
+# returns LastEvaluatedKey; these helpers always follow it, and can split the
+# table into Segment/TotalSegments parallel scans run on a thread pool.
+# batch_get_items does the same for BatchGetItem and its UnprocessedKeys.
+
+SCAN_SEGMENTS = int(os.environ.get('SCAN_SEGMENTS', '4'))
+BATCH_GET_LIMIT = 100
+
+
+def projection_kwargs(attributes, expression_attribute_names=None):
+    """Build ProjectionExpression kwargs, aliasing every attribute to dodge reserved words"""
+    names = dict(expression_attribute_names or {})
+    placeholders = []
+    for idx, attribute in enumerate(attributes):
+        placeholder = f"#p{idx}"
+        names[placeholder] = attribute
+        placeholders.append(placeholder)
+    return {
+        'ProjectionExpression': ', '.join(placeholders),
+        'ExpressionAttributeNames': names
+    }
+
+
+def scan_pages(table, attributes=None, **scan_kwargs):
+    """Yield the Items of every page of a (segment) scan, following LastEvaluatedKey"""
+    scan_kwargs = dict(scan_kwargs)
+    if attributes:
+        scan_kwargs.update(projection_kwargs(attributes, scan_kwargs.get('ExpressionAttributeNames')))
+
+    while True:
+        response = table.scan(**scan_kwargs)
+        yield response.get('Items', [])
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            break
+        scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+
+def scan_segment(table, segment, total_segments, attributes=None, **scan_kwargs):
+    """Read one Segment of a parallel scan to the end"""
+    if total_segments > 1:
+        scan_kwargs = dict(scan_kwargs, Segment=segment, TotalSegments=total_segments)
+    items = []
+    for page in scan_pages(table, attributes=attributes, **scan_kwargs):
+        items.extend(page)
+    return items
+
+
+def scan_all(table, attributes=None, total_segments=None, **scan_kwargs):
+    """
+    Return every item of the table matching scan_kwargs (FilterExpression etc.).
+    attributes pushes a ProjectionExpression down to DynamoDB; total_segments > 1
+    reads the segments concurrently (defaults to the SCAN_SEGMENTS env setting).
+    """
+    total_segments = max(1, total_segments or SCAN_SEGMENTS)
+    if total_segments == 1:
+        return scan_segment(table, 0, 1, attributes=attributes, **scan_kwargs)
+
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        segments = executor.map(
+            lambda segment: scan_segment(table, segment, total_segments, attributes=attributes, **scan_kwargs),
+            range(total_segments)
+        )
+        return [item for segment_items in segments for item in segment_items]
+
+
+def batch_get_items(table_name, keys, attributes=None):
+    """
+    BatchGetItem every key (in chunks of 100), retrying UnprocessedKeys with
+    backoff. attributes pushes a ProjectionExpression down; items come back in
+    no particular order.
+    """
+    items = []
+    keys = list(keys)
+
+    for start in range(0, len(keys), BATCH_GET_LIMIT):
+        request = {'Keys': keys[start:start + BATCH_GET_LIMIT]}
+        if attributes:
+            request.update(projection_kwargs(attributes))
+
+        request_items = {table_name: request}
+        attempt = 0
+        while request_items:
+            response = get_resource('dynamodb').batch_get_item(RequestItems=request_items)
+            items.extend(response.get('Responses', {}).get(table_name, []))
+            request_items = response.get('UnprocessedKeys') or {}
+            if request_items:
+                attempt += 1
+                time.sleep(min(0.05 * (2 ** attempt), 1))
+
+    return items
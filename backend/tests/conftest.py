@@ -0,0 +1,11 @@
+import os
+import sys
+
+# The handlers import their sibling modules (and shared/) from the backend
+# directory, the way the Lambda runtime and the layer lay them out.
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
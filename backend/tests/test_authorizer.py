@@ -0,0 +1,243 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+from shared import authorizer
+
+# shared.authorizer against key sets generated here: tokens are signed with a
+# local RSA key and the JWKS "download" is served from memory.
+
+USER_POOL_ID = 'us-east-1_TestPool'
+CLIENT_ID = 'test-client'
+ISSUER = f"https://cognito-idp.us-east-1.amazonaws.com/{USER_POOL_ID}"
+JWKS_URL = f"{ISSUER}/.well-known/jwks.json"
+
+
+def b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def b64url_json(value):
+    return b64url(json.dumps(value).encode())
+
+
+def int_bytes(value):
+    return value.to_bytes((value.bit_length() + 7) // 8, 'big')
+
+
+def new_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def jwk(kid, private_key):
+    numbers = private_key.public_key().public_numbers()
+    return {'kid': kid, 'kty': 'RSA', 'alg': 'RS256', 'use': 'sig',
+            'n': b64url(int_bytes(numbers.n)), 'e': b64url(int_bytes(numbers.e))}
+
+
+def sign(private_key, signing_input):
+    return private_key.sign(signing_input, padding.PKCS1v15(), hashes.SHA256())
+
+
+def make_token(private_key, kid='key1', alg='RS256', **overrides):
+    now = int(time.time())
+    claims = {
+        'sub': 'user-1',
+        'iss': ISSUER,
+        'aud': CLIENT_ID,
+        'token_use': 'id',
+        'cognito:username': 'admin1',
+        'cognito:groups': ['admin'],
+        'iat': now,
+        'exp': now + 3600
+    }
+    claims.update(overrides)
+    signing_input = f"{b64url_json({'kid': kid, 'alg': alg})}.{b64url_json(claims)}"
+    return f"{signing_input}.{b64url(sign(private_key, signing_input.encode()))}"
+
+
+@pytest.fixture(scope='module')
+def keys():
+    return {'key1': new_key(), 'key2': new_key(), 'other': new_key()}
+
+
+@pytest.fixture
+def jwks(keys, monkeypatch):
+    """The pool's published keys (mutable by the test) and the list of fetched urls"""
+    published = {'key1': keys['key1']}
+    fetches = []
+
+    def fetch_jwks(url):
+        fetches.append(url)
+        return {'keys': [jwk(kid, key) for kid, key in published.items()]}
+
+    monkeypatch.setattr(authorizer, 'fetch_jwks', fetch_jwks)
+    monkeypatch.setattr(authorizer, '_jwks_cache', {})
+    monkeypatch.setenv('USER_POOL_ID', USER_POOL_ID)
+    monkeypatch.setenv('COGNITO_CLIENT_ID', CLIENT_ID)
+    return published, fetches
+
+
+def test_valid_id_token(keys, jwks):
+    claims = authorizer.verify_token(make_token(keys['key1']))
+    assert claims['cognito:username'] == 'admin1'
+
+
+def test_valid_access_token(keys, jwks):
+    token = make_token(keys['key1'], token_use='access', aud=None, client_id=CLIENT_ID)
+    assert authorizer.verify_token(token)['token_use'] == 'access'
+
+
+def test_keys_are_cached(keys, jwks):
+    _, fetches = jwks
+    for _ in range(3):
+        authorizer.verify_token(make_token(keys['key1']))
+    assert fetches == [JWKS_URL]
+
+
+def test_forged_signature(keys, jwks):
+    # Signed by a key the pool never published, under a kid it did
+    with pytest.raises(authorizer.AuthError, match="signature"):
+        authorizer.verify_token(make_token(keys['other']))
+
+
+def test_tampered_payload(keys, jwks):
+    header, claims, signature = make_token(keys['key1'], **{'cognito:groups': []}).split('.')
+    elevated = json.loads(authorizer.b64url_decode(claims))
+    elevated['cognito:groups'] = ['admin']
+    with pytest.raises(authorizer.AuthError, match="signature"):
+        authorizer.verify_token(f"{header}.{b64url_json(elevated)}.{signature}")
+
+
+def test_truncated_signature(keys, jwks):
+    header, claims, signature = make_token(keys['key1']).split('.')
+    with pytest.raises(authorizer.AuthError, match="signature"):
+        authorizer.verify_token(f"{header}.{claims}.{signature[:-8]}")
+
+
+def test_expired_within_leeway(keys, jwks):
+    token = make_token(keys['key1'], exp=int(time.time()) - authorizer.CLOCK_SKEW_LEEWAY // 2)
+    assert authorizer.verify_token(token)
+
+
+def test_expired_beyond_leeway(keys, jwks):
+    token = make_token(keys['key1'], exp=int(time.time()) - authorizer.CLOCK_SKEW_LEEWAY - 5)
+    with pytest.raises(authorizer.AuthError, match="expired"):
+        authorizer.verify_token(token)
+
+
+def test_missing_exp(keys, jwks):
+    with pytest.raises(authorizer.AuthError, match="expired"):
+        authorizer.verify_token(make_token(keys['key1'], exp=None))
+
+
+def test_alg_none(keys, jwks):
+    header = b64url_json({'kid': 'key1', 'alg': 'none'})
+    claims = b64url_json({'iss': ISSUER, 'aud': CLIENT_ID, 'token_use': 'id', 'exp': int(time.time()) + 3600})
+    with pytest.raises(authorizer.AuthError, match="algorithm"):
+        authorizer.verify_token(f"{header}.{claims}.")
+
+
+def test_hs256_with_public_key_as_secret(keys, jwks):
+    # The classic confusion attack: an HMAC keyed with the published RSA key
+    secret = json.dumps(jwk('key1', keys['key1'])).encode()
+    header = b64url_json({'kid': 'key1', 'alg': 'HS256'})
+    claims = b64url_json({'iss': ISSUER, 'aud': CLIENT_ID, 'token_use': 'id', 'exp': int(time.time()) + 3600})
+    signature = hmac.new(secret, f"{header}.{claims}".encode(), hashlib.sha256).digest()
+    with pytest.raises(authorizer.AuthError, match="algorithm"):
+        authorizer.verify_token(f"{header}.{claims}.{b64url(signature)}")
+
+
+def test_wrong_issuer(keys, jwks):
+    token = make_token(keys['key1'], iss="https://cognito-idp.us-east-1.amazonaws.com/us-east-1_Other")
+    with pytest.raises(authorizer.AuthError, match="user pool"):
+        authorizer.verify_token(token)
+
+
+def test_wrong_audience(keys, jwks):
+    with pytest.raises(authorizer.AuthError, match="app client"):
+        authorizer.verify_token(make_token(keys['key1'], aud='other-client'))
+
+
+def test_wrong_access_token_client(keys, jwks):
+    token = make_token(keys['key1'], token_use='access', aud=None, client_id='other-client')
+    with pytest.raises(authorizer.AuthError, match="app client"):
+        authorizer.verify_token(token)
+
+
+def test_wrong_token_use(keys, jwks):
+    with pytest.raises(authorizer.AuthError, match="token use"):
+        authorizer.verify_token(make_token(keys['key1'], token_use='refresh'))
+
+
+def test_malformed_token(jwks):
+    for token in ('', 'abc', 'a.b', 'a.b.c.d', '!!!.???.***'):
+        with pytest.raises(authorizer.AuthError):
+            authorizer.verify_token(token)
+
+
+def test_unknown_kid_refetches_jwks(keys, jwks):
+    published, fetches = jwks
+    authorizer.verify_token(make_token(keys['key1']))
+
+    # Cognito rotates in key2; the first token naming it refetches the JWKS
+    published['key2'] = keys['key2']
+    authorizer._jwks_cache[JWKS_URL]['fetchedAt'] -= authorizer.JWKS_MIN_REFRESH_INTERVAL
+    assert authorizer.verify_token(make_token(keys['key2'], kid='key2'))
+    assert len(fetches) == 2
+
+
+def test_unknown_kid_refetch_is_throttled(keys, jwks):
+    published, fetches = jwks
+    authorizer.verify_token(make_token(keys['key1']))
+
+    # Within JWKS_MIN_REFRESH_INTERVAL of the last fetch unknown kids don't reach Cognito
+    published['key2'] = keys['key2']
+    for kid in ('key2', 'forged1', 'forged2'):
+        with pytest.raises(authorizer.AuthError, match="signing key"):
+            authorizer.verify_token(make_token(keys['key2'], kid=kid))
+    assert len(fetches) == 1
+
+    authorizer._jwks_cache[JWKS_URL]['fetchedAt'] -= authorizer.JWKS_MIN_REFRESH_INTERVAL
+    assert authorizer.verify_token(make_token(keys['key2'], kid='key2'))
+    assert len(fetches) == 2
+
+
+def test_stale_jwks_is_refetched(keys, jwks):
+    _, fetches = jwks
+    authorizer.verify_token(make_token(keys['key1']))
+    authorizer._jwks_cache[JWKS_URL]['fetchedAt'] -= authorizer.JWKS_MAX_AGE
+    authorizer.verify_token(make_token(keys['key1']))
+    assert len(fetches) == 2
+
+
+def test_failed_refresh_keeps_cached_keys(keys, jwks, monkeypatch):
+    authorizer.verify_token(make_token(keys['key1']))
+
+    def unreachable(url):
+        raise OSError("timed out")
+
+    monkeypatch.setattr(authorizer, 'fetch_jwks', unreachable)
+    authorizer._jwks_cache[JWKS_URL]['fetchedAt'] -= authorizer.JWKS_MAX_AGE
+    assert authorizer.verify_token(make_token(keys['key1']))
+
+
+def test_authorize_requires_group(keys, jwks):
+    event = {'headers': {'Authorization': f"Bearer {make_token(keys['key1'])}"}}
+    assert authorizer.authorize(event, group='admin')['sub'] == 'user-1'
+
+    student = make_token(keys['key1'], **{'cognito:groups': ['student'], 'custom:userRole': 'admin'})
+    with pytest.raises(authorizer.AuthError, match="not in group"):
+        authorizer.authorize({'headers': {'authorization': f"Bearer {student}"}}, group='admin')
+
+
+def test_authorize_requires_bearer_token(jwks):
+    for headers in ({}, {'Authorization': 'Basic abc'}, {'Authorization': 'Bearer '}):
+        with pytest.raises(authorizer.AuthError, match="bearer"):
+            authorizer.authorize({'headers': headers}, group='admin')
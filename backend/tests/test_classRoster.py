@@ -0,0 +1,117 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import pytest
+from moto import mock_aws
+from moto.dynamodb.models import DynamoDBBackend
+
+from classRoster import add_roster_member, add_roster_members, remove_class_members, remove_roster_member, roster_names
+
+# Concurrent roster mutations against moto's DynamoDB: interleaved adds and
+# removes of one class must neither lose an update nor duplicate a name, and
+# every change must advance the class version.
+
+CLASS_ID = 'c1'
+KEEP = [f"Keep {i}" for i in range(10)]
+LEAVE = [f"Leave {i}" for i in range(12)]
+BULK_LEAVE = [f"Bulk Leave {i}" for i in range(10)]
+NEW = [f"New {i}" for i in range(12)]
+BULK_NEW = [[f"Bulk {batch}-{i}" for i in range(5)] for batch in range(4)]
+
+
+@pytest.fixture
+def item_atomicity(monkeypatch):
+    """
+    DynamoDB applies each (conditional) write to an item atomically; moto checks
+    the condition and applies the update without a lock, so serialize its item
+    operations to give the threads the same guarantee.
+    """
+    lock = threading.RLock()
+
+    def serialized(method):
+        def call(*args, **kwargs):
+            with lock:
+                return method(*args, **kwargs)
+        return call
+
+    for name in ('get_item', 'put_item', 'update_item', 'delete_item'):
+        monkeypatch.setattr(DynamoDBBackend, name, serialized(getattr(DynamoDBBackend, name)))
+
+
+@pytest.fixture
+def classes_table(item_atomicity):
+    with mock_aws():
+        table = boto3.resource('dynamodb').create_table(
+            TableName='ClassesTrips',
+            KeySchema=[{'AttributeName': 'classId', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'classId', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        table.put_item(Item={
+            'classId': CLASS_ID,
+            'name': 'Rome',
+            'studentsList': KEEP + LEAVE + BULK_LEAVE,
+            'facultyList': ['Dr X'],
+            'version': 1
+        })
+        yield table
+
+
+def run_concurrently(tasks):
+    """Run every task on its own thread, released together so the calls interleave"""
+    barrier = threading.Barrier(len(tasks))
+
+    def run(task):
+        # boto3 resources aren't shared across threads
+        table = boto3.session.Session().resource('dynamodb').Table('ClassesTrips')
+        barrier.wait()
+        return task(table)
+
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        return list(executor.map(run, tasks))
+
+
+def test_interleaved_adds_and_removes(classes_table):
+    tasks = []
+    tasks += [lambda table, name=name: add_roster_member(table, CLASS_ID, 'student', name)[1] for name in NEW]
+    tasks += [lambda table, name=name: remove_roster_member(table, CLASS_ID, 'student', name)[1] for name in LEAVE]
+    tasks += [lambda table, names=names: bool(add_roster_members(table, CLASS_ID, 'student', names)[1])
+              for names in BULK_NEW]
+    tasks += [lambda table: bool(remove_class_members(table, CLASS_ID, {name: ['student'] for name in BULK_LEAVE})[1])]
+    # Re-adding a current member and removing a non-member change nothing
+    tasks += [lambda table: add_roster_member(table, CLASS_ID, 'student', KEEP[0])[1]]
+    tasks += [lambda table: remove_roster_member(table, CLASS_ID, 'student', 'Nobody')[1]]
+
+    changed = run_concurrently(tasks)
+
+    class_item = classes_table.get_item(Key={'classId': CLASS_ID}, ConsistentRead=True)['Item']
+    students = roster_names(class_item, 'studentsList')
+    expected = KEEP + NEW + [name for names in BULK_NEW for name in names]
+    assert sorted(students) == sorted(expected)
+    assert len(students) == len(set(students))
+    assert class_item['facultyList'] == ['Dr X']
+
+    # Exactly the calls that changed the roster bumped the version, once each
+    assert changed.count(True) == len(NEW) + len(LEAVE) + len(BULK_NEW) + 1
+    assert class_item['version'] == 1 + changed.count(True)
+
+
+def test_concurrent_adds_of_the_same_name(classes_table):
+    added = run_concurrently([lambda table: add_roster_member(table, CLASS_ID, 'student', 'Twin')[1]] * 8)
+
+    class_item = classes_table.get_item(Key={'classId': CLASS_ID}, ConsistentRead=True)['Item']
+    assert added.count(True) == 1
+    assert roster_names(class_item, 'studentsList').count('Twin') == 1
+    assert class_item['version'] == 2
+
+
+def test_concurrent_removes_of_neighbours(classes_table):
+    # Every removal shifts the indexes the others read
+    removed = run_concurrently([lambda table, name=name: remove_roster_member(table, CLASS_ID, 'student', name)[1]
+                                for name in LEAVE])
+
+    class_item = classes_table.get_item(Key={'classId': CLASS_ID}, ConsistentRead=True)['Item']
+    assert all(removed)
+    assert roster_names(class_item, 'studentsList') == KEEP + BULK_LEAVE
+    assert class_item['version'] == 1 + len(LEAVE)
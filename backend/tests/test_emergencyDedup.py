@@ -0,0 +1,205 @@
+import time
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import FacultyEmergencyNotification as handler
+from emergencyDedup import (ALERT, ALERT_WINDOW_SECONDS, EPISODE_IDLE_SECONDS, HANDLED, SUPPRESSED, UPDATE,
+                            claim_alert, claim_pending_update, due_updates, episode_key, release_alert)
+
+# emergencyDedup against moto's DynamoDB: which pings of an episode alert, are
+# suppressed or update faculty, how a failed publish is released, and how the
+# scheduled flush delivers a suppressed ping no later ping carried.
+
+STUDENT = 'Ada'
+CLASS_ID = 'c1'
+T0 = 1_700_000_000
+
+
+def image(ping, details='Help'):
+    return {
+        'id': {'S': ping},
+        'timestamp': {'N': '1'},
+        'latitude': {'N': '41.9'},
+        'longitude': {'N': '12.5'},
+        'address': {'S': 'Via Roma 1'},
+        'emergencyDetails': {'S': details},
+        'emergency': {'BOOL': True},
+        'name': {'S': STUDENT}
+    }
+
+
+@pytest.fixture
+def alerts_table():
+    with mock_aws():
+        yield boto3.resource('dynamodb').create_table(
+            TableName='EmergencyAlerts',
+            KeySchema=[{'AttributeName': 'studentName', 'KeyType': 'HASH'},
+                       {'AttributeName': 'episodeId', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'studentName', 'AttributeType': 'S'},
+                                  {'AttributeName': 'episodeId', 'AttributeType': 'S'},
+                                  {'AttributeName': 'flushPartition', 'AttributeType': 'S'},
+                                  {'AttributeName': 'flushDueAt', 'AttributeType': 'N'}],
+            GlobalSecondaryIndexes=[{
+                'IndexName': 'pending-flush-index',
+                'KeySchema': [{'AttributeName': 'flushPartition', 'KeyType': 'HASH'},
+                              {'AttributeName': 'flushDueAt', 'KeyType': 'RANGE'}],
+                'Projection': {'ProjectionType': 'KEYS_ONLY'}
+            }],
+            BillingMode='PAY_PER_REQUEST'
+        )
+
+
+def episode(table):
+    return table.get_item(Key=episode_key(STUDENT, CLASS_ID), ConsistentRead=True).get('Item')
+
+
+def claim(ping, now, details='Help'):
+    return claim_alert(STUDENT, CLASS_ID, ping, image(ping, details), now=now)
+
+
+def test_first_ping_alerts(alerts_table):
+    decision, alert_claim = claim('p1', T0)
+    assert decision == ALERT
+    assert alert_claim['previousAlertAt'] is None
+    assert episode(alerts_table)['lastPingId'] == 'p1'
+
+
+def test_repeat_inside_window_is_suppressed_and_kept(alerts_table):
+    claim('p1', T0)
+    assert claim('p2', T0 + 10, 'Lost my group')[0] == SUPPRESSED
+    assert claim('p3', T0 + 20, 'Near the station')[0] == SUPPRESSED
+
+    row = episode(alerts_table)
+    assert row['suppressedCount'] == 2
+    assert row['pendingPing']['emergencyDetails'] == {'S': 'Near the station'}
+    assert 'emergency' not in row['pendingPing']
+    assert row['flushDueAt'] == T0 + ALERT_WINDOW_SECONDS
+
+
+def test_redelivered_ping_is_handled(alerts_table):
+    # A stream retry redelivers the student's newest ping of the batch
+    claim('p1', T0)
+    assert claim('p1', T0 + 5)[0] == HANDLED
+    claim('p2', T0 + 10)
+    assert claim('p2', T0 + 20)[0] == HANDLED
+    assert episode(alerts_table)['suppressedCount'] == 1
+
+
+def test_ping_after_window_sends_update_with_count(alerts_table):
+    claim('p1', T0)
+    claim('p2', T0 + 10)
+    decision, update_claim = claim('p3', T0 + ALERT_WINDOW_SECONDS)
+    assert decision == UPDATE
+    assert update_claim['suppressedCount'] == 1
+
+    row = episode(alerts_table)
+    assert row['suppressedCount'] == 0
+    assert row['updatesSent'] == 1
+    assert 'pendingPing' not in row and 'flushDueAt' not in row
+
+
+def test_idle_gap_opens_new_episode(alerts_table):
+    claim('p1', T0)
+    claim('p2', T0 + 10)
+    assert claim('p3', T0 + 10 + EPISODE_IDLE_SECONDS + 1)[0] == ALERT
+    row = episode(alerts_table)
+    assert row['suppressedCount'] == 0 and 'pendingPing' not in row
+
+
+def test_released_alert_is_claimed_again(alerts_table):
+    _, alert_claim = claim('p1', T0)
+    release_alert(STUDENT, CLASS_ID, alert_claim)
+    assert episode(alerts_table) is None
+    assert claim('p1', T0 + 5)[0] == ALERT
+
+
+def test_released_update_restores_pending_state(alerts_table):
+    claim('p1', T0)
+    claim('p2', T0 + 10)
+    before = episode(alerts_table)
+    _, update_claim = claim('p3', T0 + ALERT_WINDOW_SECONDS)
+
+    release_alert(STUDENT, CLASS_ID, update_claim)
+    after = episode(alerts_table)
+    assert {**after, 'expiresAt': None} == {**before, 'expiresAt': None}
+
+    # The stream retry of p3 sends the update again
+    decision, retry_claim = claim('p3', T0 + ALERT_WINDOW_SECONDS + 5)
+    assert decision == UPDATE and retry_claim['suppressedCount'] == 1
+
+
+def test_release_keeps_a_newer_alert(alerts_table):
+    claim('p1', T0)
+    _, update_claim = claim('p2', T0 + ALERT_WINDOW_SECONDS)
+    claim('p3', T0 + 2 * ALERT_WINDOW_SECONDS)
+
+    release_alert(STUDENT, CLASS_ID, update_claim)
+    assert episode(alerts_table)['lastPingId'] == 'p3'
+
+
+def test_pending_update_is_due_after_window(alerts_table):
+    claim('p1', T0)
+    claim('p2', T0 + 10, 'Still lost')
+
+    assert due_updates(now=T0 + ALERT_WINDOW_SECONDS - 1) == []
+    assert due_updates(now=T0 + ALERT_WINDOW_SECONDS) == [episode_key(STUDENT, CLASS_ID)]
+    assert claim_pending_update(STUDENT, CLASS_ID, now=T0 + ALERT_WINDOW_SECONDS - 1) == (None, None)
+
+    pending_ping, update_claim = claim_pending_update(STUDENT, CLASS_ID, now=T0 + ALERT_WINDOW_SECONDS)
+    assert pending_ping['emergencyDetails'] == {'S': 'Still lost'}
+    assert update_claim['suppressedCount'] == 1
+    assert due_updates(now=T0 + ALERT_WINDOW_SECONDS) == []
+
+    # Claimed once: a second flush or a later ping's update has nothing left to carry
+    assert claim_pending_update(STUDENT, CLASS_ID, now=T0 + ALERT_WINDOW_SECONDS) == (None, None)
+
+
+def test_released_flush_is_due_again(alerts_table):
+    claim('p1', T0)
+    claim('p2', T0 + 10)
+    _, update_claim = claim_pending_update(STUDENT, CLASS_ID, now=T0 + ALERT_WINDOW_SECONDS)
+
+    release_alert(STUDENT, CLASS_ID, update_claim)
+    assert due_updates(now=T0 + ALERT_WINDOW_SECONDS) == [episode_key(STUDENT, CLASS_ID)]
+    assert episode(alerts_table)['suppressedCount'] == 1
+
+
+@pytest.fixture
+def flush_routes(monkeypatch):
+    """Route the student to CLASS_ID and record what the handler publishes"""
+    published = []
+    monkeypatch.setattr(handler, 'sync_route_cache', lambda: None)
+    monkeypatch.setattr(handler, 'get_routes', lambda user_name: [
+        {'classId': CLASS_ID, 'name': 'Rome', 'facultyList': ['Dr X']}])
+    monkeypatch.setattr(handler, 'publish_alert', lambda *args: published.append(args))
+    monkeypatch.setenv('FACULTY_TOPIC_ARN', 'arn:aws:sns:us-east-1:123456789012:faculty')
+    return published
+
+
+def test_scheduled_flush_sends_the_pending_ping(alerts_table, flush_routes):
+    now = int(time.time())
+    claim('p1', now - ALERT_WINDOW_SECONDS - 60)
+    claim('p2', now - ALERT_WINDOW_SECONDS - 50, 'Last message')
+
+    assert handler.lambda_handler({'source': 'aws.events'}, None) == {'due': 1, 'sent': 1, 'failed': 0}
+    (user_name, pending_ping, class_trip, _, suppressed_updates), = flush_routes
+    assert (user_name, class_trip['classId'], suppressed_updates) == (STUDENT, CLASS_ID, 1)
+    assert pending_ping['emergencyDetails'] == {'S': 'Last message'}
+
+    assert handler.lambda_handler({'source': 'aws.events'}, None)['due'] == 0
+
+
+def test_failed_flush_publish_is_retried(alerts_table, flush_routes, monkeypatch):
+    now = int(time.time())
+    claim('p1', now - ALERT_WINDOW_SECONDS - 60)
+    claim('p2', now - ALERT_WINDOW_SECONDS - 50)
+
+    def unavailable(*args):
+        raise RuntimeError("SNS unavailable")
+
+    monkeypatch.setattr(handler, 'publish_alert', unavailable)
+    assert handler.lambda_handler({'source': 'aws.events'}, None) == {'due': 1, 'sent': 0, 'failed': 1}
+    assert episode(alerts_table)['suppressedCount'] == 1
+    assert due_updates() == [episode_key(STUDENT, CLASS_ID)]
@@ -0,0 +1,78 @@
+import os
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from tableScan import scan_pages
+from shared.clients import get_table, lazy_table
+
+# Locations stream consumer that maintains the LatestLocation projection:
+# one item per student (keyed by name) holding that student's newest ping, so
+# the faculty map reads its roster with BatchGetItem instead of scanning the
+# whole location history.
+
+deserializer = TypeDeserializer()
+
+LOCATIONS_TABLE_NAME = os.environ.get('LOCATIONS_TABLE', 'Locations')
+LATEST_LOCATION_TABLE_NAME = os.environ.get('LATEST_LOCATION_TABLE', 'LatestLocation')
+latest_location_table = lazy_table(LATEST_LOCATION_TABLE_NAME)
+
+
+def put_latest_location(item):
+    """Store item as the student's latest location unless a newer ping is already there"""
+    try:
+        latest_location_table.put_item(
+            Item=item,
+            ConditionExpression="attribute_not_exists(#name) OR #ts <= :ts",
+            ExpressionAttributeNames={'#name': 'name', '#ts': 'timestamp'},
+            ExpressionAttributeValues={':ts': item['timestamp']}
+        )
+        return True
+    except ClientError as e:
+        # Stream retries and out-of-order shards can deliver an older ping last
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+
+
+def newest_per_student(items):
+    """Keep only the newest location item of each student"""
+    latest = {}
+    for item in items:
+        name = item.get('name')
+        if not name or 'timestamp' not in item:
+            continue
+        if name not in latest or item['timestamp'] >= latest[name]['timestamp']:
+            latest[name] = item
+    return latest
+
+
+def lambda_handler(event, context):
+    items = []
+    for record in event.get('Records', []):
+        if record['eventName'] not in ('INSERT', 'MODIFY'):
+            continue
+        new_image = record['dynamodb'].get('NewImage', {})
+        items.append({key: deserializer.deserialize(value) for key, value in new_image.items()})
+
+    latest = newest_per_student(items)
+    updated = sum(1 for item in latest.values() if put_latest_location(item))
+
+    print(f"Processed {len(items)} location records, updated {updated} of {len(latest)} students")
+    return {'processed': len(items), 'updated': updated}
+
+
+def rebuild_from_locations():
+    """Backfill LatestLocation from the full Locations history (one-off migration)"""
+    locations_table = get_table(LOCATIONS_TABLE_NAME)
+    latest = {}
+    for page in scan_pages(locations_table):
+        latest = newest_per_student(list(latest.values()) + page)
+
+    # Conditional puts so the backfill never overwrites a newer ping from the stream
+    updated = sum(1 for item in latest.values() if put_latest_location(item))
+
+    print(f"Stored latest locations for {updated} of {len(latest)} students")
+    return updated
+
+
+if __name__ == '__main__':
+    rebuild_from_locations()
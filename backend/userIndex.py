@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+from tableScan import projection_kwargs
+
+# UserProfiles by role through the role-name-index GSI (hash role, range name),
+# so role listings and name lookups read only the matching profiles instead of
+# scanning the table with a role filter.
+#
+# A profile is only in the index once it has a name: index key attributes
+# can't be empty, so writers leave `name` out until the user's first login
+# fills it in. Nameless profiles can't be on a roster either.
+
+ROLE_INDEX = 'role-name-index'
+INDEX_KEY_ATTRIBUTES = ('userId', 'role', 'name')
+# What the admin lists show; the index projects the same attributes
+LIST_ATTRIBUTES = ['userId', 'username', 'name', 'email', 'firstName', 'lastName', 'phone', 'role']
+LOOKUP_WORKERS = 8
+
+
+def index_key(user):
+    """ExclusiveStartKey that resumes a role query right after user"""
+    return {attribute: user[attribute] for attribute in INDEX_KEY_ATTRIBUTES}
+
+
+def check_index_key(key):
+    """Raise ValueError unless key can resume a role query (tokens of the old table scan can't)"""
+    if not isinstance(key, dict) or set(key) != set(INDEX_KEY_ATTRIBUTES):
+        raise ValueError("Invalid continuation token")
+    return key
+
+
+def query_role_pages(table, role, attributes=None, start_key=None, name=None):
+    """Yield (items, last_evaluated_key) of every page of the role's profiles, optionally of one name"""
+    # Expression strings keep boto3.dynamodb.conditions out of the handlers' cold start
+    names = {'#role': 'role'}
+    values = {':role': role}
+    condition = "#role = :role"
+    if name is not None:
+        names['#name'] = 'name'
+        values[':name'] = name
+        condition += " AND #name = :name"
+    query_kwargs = {'IndexName': ROLE_INDEX, 'KeyConditionExpression': condition, 'ExpressionAttributeValues': values}
+    if attributes:
+        query_kwargs.update(projection_kwargs(attributes, names))
+    else:
+        query_kwargs['ExpressionAttributeNames'] = names
+    if start_key:
+        query_kwargs['ExclusiveStartKey'] = start_key
+
+    while True:
+        response = table.query(**query_kwargs)
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        yield response.get('Items', []), last_evaluated_key
+        if not last_evaluated_key:
+            break
+        query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+
+def list_role_members(table, role, exclude_names=(), start_key=None, limit=None, attributes=LIST_ATTRIBUTES):
+    """
+    Profiles of role in name order, leaving out exclude_names. Stops once limit
+    profiles are collected and returns (users, next_key); next_key is None when
+    the role has been read to the end.
+    """
+    users = []
+    # The index key attributes are needed to resume after the last user
+    attributes = list(dict.fromkeys(list(attributes) + list(INDEX_KEY_ATTRIBUTES)))
+    for items, last_evaluated_key in query_role_pages(table, role, attributes, start_key):
+        for idx, user in enumerate(items):
+            if user.get('name') in exclude_names:
+                continue
+
+            users.append(user)
+            if limit and len(users) >= limit:
+                # Resume right after this user, or after the page if it was its last item
+                if idx < len(items) - 1:
+                    return users, index_key(user)
+                return users, last_evaluated_key
+    return users, None
+
+
+def find_by_names(table, role, names, attributes=None):
+    """{name: [profiles of role carrying that name]} for every name, one keyed query each"""
+    def lookup(name):
+        matches = []
+        for items, _ in query_role_pages(table, role, attributes, name=name):
+            matches.extend(items)
+        return name, matches
+
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(LOOKUP_WORKERS, len(names)))) as executor:
+        return dict(executor.map(lookup, names))
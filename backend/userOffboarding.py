@@ -0,0 +1,288 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from membershipIndex import ROLE_LISTS, get_memberships, remove_membership, refresh_class_routes, invalidate_active_members
+from classRoster import LEAD_ROLE, LEAD_ATTRIBUTE, remove_class_members, roster_names
+from classVersion import bump_classes_version
+from jobStore import JOBS_TABLE_NAME, JOB_KEY, PENDING, create_job, get_job, run_job
+from tableScan import batch_get_items
+from userIndex import find_by_names
+from shared.clients import get_table, lazy_client
+from shared.throttling import RateLimiter, error_code, throttled_call
+
+# Removing users and their class memberships. The affected classes are resolved
+# by exact name: roster memberships from the ClassMembership index, and classes
+# a user leads from the `faculty` GSI of ClassesTrips, so nothing scans
+# ClassesTrips. Every affected class gets a single conditional update
+# (classRoster.remove_class_members) dropping all of its leaving members at
+# once, and classes are processed concurrently.
+#
+# Large cascades and bulk offboarding (a list of userIds, or the students of a
+# class whose trip ended) run as ProvisioningJobs jobs (see jobStore). Rows sort
+# so every class is cleaned before any account goes:
+#
+#   "class#<classId>" - classId, members {name: [roles]} to remove
+#                       ('student', 'faculty', 'lead'); CLASS_OUTCOMES
+#   "name#<name>"     - roster name without exactly one matching profile
+#                       (not_found / ambiguous, recorded for the report)
+#   "user#<userId>"   - userId, username, name; the Cognito user is deleted on
+#                       a rate-limited pool and the profile through
+#                       batch_writer; USER_OUTCOMES
+#
+# The members of a class row that FAILED are added to the header's blockedNames
+# set, and their user rows fail instead of deleting the account: the membership
+# index still lists the class, so offboarding them again retries the cleanup.
+
+CLASSES_TABLE_NAME = os.environ.get('CLASSES_TABLE', 'ClassesTrips')
+USERS_TABLE_NAME = os.environ.get('USERS_TABLE', 'UserProfiles')
+USER_POOL_ID = os.environ.get('USER_POOL_ID')
+LEAD_FACULTY_INDEX = 'faculty-index'
+
+CASCADE_WORKERS = int(os.environ.get('CASCADE_WORKERS', '8'))
+CASCADE_INLINE_CLASSES = int(os.environ.get('CASCADE_INLINE_CLASSES', '25'))
+CASCADE_CHUNK_SIZE = 25
+OFFBOARD_COGNITO_RPS = float(os.environ.get('OFFBOARD_COGNITO_RPS', '20'))  # stay under the user pool's API quotas
+MAX_OFFBOARD_USERS = int(os.environ.get('MAX_OFFBOARD_USERS', '2000'))
+COGNITO_MAX_ATTEMPTS = 5
+
+CASCADE_JOB_KIND = 'cascade'
+OFFBOARD_JOB_KIND = 'offboard'
+CLASS_PREFIX = 'class#'
+NAME_PREFIX = 'name#'
+USER_PREFIX = 'user#'
+
+# Class row outcomes
+DETACHED = 'detached'
+UNCHANGED = 'unchanged'  # the members were no longer in the class
+MISSING = 'missing'      # the class was deleted meanwhile
+FAILED = 'failed'
+CLASS_OUTCOMES = (DETACHED, UNCHANGED, MISSING, FAILED)
+
+# User row outcomes
+DELETED = 'deleted'
+NOT_FOUND = 'not_found'
+AMBIGUOUS = 'ambiguous'  # several profiles carry the roster name, none is deleted
+USER_OUTCOMES = (DELETED, NOT_FOUND, AMBIGUOUS, FAILED)
+
+# Counters reported per job kind (class and user rows share `failed`)
+JOB_OUTCOMES = {
+    CASCADE_JOB_KIND: CLASS_OUTCOMES,
+    OFFBOARD_JOB_KIND: (DETACHED, UNCHANGED, MISSING, DELETED, NOT_FOUND, AMBIGUOUS, FAILED)
+}
+BLOCKED_ERROR = "Account kept: a class of this user could not be cleaned up, offboard them again"
+
+# Rows the status report leaves out
+DONE_OUTCOMES = (DETACHED, UNCHANGED, DELETED)
+
+cognito = lazy_client('cognito-idp')
+cognito_limiter = RateLimiter(OFFBOARD_COGNITO_RPS)
+
+
+def get_led_class_ids(user_name):
+    """classIds of the classes whose lead faculty is user_name"""
+    classes_table = get_table(CLASSES_TABLE_NAME)
+    query_kwargs = {
+        'IndexName': LEAD_FACULTY_INDEX,
+        'KeyConditionExpression': "#lead = :lead",
+        'ExpressionAttributeNames': {'#lead': LEAD_ATTRIBUTE},
+        'ExpressionAttributeValues': {':lead': user_name},
+        'ProjectionExpression': 'classId'
+    }
+
+    class_ids = []
+    while True:
+        response = classes_table.query(**query_kwargs)
+        class_ids.extend(item['classId'] for item in response.get('Items', []))
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key:
+            return class_ids
+        query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+
+def find_member_classes(user_names):
+    """{classId: {name: [roles]}} of every class one of user_names belongs to or leads"""
+    def lookup(user_name):
+        roles_by_class = {class_id: set(roles) for class_id, roles in get_memberships(user_name).items()}
+        for class_id in get_led_class_ids(user_name):
+            roles_by_class.setdefault(class_id, set()).add(LEAD_ROLE)
+        return user_name, roles_by_class
+
+    user_names = [name for name in dict.fromkeys(user_names) if name]
+    if not user_names:
+        return {}
+
+    classes = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(CASCADE_WORKERS, len(user_names)))) as executor:
+        for user_name, roles_by_class in executor.map(lookup, user_names):
+            for class_id, roles in roles_by_class.items():
+                classes.setdefault(class_id, {})[user_name] = sorted(roles)
+    return classes
+
+
+def detach_class(class_id, members):
+    """Remove members ({name: roles}) from one class and from the membership index; returns the outcome"""
+    class_item, removed = remove_class_members(get_table(CLASSES_TABLE_NAME), class_id, members)
+
+    # Index rows go even if the roster had already lost the name
+    for name, roles in members.items():
+        for role in roles:
+            if role in ROLE_LISTS:
+                remove_membership(name, class_id, role)
+
+    if class_item is None:
+        return MISSING
+    if any('faculty' in roles for roles in members.values()):
+        # The remaining students' emergency routes name the class faculty
+        refresh_class_routes(class_id, class_item.get('name'), class_item.get('facultyList', []),
+                             class_item.get('studentsList', []))
+    return DETACHED if removed else UNCHANGED
+
+
+def detach_classes(classes):
+    """detach_class over {classId: members} on a worker pool; returns {classId: outcome}"""
+    if not classes:
+        return {}
+    class_ids = list(classes)
+    with ThreadPoolExecutor(max_workers=max(1, min(CASCADE_WORKERS, len(class_ids)))) as executor:
+        outcomes = dict(zip(class_ids, executor.map(lambda class_id: detach_class(class_id, classes[class_id]), class_ids)))
+
+    if DETACHED in outcomes.values():
+        invalidate_active_members()
+        bump_classes_version()
+    return outcomes
+
+
+def class_rows(classes):
+    for class_id, members in classes.items():
+        yield {
+            'rowKey': f"{CLASS_PREFIX}{class_id}",
+            'classId': class_id,
+            'members': members,
+            'status': PENDING
+        }
+
+
+def start_cascade_job(classes):
+    """Store a cascade over {classId: members} as a job and return its header"""
+    return create_job(CASCADE_JOB_KIND, class_rows(classes))
+
+
+def get_profiles(user_ids):
+    """(profiles, missing userIds) of user_ids"""
+    user_ids = list(dict.fromkeys(user_ids))
+    keys = [{'userId': user_id} for user_id in user_ids]
+    profiles = batch_get_items(USERS_TABLE_NAME, keys, ['userId', 'username', 'name', 'role'])
+    found = {profile['userId'] for profile in profiles}
+    return profiles, [user_id for user_id in user_ids if user_id not in found]
+
+
+def get_roster_profiles(class_item):
+    """
+    (profiles, unresolved) of the students on a class roster; unresolved maps
+    roster names matching no profile or several to NOT_FOUND / AMBIGUOUS.
+    """
+    names = set(name for name in roster_names(class_item, ROLE_LISTS['student']) if name)
+    by_name = find_by_names(get_table(USERS_TABLE_NAME), 'student', names, ['userId', 'username', 'name', 'role'])
+
+    profiles = []
+    unresolved = {}
+    for name in sorted(names):
+        matches = by_name.get(name, [])
+        if len(matches) == 1:
+            profiles.append(matches[0])
+        else:
+            unresolved[name] = AMBIGUOUS if matches else NOT_FOUND
+    return profiles, unresolved
+
+
+def start_offboarding_job(profiles, missing_user_ids=(), unresolved_names=None):
+    """
+    Store the offboarding of profiles as a job: their classes are resolved now,
+    while the profiles still name them. Returns the job header.
+    """
+    classes = find_member_classes([profile.get('name') for profile in profiles])
+    user_rows = ({
+        'rowKey': f"{USER_PREFIX}{profile['userId']}",
+        'userId': profile['userId'],
+        'username': profile.get('username'),
+        'name': profile.get('name'),
+        'status': PENDING
+    } for profile in profiles)
+    missing_rows = ({
+        'rowKey': f"{USER_PREFIX}{user_id}",
+        'userId': user_id,
+        'status': NOT_FOUND
+    } for user_id in missing_user_ids)
+    name_rows = ({
+        'rowKey': f"{NAME_PREFIX}{name}",
+        'name': name,
+        'status': status
+    } for name, status in (unresolved_names or {}).items())
+    return create_job(OFFBOARD_JOB_KIND, chain(class_rows(classes), name_rows, user_rows, missing_rows))
+
+
+def block_members(job_id, failed_class_rows):
+    """Record on the job header the members of class rows that could not be cleaned"""
+    names = {name for row in failed_class_rows for name in row['members']}
+    if names:
+        get_table(JOBS_TABLE_NAME).update_item(
+            Key={'jobId': job_id, 'rowKey': JOB_KEY},
+            UpdateExpression="ADD blockedNames :names",
+            ExpressionAttributeValues={':names': names}
+        )
+
+
+def delete_account(row):
+    """Delete the Cognito user of a user row; returns the row with its outcome"""
+    try:
+        if row.get('username'):
+            throttled_call(cognito_limiter, cognito.admin_delete_user, COGNITO_MAX_ATTEMPTS,
+                           UserPoolId=USER_POOL_ID, Username=row['username'])
+    except Exception as e:
+        if error_code(e) != 'UserNotFoundException':
+            print(f"Error deleting Cognito user {row['username']}: {str(e)}")
+            return dict(row, status=FAILED, error=str(e))
+    return dict(row, status=DELETED)
+
+
+def offboard_chunk(rows):
+    """Job chunk: detach the pending class rows, then delete the pending users"""
+    def detach_row(row):
+        try:
+            return dict(row, status=detach_class(row['classId'], row['members']))
+        except Exception as e:
+            print(f"Error removing members from class {row['classId']}: {str(e)}")
+            return dict(row, status=FAILED, error=str(e))
+
+    pending = [row for row in rows if row['status'] == PENDING]
+    class_rows_pending = [row for row in pending if row['rowKey'].startswith(CLASS_PREFIX)]
+    user_rows_pending = [row for row in pending if row['rowKey'].startswith(USER_PREFIX)]
+
+    done = {}
+    with ThreadPoolExecutor(max_workers=CASCADE_WORKERS) as executor:
+        done.update((row['rowKey'], row) for row in executor.map(detach_row, class_rows_pending))
+        block_members(rows[0]['jobId'], [row for row in done.values() if row['status'] == FAILED])
+
+        if user_rows_pending:
+            # Class rows sort first, so every class of these users has been processed by now
+            blocked = get_job(rows[0]['jobId']).get('blockedNames', set())
+            kept = [row for row in user_rows_pending if row.get('name') in blocked]
+            done.update((row['rowKey'], dict(row, status=FAILED, error=BLOCKED_ERROR)) for row in kept)
+            user_rows_pending = [row for row in user_rows_pending if row['rowKey'] not in done]
+            done.update((row['rowKey'], row) for row in executor.map(delete_account, user_rows_pending))
+
+    if any(row['status'] == DETACHED for row in done.values()):
+        invalidate_active_members()
+        bump_classes_version()
+
+    with get_table(USERS_TABLE_NAME).batch_writer() as batch:
+        for row in done.values():
+            if row['rowKey'].startswith(USER_PREFIX) and row['status'] == DELETED:
+                batch.delete_item(Key={'userId': row['userId']})
+    return [done.get(row['rowKey'], row) for row in rows]
+
+
+def run_offboarding_job(job_id, budget_ms):
+    """Work on a cascade or offboarding job for up to budget_ms; returns (header, ran) as jobStore.run_job"""
+    return run_job(job_id, offboard_chunk, CASCADE_CHUNK_SIZE, budget_ms)
@@ -0,0 +1,38 @@
+import os
+from shared.clients import lazy_table
+
+# Cache version counters. Writers bump a marker whenever the data behind a warm
+# cache or an ETag changes; readers compare the counter with the one they built
+# from. Every marker is one small item of its own table, so the reads on every
+# request and the bumps on every write don't land on a partition of the tables
+# they describe.
+#
+# Item layout:
+#   marker (hash key) - ROSTER_VERSION / CLASSES_VERSION
+#   version           - counter, ADDed to by bump_version_marker
+
+VERSION_TABLE_NAME = os.environ.get('VERSION_TABLE', 'VersionMarkers')
+version_table = lazy_table(VERSION_TABLE_NAME)
+
+ROSTER_VERSION = 'roster'    # any studentsList/facultyList change (membershipIndex)
+CLASSES_VERSION = 'classes'  # any ClassesTrips write (classVersion)
+
+
+def bump_version_marker(marker):
+    """Increment the counter held by a marker"""
+    version_table.update_item(
+        Key={'marker': marker},
+        UpdateExpression="ADD #version :one",
+        ExpressionAttributeNames={'#version': 'version'},
+        ExpressionAttributeValues={':one': 1}
+    )
+
+
+def get_version_marker(marker):
+    """Current counter of a marker (0 if it was never bumped)"""
+    response = version_table.get_item(
+        Key={'marker': marker},
+        ProjectionExpression='#version',
+        ExpressionAttributeNames={'#version': 'version'}
+    )
+    return int(response.get('Item', {}).get('version', 0))
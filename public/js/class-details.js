@@ -109,24 +109,31 @@ async function populateStudentDropdown(idToken) {
     const apiUrl = "https://cso6luevsi.execute-api.us-east-1.amazonaws.com/prod/students";
 
     try {
-        const response = await fetch(apiUrl, {
-            headers: {
-                'Authorization': `Bearer ${idToken}`,
-                'Content-Type': 'application/json'
-            },
-        });
-        if (!response.ok) {
-            throw new Error("Failed to fetch student data");
-        }
-        const students = await response.json();
-
         studentDropdown.innerHTML = ""; // Clear existing options
-        students.forEach(student => {
-            const option = document.createElement("option");
-            option.value = student.name;
-            option.textContent = student.name;
-            studentDropdown.appendChild(option);
-        });
+        let nextToken = null;
+
+        // Load unassigned students page by page, appending each page as it arrives
+        do {
+            const pageUrl = `${apiUrl}?limit=100` + (nextToken ? `&nextToken=${encodeURIComponent(nextToken)}` : "");
+            const response = await fetch(pageUrl, {
+                headers: {
+                    'Authorization': `Bearer ${idToken}`,
+                    'Content-Type': 'application/json'
+                },
+            });
+            if (!response.ok) {
+                throw new Error("Failed to fetch student data");
+            }
+            const page = await response.json();
+
+            page.students.forEach(student => {
+                const option = document.createElement("option");
+                option.value = student.name;
+                option.textContent = student.name;
+                studentDropdown.appendChild(option);
+            });
+            nextToken = page.nextToken;
+        } while (nextToken);
     } catch (error) {
         console.error("Error loading students:", error);
     }
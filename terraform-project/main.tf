@@ -45,6 +45,10 @@ module "cloudfront" {
 
 #lambda functions from here
 
+module "lambda_layer" {
+  source = "./modules/lambda-layer"
+}
+
 
 
 
@@ -57,8 +61,11 @@ module "lambda_auth" {
   cognito_client_secret  = module.cognito.user_pool_client_id_secret
   user_table             = module.dynamodb.user_profiles_table_name
   classes_table          = module.dynamodb.classes_trips_table_name
+  membership_table       = module.dynamodb.class_membership_table_name
+  subscriptions_table    = module.dynamodb.sns_subscriptions_table_name
   faculty_sns_arn        = module.sns.sns_topic_output["faculty_emergency_arn"]
   student_sns_arn        = module.sns.sns_topic_output["student_checkin_arn"]
+  layers                 = [module.lambda_layer.shared_runtime_layer_arn]
 }
 
 
@@ -66,6 +73,9 @@ module "lambda_classes" {
   source           = "./modules/lambda-classes"
   lambda_role_arn  = "arn:aws:iam::277707101844:role/LambdaDynamoDBRole"
   classes_table    = module.dynamodb.classes_trips_table_name
+  membership_table = module.dynamodb.class_membership_table_name
+  version_table    = module.dynamodb.version_markers_table_name
+  layers           = [module.lambda_layer.shared_runtime_layer_arn]
 }
 
 module "lambda_faculty" {
@@ -73,8 +83,11 @@ module "lambda_faculty" {
   lambda_role_arn        = "arn:aws:iam::277707101844:role/LambdaDynamoDBRole"
   lambda_sns_role_arn    = "arn:aws:iam::277707101844:role/LambdaDynamoSNS"
   classes_table          = module.dynamodb.classes_trips_table_name
+  membership_table       = module.dynamodb.class_membership_table_name
+  version_table          = module.dynamodb.version_markers_table_name
   user_table             = module.dynamodb.user_profiles_table_name
   student_sns_topic_arn  = module.sns.sns_topic_output["student_checkin_arn"]
+  layers                 = [module.lambda_layer.shared_runtime_layer_arn]
 }
 
 
@@ -82,7 +95,10 @@ module "lambda_students" {
   source            = "./modules/lambda-students"
   lambda_role_arn   = "arn:aws:iam::277707101844:role/LambdaDynamoDBRole"
   classes_table     = module.dynamodb.classes_trips_table_name
+  membership_table  = module.dynamodb.class_membership_table_name
+  version_table     = module.dynamodb.version_markers_table_name
   user_table        = module.dynamodb.user_profiles_table_name
+  layers            = [module.lambda_layer.shared_runtime_layer_arn]
 }
 
 module "lambda_loc_notify" {
@@ -90,10 +106,18 @@ module "lambda_loc_notify" {
   locations_faculty_role = "arn:aws:iam::277707101844:role/service-role/locationsFaculty-role-ezq5vzvs"
   lambda_sns_role        = "arn:aws:iam::277707101844:role/LambdaDynamoSNS"
   store_location_role    = "arn:aws:iam::277707101844:role/service-role/storeLocation-role-1vkpaydp"
+  latest_location_role   = "arn:aws:iam::277707101844:role/LambdaDynamoSNS"
 
   classes_table          = module.dynamodb.classes_trips_table_name
+  membership_table       = module.dynamodb.class_membership_table_name
+  version_table          = module.dynamodb.version_markers_table_name
+  locations_table        = module.dynamodb.locations_table_name
+  locations_stream_arn   = module.dynamodb.locations_table_stream_arn
+  latest_location_table  = module.dynamodb.latest_location_table_name
+  emergency_alerts_table = module.dynamodb.emergency_alerts_table_name
   user_table             = module.dynamodb.user_profiles_table_name
   faculty_sns_arn        = module.sns.sns_topic_output["faculty_emergency_arn"]
+  layers                 = [module.lambda_layer.shared_runtime_layer_arn]
 }
 
 module "apigateway-studyabroad" {
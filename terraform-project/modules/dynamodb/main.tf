@@ -11,6 +11,48 @@ resource "aws_dynamodb_table" "ClassesTrips" {
     name = "classId"
     type = "S"
   }
+
+  attribute {
+    name = "faculty"
+    type = "S"
+  }
+
+  # Classes by lead faculty, for removing a deleted user without a scan
+  global_secondary_index {
+    name            = "faculty-index"
+    hash_key        = "faculty"
+    projection_type = "KEYS_ONLY"
+  }
+}
+
+resource "aws_dynamodb_table" "ClassMembership" {
+  name         = "ClassMembership"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "userName"
+  range_key    = "classId"
+
+  attribute {
+    name = "userName"
+    type = "S"
+  }
+
+  attribute {
+    name = "classId"
+    type = "S"
+  }
+}
+
+# Cache version counters (roster, class list), one small item each, kept out
+# of ClassMembership so their reads and bumps don't share its partitions
+resource "aws_dynamodb_table" "VersionMarkers" {
+  name         = "VersionMarkers"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "marker"
+
+  attribute {
+    name = "marker"
+    type = "S"
+  }
 }
 
 resource "aws_dynamodb_table" "Locations" {
@@ -31,6 +73,109 @@ resource "aws_dynamodb_table" "Locations" {
     name = "timestamp"
     type = "N"
   }
+
+  attribute {
+    name = "name"
+    type = "S"
+  }
+
+  # Per-student history by time range (id holds the session token, not the student)
+  global_secondary_index {
+    name            = "name-timestamp-index"
+    hash_key        = "name"
+    range_key       = "timestamp"
+    projection_type = "ALL"
+  }
+}
+
+resource "aws_dynamodb_table" "LatestLocation" {
+  name         = "LatestLocation"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "name"
+
+  attribute {
+    name = "name"
+    type = "S"
+  }
+}
+
+resource "aws_dynamodb_table" "EmergencyAlerts" {
+  name         = "EmergencyAlerts"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "studentName"
+  range_key    = "episodeId"
+
+  attribute {
+    name = "studentName"
+    type = "S"
+  }
+
+  attribute {
+    name = "episodeId"
+    type = "S"
+  }
+
+  attribute {
+    name = "flushPartition"
+    type = "S"
+  }
+
+  attribute {
+    name = "flushDueAt"
+    type = "N"
+  }
+
+  # Sparse: only episodes with a suppressed ping still to send carry these keys
+  global_secondary_index {
+    name            = "pending-flush-index"
+    hash_key        = "flushPartition"
+    range_key       = "flushDueAt"
+    projection_type = "KEYS_ONLY"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+}
+
+resource "aws_dynamodb_table" "ProvisioningJobs" {
+  name         = "ProvisioningJobs"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "jobId"
+  range_key    = "rowKey"
+
+  attribute {
+    name = "jobId"
+    type = "S"
+  }
+
+  attribute {
+    name = "rowKey"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expiresAt"
+    enabled        = true
+  }
+}
+
+resource "aws_dynamodb_table" "SnsSubscriptions" {
+  name         = "SnsSubscriptions"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "email"
+  range_key    = "topicArn"
+
+  attribute {
+    name = "email"
+    type = "S"
+  }
+
+  attribute {
+    name = "topicArn"
+    type = "S"
+  }
 }
 
 resource "aws_dynamodb_table" "UserProfiles" {
@@ -42,4 +187,23 @@ resource "aws_dynamodb_table" "UserProfiles" {
     name = "userId"
     type = "S"
   }
+
+  attribute {
+    name = "role"
+    type = "S"
+  }
+
+  attribute {
+    name = "name"
+    type = "S"
+  }
+
+  # Profiles by role in name order, for the admin lists and roster name lookups
+  global_secondary_index {
+    name               = "role-name-index"
+    hash_key           = "role"
+    range_key          = "name"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["username", "email", "firstName", "lastName", "phone"]
+  }
 }
@@ -6,6 +6,14 @@ output "classes_trips_table_name" {
   value = aws_dynamodb_table.ClassesTrips.name
 }
 
+output "class_membership_table_name" {
+  value = aws_dynamodb_table.ClassMembership.name
+}
+
+output "version_markers_table_name" {
+  value = aws_dynamodb_table.VersionMarkers.name
+}
+
 output "locations_table_name" {
   value = aws_dynamodb_table.Locations.name
 }
@@ -14,6 +22,22 @@ output "locations_table_stream_arn" {
   value = aws_dynamodb_table.Locations.stream_arn
 }
 
+output "latest_location_table_name" {
+  value = aws_dynamodb_table.LatestLocation.name
+}
+
+output "emergency_alerts_table_name" {
+  value = aws_dynamodb_table.EmergencyAlerts.name
+}
+
+output "provisioning_jobs_table_name" {
+  value = aws_dynamodb_table.ProvisioningJobs.name
+}
+
+output "sns_subscriptions_table_name" {
+  value = aws_dynamodb_table.SnsSubscriptions.name
+}
+
 output "user_profiles_table_name" {
   value = aws_dynamodb_table.UserProfiles.name
 }
\ No newline at end of file
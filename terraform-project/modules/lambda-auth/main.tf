@@ -7,6 +7,7 @@ locals {
         COGNITO_CLIENT_SECRET = var.cognito_client_secret
         USER_TABLE            = var.user_table
         CLASSES_TABLE         = var.classes_table
+        MEMBERSHIP_TABLE      = var.membership_table
         COGNITO_CLIENT_ID     = var.cognito_client_id
         USER_POOL_ID          = var.user_pool_id
       }
@@ -30,6 +31,7 @@ locals {
         COGNITO_CLIENT_ID     = var.cognito_client_id
         USER_POOL_ID          = var.user_pool_id
         USER_TABLE            = var.user_table
+        SUBSCRIPTIONS_TABLE   = var.subscriptions_table
       }
     },
         {
@@ -57,6 +59,7 @@ resource "aws_lambda_function" "auth" {
   timeout       = each.value.timeout
   memory_size   = var.memory_size
   architectures = ["x86_64"]
+  layers        = var.layers
   publish       = true
 
   filename         = "${path.module}/placeholder.zip"
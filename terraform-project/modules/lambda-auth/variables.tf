@@ -39,6 +39,16 @@ variable "classes_table" {
   type = string
 }
 
+variable "membership_table" {
+  description = "DynamoDB table name for the userName -> classId membership index"
+  type        = string
+}
+
+variable "subscriptions_table" {
+  description = "DynamoDB table name for the email -> SNS subscription registry"
+  type        = string
+}
+
 variable "faculty_sns_arn" {
   type    = string
   default = ""
@@ -48,3 +58,9 @@ variable "student_sns_arn" {
   type    = string
   default = ""
 }
+
+variable "layers" {
+  description = "Lambda layer ARNs for the Python functions (shared runtime)"
+  type        = list(string)
+  default     = []
+}
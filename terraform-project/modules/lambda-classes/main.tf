@@ -18,21 +18,27 @@ locals {
       name        = "deleteClass"
       timeout     = 3
       environment = {
-        CLASSES_TABLE = var.classes_table
+        CLASSES_TABLE    = var.classes_table
+        MEMBERSHIP_TABLE = var.membership_table
+        VERSION_TABLE    = var.version_table
       }
     },
     {
       name        = "GetStudentwithinClass"
       timeout     = 3
       environment = {
-        CLASSES_TABLE = var.classes_table
+        CLASSES_TABLE    = var.classes_table
+        MEMBERSHIP_TABLE = var.membership_table
+        VERSION_TABLE    = var.version_table
       }
     },
     {
       name        = "createClasses"
       timeout     = 3
       environment = {
-        CLASSES_TABLE = var.classes_table
+        CLASSES_TABLE    = var.classes_table
+        MEMBERSHIP_TABLE = var.membership_table
+        VERSION_TABLE    = var.version_table
       }
     }
   ]
@@ -50,6 +56,7 @@ resource "aws_lambda_function" "classes" {
   timeout       = each.value.timeout
   memory_size   = var.memory_size
   architectures = ["x86_64"]
+  layers        = var.layers
   publish       = true
 
   filename         = "${path.module}/placeholder.zip"
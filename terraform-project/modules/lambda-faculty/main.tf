@@ -6,6 +6,8 @@ locals {
       role        = var.lambda_role_arn
       environment = {
         DYNAMODB_TABLE_NAME = var.classes_table
+        MEMBERSHIP_TABLE    = var.membership_table
+        VERSION_TABLE       = var.version_table
       }
     },
     {
@@ -22,7 +24,9 @@ locals {
       timeout     = 3
       role        = var.lambda_role_arn
       environment = {
-        CLS_TABLE = var.classes_table
+        CLS_TABLE        = var.classes_table
+        MEMBERSHIP_TABLE = var.membership_table
+        VERSION_TABLE    = var.version_table
       }
     },
     {
@@ -48,7 +52,9 @@ locals {
       timeout     = 3
       role        = var.lambda_role_arn
       environment = {
-        CLS_TABLE = var.classes_table
+        CLS_TABLE        = var.classes_table
+        MEMBERSHIP_TABLE = var.membership_table
+        VERSION_TABLE    = var.version_table
       }
     }
   ]
@@ -66,6 +72,7 @@ resource "aws_lambda_function" "faculty" {
   timeout       = each.value.timeout
   memory_size   = var.memory_size
   architectures = ["x86_64"]
+  layers        = var.layers
   publish       = true
 
   filename         = "${path.module}/placeholder.zip"
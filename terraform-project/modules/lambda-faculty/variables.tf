@@ -35,3 +35,18 @@ variable "user_table" {
 variable "student_sns_topic_arn" {
   type = string
 }
+
+variable "membership_table" {
+  type = string
+}
+
+variable "version_table" {
+  type        = string
+  description = "DynamoDB table name for the cache version markers"
+}
+
+variable "layers" {
+  description = "Lambda layer ARNs for the Python functions (shared runtime)"
+  type        = list(string)
+  default     = []
+}
@@ -0,0 +1,36 @@
+# Shared Python runtime for the backend handlers (backend/shared plus the
+# membership/version/roster/scan/dedup/subscription/job/offboarding helpers
+# they import).
+# Published as a layer so every function imports the same code from
+# /opt/python instead of bundling a copy.
+locals {
+  backend_dir = "${path.root}/../backend"
+  layer_files = concat(
+    tolist(fileset(local.backend_dir, "shared/*.py")),
+    [
+      "membershipIndex.py", "classVersion.py", "classRoster.py", "tableScan.py",
+      "emergencyDedup.py", "subscriptionRegistry.py", "jobStore.py", "userOffboarding.py",
+      "userIndex.py", "versionMarkers.py"
+    ]
+  )
+}
+
+data "archive_file" "shared_runtime" {
+  type        = "zip"
+  output_path = "${path.module}/shared_runtime.zip"
+
+  dynamic "source" {
+    for_each = local.layer_files
+    content {
+      content  = file("${local.backend_dir}/${source.value}")
+      filename = "python/${source.value}"
+    }
+  }
+}
+
+resource "aws_lambda_layer_version" "shared_runtime" {
+  layer_name          = var.layer_name
+  filename            = data.archive_file.shared_runtime.output_path
+  source_code_hash    = data.archive_file.shared_runtime.output_base64sha256
+  compatible_runtimes = ["python3.13"]
+}
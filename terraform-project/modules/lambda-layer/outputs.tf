@@ -0,0 +1,3 @@
+output "shared_runtime_layer_arn" {
+  value = aws_lambda_layer_version.shared_runtime.arn
+}
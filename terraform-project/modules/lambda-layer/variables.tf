@@ -0,0 +1,4 @@
+variable "layer_name" {
+  type    = string
+  default = "study-abroad-shared-runtime"
+}
@@ -6,18 +6,39 @@ locals {
       runtime     = "nodejs22.x"
       role        = var.locations_faculty_role
       handler     = "index.handler"
-      environment = {}
+      environment = {
+        CLASSES_TRIPS_TABLE   = var.classes_table
+        MEMBERSHIP_TABLE      = var.membership_table
+        LATEST_LOCATION_TABLE = var.latest_location_table
+      }
+    },
+    {
+      name        = "locationHistory"
+      timeout     = 10
+      runtime     = "nodejs22.x"
+      role        = var.locations_faculty_role
+      handler     = "index.handler"
+      environment = {
+        LOCATIONS_TABLE      = var.locations_table
+        LOCATIONS_NAME_INDEX = "name-timestamp-index"
+        CLASSES_TRIPS_TABLE  = var.classes_table
+      }
     },
     {
       name        = "FacultyEmergencyNotification"
-      timeout     = 3
+      timeout     = 30
       runtime     = "python3.13"
       role        = var.lambda_sns_role
       handler     = "lambda_function.lambda_handler"
       environment = {
-        CLASSES_TRIPS_TABLE   = var.classes_table
-        USERS_TABLE           = var.user_table
-        FACULTY_TOPIC_ARN     = var.faculty_sns_arn
+        CLASSES_TRIPS_TABLE    = var.classes_table
+        USERS_TABLE            = var.user_table
+        FACULTY_TOPIC_ARN      = var.faculty_sns_arn
+        MEMBERSHIP_TABLE       = var.membership_table
+        VERSION_TABLE          = var.version_table
+        EMERGENCY_ALERTS_TABLE = var.emergency_alerts_table
+        EMERGENCY_ALERT_WINDOW = var.emergency_alert_window
+        EMERGENCY_EPISODE_IDLE = var.emergency_episode_idle
       }
     },
     {
@@ -27,6 +48,17 @@ locals {
       role        = var.store_location_role
       handler     = "index.handler"
       environment = {}
+    },
+    {
+      name        = "updateLatestLocation"
+      timeout     = 10
+      runtime     = "python3.13"
+      role        = var.latest_location_role
+      handler     = "lambda_function.lambda_handler"
+      environment = {
+        LOCATIONS_TABLE       = var.locations_table
+        LATEST_LOCATION_TABLE = var.latest_location_table
+      }
     }
   ]
 }
@@ -43,6 +75,7 @@ resource "aws_lambda_function" "loc_notify" {
   timeout       = each.value.timeout
   memory_size   = var.memory_size
   architectures = ["x86_64"]
+  layers        = each.value.runtime == "python3.13" ? var.layers : []
   publish       = true
 
   filename         = "${path.module}/placeholder.zip"
@@ -56,3 +89,76 @@ resource "aws_lambda_function" "loc_notify" {
     mode = "PassThrough"
   }
 }
+
+# Keep LatestLocation in step with every ping written to Locations
+resource "aws_lambda_event_source_mapping" "latest_location" {
+  event_source_arn  = var.locations_stream_arn
+  function_name     = aws_lambda_function.loc_notify["updateLatestLocation"].arn
+  starting_position = "LATEST"
+  batch_size        = 100
+}
+
+# Stream records the emergency mapping gave up on (see destination_config below)
+resource "aws_sqs_queue" "faculty_emergency_failures" {
+  name                      = "FacultyEmergencyNotification-failures"
+  message_retention_seconds = 1209600
+}
+
+# The function's role is managed outside Terraform, so the queue grants it access
+resource "aws_sqs_queue_policy" "faculty_emergency_failures" {
+  queue_url = aws_sqs_queue.faculty_emergency_failures.id
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect    = "Allow",
+        Principal = { AWS = var.lambda_sns_role },
+        Action    = "sqs:SendMessage",
+        Resource  = aws_sqs_queue.faculty_emergency_failures.arn
+      }
+    ]
+  })
+}
+
+# Emergency alerts report partial batch failures so only failed students are
+# retried. Retries are bounded and failing batches are split, so one student
+# whose alert keeps failing can't hold the Locations shard (and every other
+# student's alerts) for the stream's 24 h retention; records given up on go to
+# the failure queue.
+resource "aws_lambda_event_source_mapping" "faculty_emergency" {
+  event_source_arn               = var.locations_stream_arn
+  function_name                  = aws_lambda_function.loc_notify["FacultyEmergencyNotification"].arn
+  starting_position              = "LATEST"
+  batch_size                     = var.emergency_batch_size
+  function_response_types        = ["ReportBatchItemFailures"]
+  maximum_retry_attempts         = var.emergency_max_retry_attempts
+  maximum_record_age_in_seconds  = var.emergency_max_record_age
+  bisect_batch_on_function_error = true
+
+  destination_config {
+    on_failure {
+      destination_arn = aws_sqs_queue.faculty_emergency_failures.arn
+    }
+  }
+}
+
+# Pending updates: suppressed emergency pings that no later ping carried to
+# faculty are sent by a scheduled run of the same function
+resource "aws_cloudwatch_event_rule" "emergency_flush" {
+  name                = "FacultyEmergencyNotification-flush"
+  description         = "Send pending emergency updates once their alert window has passed"
+  schedule_expression = var.emergency_flush_schedule
+}
+
+resource "aws_cloudwatch_event_target" "emergency_flush" {
+  rule = aws_cloudwatch_event_rule.emergency_flush.name
+  arn  = aws_lambda_function.loc_notify["FacultyEmergencyNotification"].arn
+}
+
+resource "aws_lambda_permission" "emergency_flush" {
+  statement_id  = "AllowExecutionFromEventBridge_EmergencyFlush"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.loc_notify["FacultyEmergencyNotification"].function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.emergency_flush.arn
+}
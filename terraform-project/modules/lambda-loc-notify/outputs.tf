@@ -5,3 +5,7 @@ output "lambda_function_names" {
 output "lambda_function_arns" {
   value = { for name, f in aws_lambda_function.loc_notify : name => f.arn }
 }
+
+output "faculty_emergency_failures_queue_arn" {
+  value = aws_sqs_queue.faculty_emergency_failures.arn
+}
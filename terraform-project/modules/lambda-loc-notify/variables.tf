@@ -13,11 +13,82 @@ variable "store_location_role" {
   description = "IAM role for storeLocation Lambda"
 }
 
+variable "latest_location_role" {
+  type        = string
+  description = "IAM role for updateLatestLocation Lambda (Locations stream consumer)"
+}
+
 variable "classes_table" {
   type        = string
   description = "Name of ClassesTrips DynamoDB table"
 }
 
+variable "membership_table" {
+  type        = string
+  description = "Name of ClassMembership DynamoDB table"
+}
+
+variable "version_table" {
+  type        = string
+  description = "DynamoDB table name for the cache version markers"
+}
+
+variable "locations_table" {
+  type        = string
+  description = "Name of Locations DynamoDB table"
+}
+
+variable "locations_stream_arn" {
+  type        = string
+  description = "Stream ARN of the Locations DynamoDB table"
+}
+
+variable "latest_location_table" {
+  type        = string
+  description = "Name of LatestLocation DynamoDB table"
+}
+
+variable "emergency_alerts_table" {
+  type        = string
+  description = "Name of EmergencyAlerts DynamoDB table (alert dedup / rate limiting)"
+}
+
+variable "emergency_alert_window" {
+  type        = string
+  default     = "300"
+  description = "Seconds during which repeat emergency alerts of an episode are suppressed"
+}
+
+variable "emergency_batch_size" {
+  type        = number
+  default     = 25
+  description = "Locations stream records per FacultyEmergencyNotification invocation"
+}
+
+variable "emergency_max_retry_attempts" {
+  type        = number
+  default     = 5
+  description = "Retries of a failing emergency batch before its records go to the failure queue"
+}
+
+variable "emergency_max_record_age" {
+  type        = number
+  default     = 3600
+  description = "Seconds after which an unprocessed Locations record goes to the failure queue instead of alerting"
+}
+
+variable "emergency_episode_idle" {
+  type        = string
+  default     = "1800"
+  description = "Seconds without an emergency ping after which a student's next emergency opens a new episode"
+}
+
+variable "emergency_flush_schedule" {
+  type        = string
+  default     = "rate(1 minute)"
+  description = "How often pending emergency updates are checked; delays a pending update by at most this much past its window"
+}
+
 variable "user_table" {
   type        = string
   description = "Name of UserProfiles DynamoDB table"
@@ -31,3 +102,9 @@ variable "faculty_sns_arn" {
 variable "memory_size" {
   default = 128
 }
+
+variable "layers" {
+  description = "Lambda layer ARNs for the Python functions (shared runtime)"
+  type        = list(string)
+  default     = []
+}
@@ -4,22 +4,37 @@ locals {
       name        = "getStudents"
       timeout     = 3
       environment = {
-        TRIP_TABLE  = var.classes_table
-        USERS_TABLE = var.user_table
+        USERS_TABLE      = var.user_table
+        MEMBERSHIP_TABLE = var.membership_table
+        VERSION_TABLE    = var.version_table
       }
     },
     {
       name        = "AdminAddStudentinClass"
       timeout     = 3
       environment = {
-        CLS_TABLE = var.classes_table
+        CLS_TABLE        = var.classes_table
+        MEMBERSHIP_TABLE = var.membership_table
+        VERSION_TABLE    = var.version_table
+      }
+    },
+    {
+      name        = "AdminImportStudentsinClass"
+      timeout     = 30
+      environment = {
+        CLS_TABLE        = var.classes_table
+        USERS_TABLE      = var.user_table
+        MEMBERSHIP_TABLE = var.membership_table
+        VERSION_TABLE    = var.version_table
       }
     },
     {
       name        = "fetchCustomStatus"
       timeout     = 3
       environment = {
-        DYNAMODB_TABLE = var.classes_table
+        DYNAMODB_TABLE   = var.classes_table
+        MEMBERSHIP_TABLE = var.membership_table
+        VERSION_TABLE    = var.version_table
       }
     },
     {
@@ -33,7 +48,9 @@ locals {
       name        = "StudDeletefromClass"
       timeout     = 3
       environment = {
-        CLS_TABLE = var.classes_table
+        CLS_TABLE        = var.classes_table
+        MEMBERSHIP_TABLE = var.membership_table
+        VERSION_TABLE    = var.version_table
       }
     }
   ]
@@ -51,6 +68,7 @@ resource "aws_lambda_function" "students" {
   timeout       = each.value.timeout
   memory_size   = var.memory_size
   architectures = ["x86_64"]
+  layers        = var.layers
   publish       = true
 
   filename         = "${path.module}/placeholder.zip"
@@ -28,3 +28,19 @@ variable "user_table" {
   description = "DynamoDB table name for user profiles"
   type        = string
 }
+
+variable "membership_table" {
+  description = "DynamoDB table name for the userName -> classId membership index"
+  type        = string
+}
+
+variable "version_table" {
+  type        = string
+  description = "DynamoDB table name for the cache version markers"
+}
+
+variable "layers" {
+  description = "Lambda layer ARNs for the Python functions (shared runtime)"
+  type        = list(string)
+  default     = []
+}